@@ -0,0 +1,6 @@
+"""
+Benchmarks on synthetic Exchange corpora.
+
+    python -m benchmarks.corpus OUT --pairs N    write a corpus (benchmarks.corpus)
+    python -m benchmarks --pairs N ...           time convert/analyze/merge/punch (benchmarks.run)
+"""
@@ -0,0 +1,373 @@
+"""
+Deterministic synthetic Exchange corpora.
+
+Each pair is an A and a Z Exchange JSON in the shape of the samples in
+input_json (accountId/metadata envelope, `brief` with Identification,
+Identifiers, Hardware and Measurement.OpmResultData: 12 fibers x 1310/1550 nm
+Measurements with Readings and FiberLength, ThresholdSet, Connectors,
+LinkDefinition), written with the same indent=4 layout, so file sizes and
+parse costs match the field data.
+
+Faults are injected per pair at the given rates, independently:
+
+  polarity    the Z side's ActualConnectors.PolarityType differs
+  wavelength  the Z side measured 1625 nm instead of 1550 nm
+  length      one fiber's length on the Z side is off by 1-20 m
+  high_loss   one reading on one side is over the 1.6 dB threshold (Fail)
+
+Every pair draws from its own random.Random seeded with (seed, pair index),
+so a corpus is byte-identical for a given seed whatever the worker count.
+
+    python -m benchmarks.corpus corpus_1k --pairs 1000 --seed 1
+"""
+import argparse
+import json
+import random
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from json2opm.engine import default_jobs
+
+
+# Bump when the generated documents change, so cached corpora are rebuilt
+GENERATOR_VERSION = 1
+# Not *.json, so converting the folder doesn't pick it up
+MANIFEST_NAME = "corpus.manifest"
+FAULTS = ("polarity", "wavelength", "length", "high_loss")
+
+FIBERS = 12
+WAVELENGTHS_M = (1.31e-06, 1.55e-06)
+FAULT_WAVELENGTH_M = 1.625e-06
+LOSS_THRESHOLD_DB = 1.6
+_BASE_TIME = datetime(2025, 12, 16, 8, 0, 0, tzinfo=timezone.utc)
+_STANDARDS = ["100GBASE-DR", "100G-PSM4 2.0", "200GBASE-DR4", "400GBASE-DR4", "128GFC-PSM4"]
+
+
+@dataclass(frozen=True)
+class FaultRates:
+    """Probability of each fault per pair."""
+
+    polarity: float = 0.02
+    wavelength: float = 0.01
+    length: float = 0.03
+    high_loss: float = 0.05
+
+
+def pair_name(index: int, side: str) -> str:
+    """Unique per index and paired by the default filename pattern (P<n>_<side><nn>_...)."""
+    path, rest = divmod(index, 10_000)
+    segment, cable = divmod(rest, 100)
+    return f"P{path + 1}_{side}{segment:02d}_C{cable:02d}_LC01_NS1_ROW_06_RACK_30_RU_45"
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _timestamp(t: datetime) -> str:
+    return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _wavelength(w: float) -> dict:
+    return {"Value": w, "Formatted": {"Length": f"{round(w * 1e9)} nm"}}
+
+
+def _measurement(fiber: int, w: float, loss: float, length: float, reference: float, ref_time: str) -> dict:
+    return {
+        "Name": str(fiber),
+        "Type": "Loss",
+        "Wavelength": _wavelength(w),
+        "Reference": {
+            "Value": reference,
+            "Formatted": {"Log": f"{reference:.2f} dBm"},
+            "Unit": "dBm",
+            "From": "Measured",
+            "Timestamp": ref_time,
+            "Method": "3-Cord",
+            "ReferenceCordType": "LowAttenuationGrade",
+        },
+        "Readings": [
+            {
+                "Validity": "Valid",
+                "Value": loss,
+                "Formatted": {"Log": f"{loss:.2f} dB"},
+                "Unit": "dB",
+                "Status": "Fail" if loss > LOSS_THRESHOLD_DB else "Pass",
+            }
+        ],
+        "FiberLength": {"LengthInfo": {"Length": length}, "Status": "Unknown"},
+    }
+
+
+def _document(
+    rng: random.Random,
+    index: int,
+    side: str,
+    wavelengths: tuple[float, ...],
+    losses: list[list[float]],
+    lengths: list[float],
+    polarity: str,
+    tested: datetime,
+) -> dict:
+    name = pair_name(index, side)
+    path, rest = divmod(index, 10_000)
+    segment, cable = divmod(rest, 100)
+    test_point_id = _uuid(rng)
+    ref_time = _timestamp(tested - timedelta(hours=7, minutes=rng.randint(0, 59)))
+    reference = round(rng.uniform(-10.6, -9.9), 2)
+    measurements = [
+        _measurement(f + 1, w, losses[wi][f], lengths[f], reference, ref_time)
+        for wi, w in enumerate(wavelengths)
+        for f in range(FIBERS)
+    ]
+    failed = any(m["Readings"][0]["Status"] == "Fail" for m in measurements)
+    verdict = "Fail" if failed else "Pass"
+    created = _timestamp(tested + timedelta(hours=23, minutes=49)).replace("Z", ".000Z")
+    user = _uuid(rng)
+    brief = {
+        "GlobalVerdict": verdict,
+        "JsonVersion": "1.0",
+        "TestDateTime": _timestamp(tested),
+        "MeasurementId": _uuid(rng),
+        "MeasurementName": name,
+        "Identification": {
+            "JobId": f"PATH_{path + 1}_LCO1-NS3-LCO2-DHB-{index + 1:05d}.{side}{segment:02d}",
+            "company": "EXFO",
+            "customer": "ACME CORP",
+            "OperatorA": rng.choice(("Lorenzo  Mungia", "Dana Whitfield", "Priya Raman", "Tomas Ek")),
+        },
+        "Identifiers": [
+            {"Name": "PATH_TRUNK", "Value": f"P{path + 1}_{side}{segment:02d}"},
+            {"Name": "CONNECTOR", "Value": f"C{cable:02d}"},
+            {"Name": "BLDG_RM", "Value": "LC01_NS1_LC02_DHB"},
+            {"Name": "ROW_RACK_RU", "Value": "06_30_45_27_C_10"},
+            {"Name": "ENCLOSURE", "Value": f"OSE3456-P-P{path + 1}-04"},
+        ],
+        "Hardware": {
+            "UnitA": {
+                "ModelName": "PXM-P12 MPO Power Meter",
+                "SerialNumber": f"FMB{rng.randint(100000, 999999)}",
+                "LastCalibrationDate": "2025-10-14T00:00:00Z",
+            }
+        },
+        "Reporting": {"RequiredTags": ["opm", "multifiber", "loss"]},
+        "Context": {"JobId": _uuid(rng), "TestId": test_point_id, "Source": "System"},
+        "Measurement": {
+            "__type": "OPM",
+            "__subType": " ",
+            "OpmResultData": {
+                "Schema": "OPM-R-2.0",
+                "Id": test_point_id,
+                "Status": verdict,
+                "Measurements": measurements,
+                "ThresholdSet": {
+                    "OpmThresholds": [
+                        {
+                            "Wavelength": _wavelength(w),
+                            "Type": "Loss",
+                            "Max": {
+                                "Value": LOSS_THRESHOLD_DB,
+                                "Unit": "dB",
+                                "Formatted": {"Log": f"{LOSS_THRESHOLD_DB:.2f} dB"},
+                            },
+                        }
+                        for w in wavelengths
+                    ]
+                },
+                "Connectors": {
+                    "ExpectedConnectors": {
+                        "PolarityType": "MPO_B",
+                        "Connectors": [
+                            {
+                                "RowLayouts": ["1" * FIBERS],
+                                "ConnectorType": "Multifiber",
+                                "ConnectorSubType": "MPO",
+                                "Polishing": "NotDefined",
+                                "FiberType": "NotDefined",
+                            }
+                        ],
+                    },
+                    "ActualConnectors": {
+                        "PolarityType": polarity,
+                        "Connectors": [
+                            {
+                                "ConnectorType": "Multifiber",
+                                "ConnectorSubType": "MPO",
+                                "Polishing": "NotDefined",
+                                "FiberType": "OS1",
+                            }
+                        ],
+                    },
+                },
+                "LinkDefinition": {"SpliceCount": 0, "ConnectorCount": 2},
+                "ApplicableNetworkingStds": list(_STANDARDS),
+            },
+        },
+    }
+    return {
+        "accountId": "159215",
+        "resultId": _uuid(rng),
+        "name": name,
+        "metadata": {
+            "jobId": _uuid(rng),
+            "type": "OPM",
+            "subType": " ",
+            "testPointId": test_point_id,
+            "testPointName": name,
+        },
+        "attachments": [],
+        "complements": [],
+        "status": "NotReceived",
+        "created": created,
+        "createdBy": user,
+        "updated": created,
+        "updatedBy": user,
+        "brief": brief,
+        "properties": [],
+        "time_zone": "-05:00",
+        "globalVerdict": verdict,
+        "testDateTime": _timestamp(tested),
+        "measurementType": "opm",
+    }
+
+
+def _losses(rng: random.Random, count: int) -> list[list[float]]:
+    # Healthy links: well under the threshold (clean connectors can read slightly negative)
+    return [[round(min(1.5, rng.gauss(0.5, 0.35)), 2) for _ in range(FIBERS)] for _ in range(count)]
+
+
+def generate_pair(index: int, seed: int, rates: FaultRates) -> tuple[dict, dict, set[str]]:
+    """The A and Z documents of pair `index`, and the faults injected into them."""
+    rng = random.Random(f"{seed}:{index}")
+    faults = {f for f in FAULTS if rng.random() < getattr(rates, f)}
+
+    tested = _BASE_TIME + timedelta(seconds=97 * index)
+    length = round(rng.uniform(20.0, 900.0), 3)
+    a_lengths = [length] * FIBERS
+    z_lengths = [round(length + rng.uniform(-0.05, 0.05), 3)] * FIBERS
+    if "length" in faults:
+        fiber = rng.randrange(FIBERS)
+        z_lengths[fiber] = round(z_lengths[fiber] + rng.choice((-1, 1)) * rng.uniform(1.0, 20.0), 3)
+
+    a_wavelengths = WAVELENGTHS_M
+    z_wavelengths = (WAVELENGTHS_M[0], FAULT_WAVELENGTH_M) if "wavelength" in faults else WAVELENGTHS_M
+    a_losses = _losses(rng, len(a_wavelengths))
+    z_losses = _losses(rng, len(z_wavelengths))
+    if "high_loss" in faults:
+        losses = rng.choice((a_losses, z_losses))
+        losses[rng.randrange(len(losses))][rng.randrange(FIBERS)] = round(rng.uniform(1.7, 4.0), 2)
+
+    z_polarity = rng.choice(("MPO_A", "MPO_C")) if "polarity" in faults else "MPO_B"
+    a = _document(rng, index, "A", a_wavelengths, a_losses, a_lengths, "MPO_B", tested)
+    z = _document(rng, index, "Z", z_wavelengths, z_losses, z_lengths, z_polarity, tested + timedelta(minutes=41))
+    return a, z, faults
+
+
+def _write_chunk(out_dir: Path, start: int, stop: int, seed: int, rates: FaultRates) -> tuple[dict[str, int], int]:
+    counts = dict.fromkeys(FAULTS, 0)
+    total = 0
+    for index in range(start, stop):
+        a, z, faults = generate_pair(index, seed, rates)
+        for f in faults:
+            counts[f] += 1
+        for doc in (a, z):
+            data = json.dumps(doc, indent=4).encode("utf-8")
+            (out_dir / f"{doc['name']}.json").write_bytes(data)
+            total += len(data)
+    return counts, total
+
+
+def _manifest_params(pairs: int, seed: int, rates: FaultRates) -> dict[str, Any]:
+    return {"generator": GENERATOR_VERSION, "pairs": pairs, "seed": seed, "rates": asdict(rates)}
+
+
+def read_manifest(out_dir: Path) -> dict[str, Any] | None:
+    try:
+        return json.loads((out_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_corpus(
+    out_dir: Path,
+    pairs: int,
+    seed: int = 1,
+    rates: FaultRates = FaultRates(),
+    jobs: int | None = None,
+    reuse: bool = True,
+) -> dict[str, Any]:
+    """
+    Write `pairs` A/Z pairs of Exchange JSON into `out_dir`, plus a
+    corpus.manifest file (parameters, files, bytes, injected fault counts),
+    which is returned. With `reuse`, a folder whose manifest already has
+    the same parameters is left as it is.
+    """
+    params = _manifest_params(pairs, seed, rates)
+    manifest = read_manifest(out_dir) if reuse else None
+    if manifest is not None and all(manifest.get(k) == v for k, v in params.items()):
+        return manifest
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # A stale manifest must not survive a half-written corpus
+    (out_dir / MANIFEST_NAME).unlink(missing_ok=True)
+    for old in out_dir.glob("*.json"):
+        old.unlink()
+
+    jobs = max(1, jobs or default_jobs())
+    chunk = max(1, min(500, -(-pairs // jobs)))
+    spans = [(start, min(pairs, start + chunk)) for start in range(0, pairs, chunk)]
+    counts = dict.fromkeys(FAULTS, 0)
+    total = 0
+    if jobs == 1 or len(spans) == 1:
+        results = (_write_chunk(out_dir, start, stop, seed, rates) for start, stop in spans)
+        for chunk_counts, chunk_bytes in results:
+            for f, n in chunk_counts.items():
+                counts[f] += n
+            total += chunk_bytes
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_write_chunk, out_dir, start, stop, seed, rates) for start, stop in spans]
+            for fut in futures:
+                chunk_counts, chunk_bytes = fut.result()
+                for f, n in chunk_counts.items():
+                    counts[f] += n
+                total += chunk_bytes
+
+    manifest = {**params, "files": 2 * pairs, "bytes": total, "faults": counts}
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def add_rate_arguments(p: argparse.ArgumentParser) -> None:
+    defaults = FaultRates()
+    for f in FAULTS:
+        p.add_argument(
+            f"--{f.replace('_', '-')}-rate", type=float, default=getattr(defaults, f), metavar="P",
+            help=f"Share of pairs with a {f.replace('_', ' ')} fault (default: {getattr(defaults, f)})",
+        )
+
+
+def rates_from_args(args: argparse.Namespace) -> FaultRates:
+    return FaultRates(**{f: getattr(args, f"{f}_rate") for f in FAULTS})
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.corpus", description="Write a synthetic Exchange JSON corpus.")
+    p.add_argument("output", type=Path, help="Folder for the .json files (its old .json files are replaced)")
+    p.add_argument("--pairs", type=int, default=1000, help="A/Z pairs to write (default: 1000)")
+    p.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    add_rate_arguments(p)
+    args = p.parse_args(argv)
+    manifest = write_corpus(args.output, args.pairs, args.seed, rates_from_args(args), args.jobs, reuse=False)
+    print(json.dumps(manifest, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
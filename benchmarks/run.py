@@ -0,0 +1,203 @@
+"""
+Benchmark convert, analyze, merge and punch-list export on synthetic corpora
+(see benchmarks.corpus), reporting items/s, MB/s and peak RSS per stage.
+
+Every stage runs in a fresh interpreter (benchmarks.stages), so each one's
+peak RSS is its own and no stage benefits from another's warm caches.
+Corpora are kept in the work folder and reused while their parameters match.
+
+    python -m benchmarks --pairs 1000 10000 --report bench.json
+    python -m benchmarks --pairs 1000 --baseline bench.json
+
+With --baseline, stages that got slower (or grew their peak RSS) by more than
+--tolerance compared with an earlier report on the same machine are listed
+and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from benchmarks.corpus import add_rate_arguments, rates_from_args, write_corpus
+from benchmarks.stages import STAGES
+from json2opm.engine import default_jobs
+from json2opm.writer import OUTPUT_FORMATS
+
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_WORKDIR = Path(tempfile.gettempdir()) / "json2opm-bench"
+# The sizes the suite is meant to be run at; any count is accepted
+STANDARD_PAIRS = (1_000, 10_000, 100_000)
+MIB = 1024 * 1024
+
+
+class StageFailed(RuntimeError):
+    pass
+
+
+def _run_stage(spec: dict) -> dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.stages", json.dumps(spec)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise StageFailed(f"{spec['stage']} failed:\n{proc.stderr.strip()}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    seconds = result["seconds"]
+    result["items_per_s"] = result["items"] / seconds if seconds > 0 else None
+    result["mb_per_s"] = result["bytes"] / MIB / seconds if seconds > 0 else None
+    return result
+
+
+def _mb(n: int | None) -> str:
+    return f"{n / MIB:,.0f}" if n else "n/a"
+
+
+def _rate(v: float | None) -> str:
+    return f"{v:,.1f}" if v is not None else "n/a"
+
+
+_HEADER = f"{'pairs':>8}  {'stage':<8} {'items':>9} {'unit':<5} {'seconds':>8} {'items/s':>10} {'MB/s':>8} {'RSS MB':>8} {'workers':>8}"
+
+
+def _row(r: dict) -> str:
+    return (
+        f"{r['pairs']:>8,}  {r['stage']:<8} {r['items']:>9,} {r['unit']:<5} {r['seconds']:>8.2f} "
+        f"{_rate(r['items_per_s']):>10} {_rate(r['mb_per_s']):>8} {_mb(r['peak_rss']):>8} {_mb(r['workers_peak_rss']):>8}"
+    )
+
+
+def run_benchmarks(
+    pair_counts: list[int],
+    stages: list[str],
+    workdir: Path,
+    seed: int,
+    rates,
+    jobs: int,
+    output_format: str,
+    threshold: float,
+    on_result=None,
+) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    for pairs in pair_counts:
+        json_dir = workdir / f"corpus_{pairs}"
+        manifest = write_corpus(json_dir, pairs, seed, rates, jobs)
+        run_dir = workdir / f"run_{pairs}"
+        spec = {
+            "json_dir": str(json_dir),
+            "opm_dir": str(run_dir / "opm"),
+            "merge_dir": str(run_dir / "merged"),
+            "punch_path": str(run_dir / "punch.csv"),
+            "jobs": jobs,
+            "format": output_format,
+            "threshold": threshold,
+        }
+        # analyze/merge/punch read the converted folder; convert it (untimed) if convert isn't benchmarked
+        needs_opm = [s for s in stages if s != "convert"]
+        order = [s for s in STAGES if s in stages]
+        if needs_opm and "convert" not in stages:
+            _run_stage({**spec, "stage": "convert"})
+        for stage in order:
+            r = {"pairs": pairs, **_run_stage({**spec, "stage": stage}), "faults": manifest["faults"]}
+            results.append(r)
+            if on_result is not None:
+                on_result(r)
+    return results
+
+
+def compare_to_baseline(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """One message per stage that is slower, or uses more memory, than `baseline` by more than `tolerance`."""
+    old = {(r["pairs"], r["stage"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = old.get((r["pairs"], r["stage"]))
+        if b is None:
+            continue
+        if r["items_per_s"] and b.get("items_per_s") and r["items_per_s"] < b["items_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{r['stage']} @ {r['pairs']:,} pairs: {b['items_per_s']:,.1f} -> {r['items_per_s']:,.1f} {r['unit']}/s "
+                f"({r['items_per_s'] / b['items_per_s'] - 1:+.0%})"
+            )
+        if r["peak_rss"] and b.get("peak_rss") and r["peak_rss"] > b["peak_rss"] * (1 + tolerance):
+            regressions.append(
+                f"{r['stage']} @ {r['pairs']:,} pairs: peak RSS {_mb(b['peak_rss'])} -> {_mb(r['peak_rss'])} MB "
+                f"({r['peak_rss'] / b['peak_rss'] - 1:+.0%})"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark JSON2OPM on synthetic corpora.")
+    p.add_argument(
+        "--pairs", type=int, nargs="+", default=[STANDARD_PAIRS[0]], metavar="N",
+        help=f"Corpus sizes in A/Z pairs (default: {STANDARD_PAIRS[0]}; the standard sizes are "
+             f"{', '.join(f'{n:,}' for n in STANDARD_PAIRS)})",
+    )
+    p.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to time (default: all)")
+    p.add_argument(
+        "--workdir", type=Path, default=DEFAULT_WORKDIR,
+        help=f"Folder for corpora and outputs (default: {DEFAULT_WORKDIR})",
+    )
+    p.add_argument("--seed", type=int, default=1, help="Corpus seed (default: 1)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker count (default: CPU count)")
+    p.add_argument("--format", choices=OUTPUT_FORMATS, default="pretty", help="Layout of written .opm files")
+    p.add_argument("--threshold", type=float, default=0.25, help="Length Δ threshold (default: 0.25)")
+    add_rate_arguments(p)
+    p.add_argument("--report", type=Path, default=None, help="Write the results to this JSON file")
+    p.add_argument("--baseline", type=Path, default=None, help="Compare with an earlier --report")
+    p.add_argument(
+        "--tolerance", type=float, default=0.15,
+        help="Allowed slowdown / peak RSS growth against --baseline (default: 0.15)",
+    )
+    args = p.parse_args(argv)
+
+    baseline = None
+    if args.baseline is not None:
+        try:
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            p.error(f"can't read baseline {args.baseline}: {e}")
+
+    jobs = args.jobs or default_jobs()
+    print(_HEADER, flush=True)
+    try:
+        results = run_benchmarks(
+            args.pairs, args.stages, args.workdir, args.seed, rates_from_args(args), jobs, args.format,
+            args.threshold, on_result=lambda r: print(_row(r), flush=True),
+        )
+    except StageFailed as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.report is not None:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "jobs": jobs,
+            "seed": args.seed,
+            "format": args.format,
+            "rates": vars(rates_from_args(args)),
+            "results": results,
+        }
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for msg in regressions:
+            print(f"REGRESSION {msg}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+One benchmark stage, run in a fresh interpreter by benchmarks.run so that
+its peak RSS is its own.
+
+    python -m benchmarks.stages '{"stage": "analyze", "opm_dir": "...", ...}'
+
+Prints one JSON object: items processed, their unit, bytes, seconds, peak
+RSS of the stage process and of its pool workers, and the stage's summary.
+The stages call the same engine/analysis functions as the CLI and the GUI.
+"""
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from json2opm.analysis import iter_folder_pair_checks, summarize_pair_checks
+from json2opm.engine import convert_batch, find_json_inputs
+from json2opm.merge import MergeCollector
+from json2opm.punch import write_punch_list_csv
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - depends on the platform
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - depends on the install
+    psutil = None
+
+
+STAGES = ("convert", "analyze", "merge", "punch")
+
+
+def peak_rss() -> tuple[int | None, int | None]:
+    """(peak RSS of this process, largest peak RSS of its finished children) in bytes; None if unknown."""
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale or None,
+        )
+    if psutil is not None:
+        # Windows: the peak working set; pool workers aren't covered
+        return getattr(psutil.Process().memory_info(), "peak_wset", None), None
+    return None, None
+
+
+def _reset(folder: Path) -> None:
+    shutil.rmtree(folder, ignore_errors=True)
+    folder.mkdir(parents=True)
+
+
+def _folder_bytes(folder: Path, pattern: str) -> int:
+    return sum(p.stat().st_size for p in folder.glob(pattern))
+
+
+def _analyze(opm_dir: Path, threshold: float, jobs: int, merger: MergeCollector | None = None) -> dict:
+    seen: list[Path] = []
+    checks = list(iter_folder_pair_checks(opm_dir, threshold, on_eligible=merger, seen=seen, jobs=jobs))
+    analysis = summarize_pair_checks(checks, threshold)
+    analysis["files"] = len(seen)
+    return analysis
+
+
+def stage_convert(spec: dict) -> dict:
+    src, opm_dir = Path(spec["json_dir"]), Path(spec["opm_dir"])
+    _reset(opm_dir)
+    t = time.perf_counter()
+    results = convert_batch(find_json_inputs([src]), opm_dir, jobs=spec["jobs"], output_format=spec["format"])
+    seconds = time.perf_counter() - t
+    failed = sum(not r.ok for r in results)
+    return {
+        "items": len(results),
+        "unit": "files",
+        "bytes": _folder_bytes(src, "*.json"),
+        "seconds": seconds,
+        "summary": {
+            "converted": len(results) - failed,
+            "failed": failed,
+            "bytes_written": sum(r.bytes_written for r in results),
+        },
+    }
+
+
+def stage_analyze(spec: dict) -> dict:
+    opm_dir = Path(spec["opm_dir"])
+    t = time.perf_counter()
+    analysis = _analyze(opm_dir, spec["threshold"], spec["jobs"])
+    seconds = time.perf_counter() - t
+    return {
+        "items": analysis["files"],
+        "unit": "files",
+        "bytes": _folder_bytes(opm_dir, "*.opm"),
+        "seconds": seconds,
+        "summary": analysis["stats"],
+    }
+
+
+def stage_merge(spec: dict) -> dict:
+    opm_dir, merge_dir = Path(spec["opm_dir"]), Path(spec["merge_dir"])
+    _reset(merge_dir)
+    t = time.perf_counter()
+    merger = MergeCollector(merge_dir, output_format=spec["format"], jobs=spec["jobs"])
+    analysis = _analyze(opm_dir, spec["threshold"], spec["jobs"], merger)
+    merged = merger.result()
+    seconds = time.perf_counter() - t
+    return {
+        "items": analysis["files"],
+        "unit": "files",
+        "bytes": _folder_bytes(opm_dir, "*.opm"),
+        "seconds": seconds,
+        "summary": {k: merged[k] for k in ("merged", "write_errors", "bytes_written")},
+    }
+
+
+def stage_punch(spec: dict) -> dict:
+    # Only the export is timed; the analysis that produces the rows is the analyze stage
+    opm_dir = Path(spec["opm_dir"])
+    rows = _analyze(opm_dir, spec["threshold"], spec["jobs"])["punch_rows"]
+    out_path = Path(spec["punch_path"])
+    out_path.unlink(missing_ok=True)
+    t = time.perf_counter()
+    write_punch_list_csv(out_path, rows)
+    seconds = time.perf_counter() - t
+    return {
+        "items": len(rows),
+        "unit": "rows",
+        "bytes": out_path.stat().st_size,
+        "seconds": seconds,
+        "summary": {"rows": len(rows)},
+    }
+
+
+_RUNNERS: dict[str, Callable[[dict], dict]] = {
+    "convert": stage_convert,
+    "analyze": stage_analyze,
+    "merge": stage_merge,
+    "punch": stage_punch,
+}
+
+
+def run_stage(spec: dict) -> dict[str, Any]:
+    result = _RUNNERS[spec["stage"]](spec)
+    rss, workers_rss = peak_rss()
+    return {"stage": spec["stage"], **result, "peak_rss": rss, "workers_peak_rss": workers_rss}
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python -m benchmarks.stages '<stage spec JSON>'", file=sys.stderr)
+        return 2
+    print(json.dumps(run_stage(json.loads(argv[0]))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
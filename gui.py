@@ -1,4 +1,5 @@
-﻿import sys
+﻿import multiprocessing
+import sys
 from pathlib import Path
 
 def _ensure_runtime_path():
@@ -23,4 +24,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for ProcessPoolExecutor workers inside a PyInstaller EXE
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,758 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from json2opm.engine import default_jobs
+from json2opm.features import OpmFeatures, extract_features
+from json2opm.index import FeatureIndex
+from json2opm.lazy import read_features
+from json2opm.lengths import FiberLengthDelta, compare_fiber_lengths
+from json2opm.loader import load_json
+from json2opm.pairing import DEFAULT_PAIR_KEY, MERGED_SUFFIX, Orphan, PairIndex, PairKeyStrategy
+from json2opm.punch import build_punch_row
+from json2opm.rules import RuleFailure, RuleSet
+
+
+def extract_az_pair_key(stem: str) -> tuple[str | None, str | None]:
+    """
+    Convert filename stem into:
+      pair_key: same for A and Z
+      side: "A" or "Z"
+    Examples:
+      P1_A03_C06_...   -> pair_key=P1_03_C06_...  side=A
+      P1_Z03_C06_...   -> pair_key=P1_03_C06_...  side=Z
+    """
+    return DEFAULT_PAIR_KEY.split(stem)
+
+
+@dataclass(slots=True)
+class PairCheck:
+    """
+    Verdict for one complete A/Z pair. The flags mirror the summary counters;
+    `error_block` is the formatted log block and `punch_row` the CSV row, if any.
+    """
+
+    key: str
+    a_path: Path
+    z_path: Path
+    eligible: bool = False
+    mismatch: bool = False          # merge-blocking mismatch, or compare error
+    high_loss: bool = False
+    polarity_issue: bool = False
+    wavelength_mismatch: bool = False
+    length_issue: bool = False
+    fiber_lengths: FiberLengthDelta | None = None
+    rule_issue: bool = False
+    rule_failures: list[RuleFailure] | None = None
+    error_block: list[str] | None = None
+    punch_row: dict | None = None
+
+
+def iter_opm_files(folder: Path) -> Iterator[Path]:
+    """*.opm files in `folder`, lazily and in directory order (no sorting, no full listing)."""
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.name.lower().endswith(".opm"):
+                yield Path(entry.path)
+
+
+def iter_complete_pairs(
+    paths: Iterable[Path],
+    pairing: PairIndex | None = None,
+) -> Iterator[tuple[str, Path, Path]]:
+    """
+    Yield (pair_key, a_path, z_path) the moment both sides of a pair have been
+    seen, so analysis can start before the listing finishes. Order follows the
+    input; sort at report time if it matters.
+
+    Pass a PairIndex to choose the key strategy and to read its orphans afterwards.
+    """
+    pairing = pairing if pairing is not None else PairIndex()
+    for p in paths:
+        pair = pairing.add(p)
+        if pair is not None:
+            yield pair
+
+
+def _compare_error(check: PairCheck, e: Exception) -> PairCheck:
+    check.eligible = False
+    check.mismatch = True
+    check.error_block = [f"❌ A/Z MISMATCH  {check.key}", f"  Compare error: {e}", ""]
+    check.punch_row = build_punch_row(
+        pair_key=check.key,
+        a=None,
+        z=None,
+        mismatch=True,
+        failure_high_loss=False,
+        a_fail=False,
+        z_fail=False,
+        polarity_issue=False,
+        wavelength_issue=False,
+        length_issue=False,
+        note=f"Compare error: {e}",
+    )
+    return check
+
+
+def _fmt_rule_value(v) -> str:
+    if isinstance(v, list):
+        shown = ", ".join(fmt(x) for x in v[:6])
+        return f"[{shown}{', ...' if len(v) > 6 else ''}]"
+    return fmt(v)
+
+
+def _rule_block(f: RuleFailure) -> list[str]:
+    lines = [f"  📐 | Rule {f.name}" + (" (warning)" if f.severity == "warning" else "")]
+    if f.delta is not None:
+        lines.append(f"    A: {_fmt_rule_value(f.a)}  Z: {_fmt_rule_value(f.z)}  Delta: {fmt(f.delta)}")
+    else:
+        lines += [
+            f"    Side: {'A+Z' if f.a_failed and f.z_failed else 'A' if f.a_failed else 'Z'}",
+            f"    A: {_fmt_rule_value(f.a)}",
+            f"    Z: {_fmt_rule_value(f.z)}",
+        ]
+    lines += [f"    Required: {f.requirement}", ""]
+    return lines
+
+
+def _fiber_detail(fibers: FiberLengthDelta) -> str:
+    return f"{fibers.over}/{fibers.compared} fibers over threshold, worst fiber {fibers.worst_fiber} delta={fmt(fibers.delta)}"
+
+
+def check_pair(
+    key: str,
+    a_path: Path,
+    z_path: Path,
+    a: OpmFeatures,
+    z: OpmFeatures,
+    length_threshold: float = 0.25,
+    rules: RuleSet | None = None,
+) -> PairCheck:
+    """
+    Apply the A/Z rules to one pair's features, then the rule file's `rules`
+    (on OpmFeatures.rule_values). Pure: no I/O, never raises.
+    """
+    check = PairCheck(key=key, a_path=a_path, z_path=z_path)
+    try:
+        # -------- High loss (failure-only) --------
+        a_high_loss = a.high_loss
+        z_high_loss = z.high_loss
+        high_loss = a_high_loss or z_high_loss
+        check.high_loss = high_loss
+
+        # -------- Polarity --------
+        expected_pol = a.expected_polarity or z.expected_polarity
+        a_pol = a.actual_polarity
+        z_pol = z.actual_polarity
+        pol_status_a = a.polarity_status
+        pol_status_z = z.polarity_status
+
+        polarity_missing = (a_pol is None) or (z_pol is None)
+        polarity_mismatch = (a_pol is not None and z_pol is not None and a_pol != z_pol)
+        polarity_unknown = (pol_status_a == "Unknown") or (pol_status_z == "Unknown")
+
+        polarity_issue = polarity_missing or polarity_mismatch or polarity_unknown
+
+        # -------- Wavelength (merge blocker) --------
+        a_wl = a.wavelengths_nm
+        z_wl = z.wavelengths_nm
+        wavelength_mismatch = (a_wl != z_wl)
+        check.wavelength_mismatch = wavelength_mismatch
+
+        # -------- Length (merge blocker) --------
+        a_len, a_missing = a.length, a.length_missing
+        z_len, z_missing = z.length, z.length_missing
+        length_missing = a_missing or z_missing
+
+        length_delta = None
+        length_mismatch = False
+        if a_len is not None and z_len is not None:
+            length_delta = abs(float(a_len) - float(z_len))
+            length_mismatch = (length_delta > length_threshold)
+
+        # Every fiber, not just the first length found on each side
+        fibers = compare_fiber_lengths(a.fiber_lengths, z.fiber_lengths, length_threshold)
+        check.fiber_lengths = fibers
+        fiber_mismatch = fibers is not None and fibers.over > 0
+
+        length_issue = length_missing or length_mismatch or fiber_mismatch
+        check.length_issue = length_issue
+
+        # -------- Rule file --------
+        rule_failures = rules.check(a.rule_values, z.rule_values) if rules is not None else []
+        check.rule_failures = rule_failures
+        check.rule_issue = bool(rule_failures)
+        rule_blocker = any(f.blocks_merge for f in rule_failures)
+        rule_errors = [f.name for f in rule_failures if f.severity == "error"]
+
+        # -------- Merge blockers (MISMATCH definition) --------
+        has_merge_blocker = (
+            polarity_missing or polarity_mismatch or wavelength_mismatch or length_issue or rule_blocker
+        )
+
+        # Polarity issue pairs (independent of merge blocker)
+        check.polarity_issue = polarity_issue
+
+        # Punch row if any issue
+        if has_merge_blocker or high_loss or rule_errors:
+            check.punch_row = build_punch_row(
+                pair_key=key,
+                a=a,
+                z=z,
+                mismatch=has_merge_blocker,
+                failure_high_loss=high_loss,
+                a_fail=a_high_loss,
+                z_fail=z_high_loss,
+                polarity_issue=polarity_issue,
+                wavelength_issue=wavelength_mismatch,
+                length_issue=length_issue,
+                length_detail=_fiber_detail(fibers) if fiber_mismatch else None,
+                rules=rule_errors,
+            )
+
+        # -------- Error blocks rendering --------
+        rule_lines: list[str] = []
+        for f in rule_failures:
+            rule_lines += _rule_block(f)
+
+        if high_loss and not has_merge_blocker:
+            side_txt = "A" if a_high_loss and not z_high_loss else "Z" if z_high_loss and not a_high_loss else "A+Z"
+            check.error_block = [
+                f"❌ A/Z FAILURE   {key}",
+                "  🔥 | High Loss",
+                f"    Side: {side_txt}",
+                "    One or more readings have Status=Fail",
+                "",
+            ] + rule_lines
+            check.eligible = True
+            return check
+
+        if not has_merge_blocker:
+            # Clean, or only rules that don't block the merge
+            if rule_failures:
+                title = f"❌ A/Z FAILURE   {key}" if rule_errors else f"⚠️ A/Z WARNING   {key}"
+                check.error_block = [title] + rule_lines
+            check.eligible = True
+            return check
+
+        check.mismatch = True
+
+        lines: list[str] = [f"❌ A/Z MISMATCH  {key}"]
+
+        if high_loss:
+            side_txt = "A" if a_high_loss and not z_high_loss else "Z" if z_high_loss and not a_high_loss else "A+Z"
+            lines += [
+                "  🔥 | High Loss",
+                f"    Side: {side_txt}",
+                "    One or more readings have Status=Fail",
+                "",
+            ]
+
+        if polarity_missing or polarity_mismatch:
+            lines += [
+                "  🔀 | Polarity",
+                f"    Expected: {fmt(expected_pol)}",
+                f"    A: {fmt(a_pol)}",
+                f"    Z: {fmt(z_pol)}",
+                "",
+            ]
+
+        if wavelength_mismatch:
+            lines += [
+                "  λ | Wavelength",
+                f"    A: {a_wl}",
+                f"    Z: {z_wl}",
+                "",
+            ]
+
+        if length_missing:
+            lines += [
+                "  📏 | Length",
+                f"    A: {fmt(a_len)}",
+                f"    Z: {fmt(z_len)}",
+                "",
+            ]
+
+        if length_mismatch or fiber_mismatch:
+            lines.append("  📏 | Length")
+            if length_mismatch:
+                lines += [
+                    f"    Length mismatch: A={fmt(float(a_len))}  Z={fmt(float(z_len))}",
+                    f"    Delta: {fmt(length_delta)}   Threshold: {fmt(length_threshold)}",
+                ]
+            if fiber_mismatch:
+                lines += [
+                    f"    Fibers over threshold: {fibers.over} of {fibers.compared}",
+                    f"    Worst: fiber {fibers.worst_fiber}  A={fmt(fibers.a_length)}  Z={fmt(fibers.z_length)}"
+                    f"  Delta: {fmt(fibers.delta)}",
+                ]
+                if not length_mismatch:
+                    lines.append(f"    Threshold: {fmt(length_threshold)}")
+            lines.append("")
+
+        check.error_block = lines + rule_lines
+        return check
+
+    except Exception as e:
+        return _compare_error(check, e)
+
+
+def iter_pair_checks(
+    pairs: Iterable[tuple[str, Path, Path]],
+    length_threshold: float = 0.25,
+    cancel: threading.Event | None = None,
+    docs: dict[Path, dict] | None = None,
+    on_eligible: Callable[[str, Path, Path, dict | None, dict | None], None] | None = None,
+    features: dict[Path, OpmFeatures] | Callable[[list[Path]], dict[Path, OpmFeatures]] | None = None,
+    rules: RuleSet | None = None,
+) -> Iterator[PairCheck]:
+    """
+    Check pairs as they arrive and yield one PairCheck each, in input order.
+
+    `features` is either a path -> OpmFeatures cache or a callable that is
+    asked for each pair's two paths (e.g. a per-pair index lookup). `docs`,
+    `on_eligible`, `cancel` and `rules` work as in analyze_pairs_from_opm_paths.
+    """
+    docs = docs if docs is not None else {}
+    lookup = features if callable(features) else None
+    cache = features if isinstance(features, dict) else {}
+
+    for key, a_path, z_path in pairs:
+        if cancel is not None and cancel.is_set():
+            break
+        if lookup is not None:
+            try:
+                cache = lookup([a_path, z_path])
+            except Exception:
+                # A broken index only costs speed: read the files instead
+                cache = {}
+        yield _check_taken_pair(key, a_path, z_path, cache, docs, length_threshold, on_eligible, rules)
+
+
+def _check_taken_pair(
+    key: str,
+    a_path: Path,
+    z_path: Path,
+    features: dict[Path, OpmFeatures],
+    docs: dict[Path, dict],
+    length_threshold: float,
+    on_eligible: Callable[[str, Path, Path, dict | None, dict | None], None] | None,
+    rules: RuleSet | None,
+) -> PairCheck:
+    # Pops both sides out of `features` / `docs`; the documents die with this call
+    try:
+        a, a_doc = _take_features(features, docs, a_path, rules)
+        z, z_doc = _take_features(features, docs, z_path, rules)
+    except Exception as e:
+        docs.pop(z_path, None)
+        return _compare_error(PairCheck(key=key, a_path=a_path, z_path=z_path), e)
+
+    check = check_pair(key, a_path, z_path, a, z, length_threshold, rules)
+    if check.eligible and on_eligible:
+        on_eligible(key, a_path, z_path, a_doc, z_doc)
+    return check
+
+
+class PairStream:
+    """
+    Pair checking for files that turn up one at a time, such as
+    convert_batch's on_result: add() each .opm path with the features and
+    document already in memory. The moment a pair's second side arrives it
+    is checked, handed to `on_eligible` with both documents if eligible, and
+    released, so only files still waiting for their partner are held and
+    memory follows the pairs in flight instead of the batch.
+
+    Pairing is PairIndex.add's: a later file for a pair that is already
+    complete is reported as a duplicate orphan (analyze_pairs_from_opm_paths
+    lets the later file win instead). result() returns the same dict as
+    analyze_pairs_from_opm_paths.
+    """
+
+    def __init__(
+        self,
+        length_threshold: float = 0.25,
+        on_eligible: Callable[[str, Path, Path, dict | None, dict | None], None] | None = None,
+        pair_key: PairKeyStrategy | None = None,
+        cancel: threading.Event | None = None,
+        rules: RuleSet | None = None,
+    ):
+        self.length_threshold = length_threshold
+        self.on_eligible = on_eligible
+        self.cancel = cancel
+        self.rules = rules
+        self.features: dict[Path, OpmFeatures] = {}
+        self.docs: dict[Path, dict] = {}
+        self.checks: list[PairCheck] = []
+        self.pairing = PairIndex(pair_key, features=self.features, rules=rules, on_orphan=self._release)
+
+    def _release(self, orphan: Orphan) -> None:
+        self.docs.pop(orphan.path, None)
+        self.features.pop(orphan.path, None)
+
+    def add(self, path: Path, features: OpmFeatures | None = None, doc: dict | None = None) -> PairCheck | None:
+        """Add one file; returns its pair's check if this completed a pair."""
+        if self.cancel is not None and self.cancel.is_set():
+            return None
+        if features is not None:
+            self.features[path] = features
+        if doc is not None:
+            self.docs[path] = doc
+        pair = self.pairing.add(path)
+        if pair is None:
+            if path.stem.endswith(MERGED_SUFFIX):
+                self.docs.pop(path, None)
+                self.features.pop(path, None)
+            return None
+        check = _check_taken_pair(*pair, self.features, self.docs, self.length_threshold, self.on_eligible, self.rules)
+        self.checks.append(check)
+        return check
+
+    def result(self) -> dict:
+        """The analysis so far; sides still waiting become orphans and their documents are dropped."""
+        self.docs.clear()
+        self.features.clear()
+        return summarize_pair_checks(self.checks, self.length_threshold, self.pairing.orphans)
+
+
+# Pairs per worker task: big enough to amortize pickling, small enough to
+# keep every core busy and to stream results out of a folder listing.
+PAIR_CHUNK_SIZE = 32
+
+
+def _check_pair_chunk(
+    pairs: list[tuple[str, Path, Path]],
+    known: dict[Path, OpmFeatures],
+    length_threshold: float,
+    rules: RuleSet | None = None,
+) -> tuple[list[PairCheck], dict[Path, OpmFeatures]]:
+    """
+    Check a chunk of pairs, parsing the files that aren't in `known`.
+    Returns the checks (in chunk order) and the features it had to parse.
+    Module-level so it pickles into worker processes.
+    """
+    checks: list[PairCheck] = []
+    parsed: dict[Path, OpmFeatures] = {}
+
+    def features_for(path: Path) -> OpmFeatures:
+        f = known.get(path) or parsed.get(path)
+        if f is None:
+            f = parsed[path] = read_features(path, rules)
+        return f
+
+    for key, a_path, z_path in pairs:
+        try:
+            a = features_for(a_path)
+            z = features_for(z_path)
+        except Exception as e:
+            checks.append(_compare_error(PairCheck(key=key, a_path=a_path, z_path=z_path), e))
+            continue
+        checks.append(check_pair(key, a_path, z_path, a, z, length_threshold, rules))
+    return checks, parsed
+
+
+def iter_pair_checks_parallel(
+    pairs: Iterable[tuple[str, Path, Path]],
+    length_threshold: float = 0.25,
+    jobs: int | None = None,
+    cancel: threading.Event | None = None,
+    on_eligible: Callable[[str, Path, Path, dict | None, dict | None], None] | None = None,
+    features: dict[Path, OpmFeatures] | None = None,
+    index: FeatureIndex | None = None,
+    chunk_size: int = PAIR_CHUNK_SIZE,
+    rules: RuleSet | None = None,
+) -> Iterator[PairCheck]:
+    """
+    iter_pair_checks across a process pool; same checks, same order.
+
+    Pairs are cut into chunks as they arrive. A chunk whose features are all
+    known (`features`, or still valid in `index`; with `rules`, taken with
+    them, so `index` should be opened with the same rules) is checked right here; the
+    rest go to worker processes, which parse the files and apply the rules.
+    Features parsed by workers are written back to `index`.
+
+    Results are yielded in input order, with at most ~2 chunks per worker in
+    flight, so a streamed folder listing keeps bounded memory. The pool is only
+    started once a chunk needs parsing. on_eligible runs in this process and
+    gets no documents (workers don't send them back); MergeCollector loads them.
+    """
+    jobs = max(1, jobs or default_jobs())
+    features = features if features is not None else {}
+    pool: ProcessPoolExecutor | None = None
+    window: deque[Future | list[PairCheck]] = deque()
+
+    def submit(chunk: list[tuple[str, Path, Path]]) -> None:
+        nonlocal pool
+        paths = [p for _, a, z in chunk for p in (a, z)]
+        known = {p: features.pop(p) for p in paths if p in features}
+        if rules is not None:
+            known = {p: f for p, f in known.items() if rules.covers(f)}
+        missing = [p for p in paths if p not in known]
+        if missing and index is not None:
+            try:
+                known.update(index.cached(missing))
+            except Exception:
+                pass
+        if all(p in known for p in paths):
+            window.append(_check_pair_chunk(chunk, known, length_threshold, rules)[0])
+            return
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=jobs)
+        window.append(pool.submit(_check_pair_chunk, chunk, known, length_threshold, rules))
+
+    def take() -> list[PairCheck]:
+        item = window.popleft()
+        if isinstance(item, list):
+            return item
+        checks, parsed = item.result()
+        if index is not None and parsed:
+            try:
+                index.record(parsed, parsed=True)
+            except Exception:
+                # Index is only a cache
+                pass
+        return checks
+
+    def drain(limit: int) -> Iterator[PairCheck]:
+        while window and (len(window) > limit or not isinstance(window[0], Future) or window[0].done()):
+            for check in take():
+                if cancel is not None and cancel.is_set():
+                    return
+                if check.eligible and on_eligible:
+                    on_eligible(check.key, check.a_path, check.z_path, None, None)
+                yield check
+
+    try:
+        chunk: list[tuple[str, Path, Path]] = []
+        for pair in pairs:
+            if cancel is not None and cancel.is_set():
+                return
+            chunk.append(pair)
+            if len(chunk) >= chunk_size:
+                submit(chunk)
+                chunk = []
+                yield from drain(jobs * 2)
+        if chunk:
+            submit(chunk)
+        yield from drain(0)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_folder_pair_checks(
+    folder: Path,
+    length_threshold: float = 0.25,
+    cancel: threading.Event | None = None,
+    on_eligible: Callable[[str, Path, Path, dict | None, dict | None], None] | None = None,
+    index: FeatureIndex | None = None,
+    seen: list[Path] | None = None,
+    pair_key: PairKeyStrategy | None = None,
+    orphans: list[Orphan] | None = None,
+    jobs: int = 1,
+    rules: RuleSet | None = None,
+) -> Iterator[PairCheck]:
+    """
+    Stream a results folder: list it lazily, pair files as both sides turn up,
+    and check each pair straight away (features from `index` when given).
+    With jobs > 1, files the index doesn't know are parsed and checked in a
+    process pool (see iter_pair_checks_parallel).
+
+    Every listed .opm path is appended to `seen`. When the listing completes
+    the index is pruned to it and the files that could not be paired are
+    appended to `orphans`.
+    """
+    seen = seen if seen is not None else []
+    lookup = index.lookup if index is not None else None
+    pairing = PairIndex(pair_key, lookup=lookup, rules=rules)
+
+    def listing() -> Iterator[Path]:
+        for p in iter_opm_files(folder):
+            seen.append(p)
+            yield p
+
+    if jobs > 1:
+        yield from iter_pair_checks_parallel(
+            iter_complete_pairs(listing(), pairing),
+            length_threshold,
+            jobs=jobs,
+            cancel=cancel,
+            on_eligible=on_eligible,
+            features=pairing.features,
+            index=index,
+            rules=rules,
+        )
+    else:
+        yield from iter_pair_checks(
+            iter_complete_pairs(listing(), pairing),
+            length_threshold,
+            cancel=cancel,
+            on_eligible=on_eligible,
+            # Feature-based keys already resolved every file's features while pairing
+            features=pairing.features if pairing.strategy.uses_features else lookup,
+            rules=rules,
+        )
+
+    if cancel is not None and cancel.is_set():
+        return
+    if orphans is not None:
+        orphans.extend(pairing.orphans)
+
+    if index is not None:
+        try:
+            index.prune(seen)
+        except Exception:
+            pass
+
+
+def summarize_pair_checks(
+    checks: Iterable[PairCheck],
+    length_threshold: float = 0.25,
+    orphans: list[Orphan] | None = None,
+) -> dict:
+    """
+    Fold PairChecks into the analysis result dict. Checks are sorted by pair key
+    here, so the report is stable whatever order they were produced in.
+    """
+    stats = {
+        "pairs_checked": 0,
+
+        # merge-blocking mismatches ONLY
+        "mismatched_pairs": 0,
+        "polarity_issue_pairs": 0,     # ✅ NEW: missing OR mismatch OR pol-status unknown
+        "wavelength_mismatches": 0,
+        "length_issue_pairs": 0,
+
+        # failure-only (not merge-blocking)
+        "high_loss_pairs": 0,
+
+        # rule file checks that failed (blocking or not)
+        "rule_issue_pairs": 0,
+
+        "eligible_pairs": 0,
+    }
+
+    error_blocks: list[list[str]] = []
+    eligible_pairs: list[tuple[str, Path, Path]] = []
+    punch_rows: list[dict] = []
+
+    for c in sorted(checks, key=lambda c: c.key):
+        stats["pairs_checked"] += 1
+        stats["mismatched_pairs"] += c.mismatch
+        stats["polarity_issue_pairs"] += c.polarity_issue
+        stats["wavelength_mismatches"] += c.wavelength_mismatch
+        stats["length_issue_pairs"] += c.length_issue
+        stats["high_loss_pairs"] += c.high_loss
+        stats["rule_issue_pairs"] += c.rule_issue
+        if c.eligible:
+            eligible_pairs.append((c.key, c.a_path, c.z_path))
+        if c.error_block is not None:
+            error_blocks.append(c.error_block)
+        if c.punch_row is not None:
+            punch_rows.append(c.punch_row)
+
+    stats["eligible_pairs"] = len(eligible_pairs)
+
+    return {
+        "stats": stats,
+        "error_blocks": error_blocks,
+        "eligible_pairs": eligible_pairs,
+        "punch_rows": punch_rows,
+        "orphans": list(orphans or []),
+        "length_threshold": length_threshold,
+    }
+
+
+def analyze_pairs_from_opm_paths(
+    opm_paths: list[Path],
+    length_threshold: float = 0.25,
+    on_progress: Callable[[int, int], None] | None = None,
+    cancel: threading.Event | None = None,
+    docs: dict[Path, dict] | None = None,
+    on_eligible: Callable[[str, Path, Path, dict | None, dict | None], None] | None = None,
+    features: dict[Path, OpmFeatures] | None = None,
+    pair_key: PairKeyStrategy | None = None,
+    jobs: int = 1,
+    rules: RuleSet | None = None,
+) -> dict:
+    """
+    Pair .opm files (by filename unless `pair_key` says otherwise) and check
+    each complete A/Z pair. Files that could not be paired are listed under
+    "orphans" in the result.
+
+    `on_progress(done, total)` is called as each pair is picked up. If `cancel` is set
+    the loop stops early and the partial result is returned.
+
+    The checks only look at OpmFeatures records. `features` and `docs` map .opm
+    paths to records / documents already in memory (e.g. just converted); a file
+    is only read from disk when neither is available. Both caches are popped as
+    each pair is finished, so they drain while analysis runs and at most one
+    pair's documents are alive at a time.
+
+    `on_eligible(key, a_path, z_path, a_doc, z_doc)` is called for every eligible
+    pair, passing whichever documents are still loaded (None if the pair was
+    analyzed from features alone), which lets the caller merge in the same pass.
+
+    With jobs > 1 (and no `docs`, which are already parsed), pairs whose
+    files aren't in `features` are parsed and checked in a process pool, and
+    on_eligible receives no documents.
+
+    `rules` (a compiled rule file) adds its checks to the built-in ones.
+    Cached features taken without the same rules are read again.
+
+    For a folder listing that should start producing results before it is
+    complete, use iter_opm_files / iter_complete_pairs / iter_pair_checks;
+    for files produced one at a time (a convert run), PairStream.
+    """
+    features = features if features is not None else {}
+    pairing = PairIndex(pair_key, features=features, rules=rules)
+    complete_pairs = pairing.group(opm_paths)
+    total_pairs = len(complete_pairs)
+
+    if jobs > 1 and not docs:
+        pair_checks = iter_pair_checks_parallel(
+            complete_pairs, length_threshold, jobs=jobs, cancel=cancel, on_eligible=on_eligible, features=features,
+            rules=rules,
+        )
+    else:
+        pair_checks = iter_pair_checks(
+            complete_pairs, length_threshold, cancel=cancel, docs=docs, on_eligible=on_eligible, features=features,
+            rules=rules,
+        )
+
+    checks: list[PairCheck] = []
+    for check in pair_checks:
+        checks.append(check)
+        if on_progress:
+            on_progress(len(checks), total_pairs)
+
+    return summarize_pair_checks(checks, length_threshold, pairing.orphans)
+
+
+def _take_features(
+    features: dict[Path, OpmFeatures],
+    docs: dict[Path, dict],
+    path: Path,
+    rules: RuleSet | None = None,
+) -> tuple[OpmFeatures, dict | None]:
+    doc = docs.pop(path, None)
+    feat = features.pop(path, None)
+    if feat is not None and rules is not None and not rules.covers(feat):
+        feat = None
+    if feat is None:
+        if doc is None:
+            doc = load_json(path)
+        feat = extract_features(doc, rules=rules)
+    return feat, doc
+
+
+def fmt(v) -> str:
+    if v is None:
+        return "(missing)"
+    if isinstance(v, float):
+        # keep it readable without tons of noise
+        return f"{v:.3f}".rstrip("0").rstrip(".")
+    return str(v)
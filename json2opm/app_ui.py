@@ -1,20 +1,54 @@
 import json
-import csv
-import copy
-import re
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
 from tkinter import scrolledtext
-from datetime import datetime
 
-from json2opm.loader import load_json
-from json2opm.mapper import map_pxm_json_to_opm
+from json2opm.analysis import (
+    PairCheck,
+    PairStream,
+    fmt,
+    iter_folder_pair_checks,
+    iter_opm_files,
+    summarize_pair_checks,
+)
+from json2opm.archive import default_output_zip_path, run_outputs, write_output_zip
+from json2opm.engine import (
+    CONVERTED,
+    SKIPPED,
+    UPDATED,
+    ConvertResult,
+    convert_batch,
+    count_actions,
+    default_jobs,
+    features_by_output_path,
+    find_json_inputs,
+    hashes_by_output_path,
+    mb_per_s,
+    total_bytes_written,
+)
+from json2opm.export import ReadingsWriter, default_readings_path, export_readings
+from json2opm.features import OpmFeatures
+from json2opm.index import load_cached_features, open_feature_index, record_features
+from json2opm.instrument import RunMetrics, default_run_report_path
+from json2opm.merge import MergeCollector
+from json2opm.pairing import DEFAULT_PAIR_KEY, PAIR_KEY_STRATEGIES, Orphan, PairKeyStrategy, make_pair_key
+from json2opm.punch import default_punch_list_path, write_punch_list_csv
+from json2opm.rules import RuleError, RuleSet, load_rules
 
 
 SETTINGS_FILE = Path(__file__).resolve().parent.parent / "settings.json"
 
+# How often the Tk thread applies queued log/progress updates, and the most
+# messages it will take per tick so a flood of lines can't starve the UI.
+UI_DRAIN_INTERVAL_MS = 100
+UI_DRAIN_MAX_ITEMS = 2000
+
 
 def _load_settings() -> dict:
     if SETTINGS_FILE.exists():
@@ -51,16 +85,40 @@ class JSON2OPMApp(tk.Tk):
         self.length_delta_var = tk.StringVar()
         self.merge_var = tk.BooleanVar(value=False)
         self.generate_punch_var = tk.BooleanVar(value=False)
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.compact_var = tk.BooleanVar(value=False)
+        self.export_readings_var = tk.BooleanVar(value=False)
+        self.zip_outputs_var = tk.BooleanVar(value=False)
+        self.pair_key_var = tk.StringVar(value="filename")
+        self.pair_pattern_var = tk.StringVar()
+        self.rules_path_var = tk.StringVar()
+        self.run_report_var = tk.BooleanVar(value=False)
+        self.profile_var = tk.BooleanVar(value=False)
 
         # Last-run data
         self.last_punch_rows: list[dict] = []
         self.last_punch_path: Path | None = None
 
+        # Background job plumbing (see "Logging helpers" / "Background jobs")
+        self._ui_queue: queue.Queue = queue.Queue()
+        self._job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="json2opm-job")
+        self._cancel_event = threading.Event()
+
         self._build_ui()
         self._restore_last_paths()
         self._restore_length_threshold()
         self._restore_merge_toggle()
         self._restore_punch_toggle()
+        self._restore_incremental_toggle()
+        self._restore_compact_toggle()
+        self._restore_readings_toggle()
+        self._restore_zip_toggle()
+        self._restore_pair_key()
+        self._restore_rules_path()
+        self._restore_run_report_toggles()
+
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.after(UI_DRAIN_INTERVAL_MS, self._drain_ui_queue)
 
     # ----------------------------
     # UI
@@ -116,6 +174,79 @@ class JSON2OPMApp(tk.Tk):
             variable=self.generate_punch_var
         ).pack(side="left")
 
+        # Incremental convert toggle
+        incr_frame = tk.Frame(top)
+        incr_frame.grid(row=6, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        tk.Checkbutton(
+            incr_frame,
+            text="Incremental convert (skip unchanged inputs, update changed ones)",
+            variable=self.incremental_var
+        ).pack(side="left")
+
+        # Output format toggle
+        compact_frame = tk.Frame(top)
+        compact_frame.grid(row=7, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        tk.Checkbutton(
+            compact_frame,
+            text="Compact .opm output (single line, about half the size)",
+            variable=self.compact_var
+        ).pack(side="left")
+
+        # Readings table toggle
+        readings_frame = tk.Frame(top)
+        readings_frame.grid(row=8, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        tk.Checkbutton(
+            readings_frame,
+            text="Export readings table (Parquet; CSV if pyarrow isn't installed)",
+            variable=self.export_readings_var
+        ).pack(side="left")
+
+        # Output ZIP toggle
+        zip_frame = tk.Frame(top)
+        zip_frame.grid(row=9, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        tk.Checkbutton(
+            zip_frame,
+            text="Also pack converted .opm files into a ZIP",
+            variable=self.zip_outputs_var
+        ).pack(side="left")
+
+        # Pair key strategy
+        pair_frame = tk.Frame(top)
+        pair_frame.grid(row=10, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        tk.Label(pair_frame, text="Pair A/Z by:").pack(side="left")
+        ttk.Combobox(
+            pair_frame,
+            values=PAIR_KEY_STRATEGIES,
+            textvariable=self.pair_key_var,
+            state="readonly",
+            width=10,
+        ).pack(side="left", padx=(8, 0))
+        tk.Label(pair_frame, text="Pattern:").pack(side="left", padx=(12, 0))
+        tk.Entry(pair_frame, width=40, textvariable=self.pair_pattern_var).pack(side="left", padx=(8, 0))
+        tk.Label(pair_frame, text="(blank = default; needs a (?P<side>[AZ]) group)").pack(side="left", padx=(8, 0))
+
+        # Extra A/Z checks from a rule file
+        rules_frame = tk.Frame(top)
+        rules_frame.grid(row=11, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        tk.Label(rules_frame, text="Rule file:").pack(side="left")
+        tk.Entry(rules_frame, width=60, textvariable=self.rules_path_var).pack(side="left", padx=(8, 0))
+        tk.Button(rules_frame, text="Browse...", command=self.choose_rules_file).pack(side="left", padx=(8, 0))
+        tk.Label(rules_frame, text="(blank = built-in checks only)").pack(side="left", padx=(8, 0))
+
+        # Run report / profiling toggles
+        report_frame = tk.Frame(top)
+        report_frame.grid(row=12, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        tk.Checkbutton(
+            report_frame,
+            text="Write a JSON run report (time, files and bytes per stage)",
+            variable=self.run_report_var
+        ).pack(side="left")
+        tk.Checkbutton(
+            report_frame,
+            text="Profile the run (slower)",
+            variable=self.profile_var
+        ).pack(side="left", padx=(12, 0))
+
         top.columnconfigure(1, weight=1)
 
         # Progress + status
@@ -135,6 +266,12 @@ class JSON2OPMApp(tk.Tk):
         self.analyze_btn = tk.Button(btns, text="Analyze OPM Folder", command=self.analyze_opm_folder)
         self.analyze_btn.pack(side="left", padx=(10, 0))
 
+        self.stats_btn = tk.Button(btns, text="Fleet Loss Stats", command=self.fleet_stats_opm_folder)
+        self.stats_btn.pack(side="left", padx=(10, 0))
+
+        self.cancel_btn = tk.Button(btns, text="Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_btn.pack(side="left", padx=(10, 0))
+
         self.export_punch_btn = tk.Button(
             btns, text="Export Last Punch List CSV", command=self.export_last_punch_csv, state="disabled"
         )
@@ -182,6 +319,11 @@ class JSON2OPMApp(tk.Tk):
             self.settings["last_opm_results_dir"] = str(self.opm_results_dir)
             _save_settings(self.settings)
 
+    def choose_rules_file(self):
+        fp = filedialog.askopenfilename(filetypes=[("JSON rule file", "*.json"), ("All files", "*.*")])
+        if fp:
+            self.rules_path_var.set(fp)
+
     def _persist_paths(self):
         self.settings["last_input_dir"] = str(self.input_dir) if self.input_dir else ""
         self.settings["last_output_dir"] = str(self.output_dir) if self.output_dir else ""
@@ -235,24 +377,108 @@ class JSON2OPMApp(tk.Tk):
         self.settings["generate_punch_csv"] = bool(self.generate_punch_var.get())
         _save_settings(self.settings)
 
+    def _restore_incremental_toggle(self):
+        self.incremental_var.set(bool(self.settings.get("incremental_convert", False)))
+
+    def _persist_incremental_toggle(self):
+        self.settings["incremental_convert"] = bool(self.incremental_var.get())
+        _save_settings(self.settings)
+
+    def _restore_compact_toggle(self):
+        self.compact_var.set(bool(self.settings.get("compact_output", False)))
+
+    def _persist_compact_toggle(self):
+        self.settings["compact_output"] = bool(self.compact_var.get())
+        _save_settings(self.settings)
+
+    def _restore_readings_toggle(self):
+        self.export_readings_var.set(bool(self.settings.get("export_readings", False)))
+
+    def _persist_readings_toggle(self):
+        self.settings["export_readings"] = bool(self.export_readings_var.get())
+        _save_settings(self.settings)
+
+    def _restore_zip_toggle(self):
+        self.zip_outputs_var.set(bool(self.settings.get("zip_outputs", False)))
+
+    def _persist_zip_toggle(self):
+        self.settings["zip_outputs"] = bool(self.zip_outputs_var.get())
+        _save_settings(self.settings)
+
+    def _restore_run_report_toggles(self):
+        self.run_report_var.set(bool(self.settings.get("run_report", False)))
+        self.profile_var.set(bool(self.settings.get("profile_run", False)))
+
+    def _persist_run_report_toggles(self):
+        self.settings["run_report"] = bool(self.run_report_var.get())
+        self.settings["profile_run"] = bool(self.profile_var.get())
+        _save_settings(self.settings)
+
+    def _new_metrics(self, command: str) -> tuple[RunMetrics, bool]:
+        """A RunMetrics for the next job, and whether to write its report (profiling implies one)."""
+        profile = bool(self.profile_var.get())
+        return RunMetrics(command, profile=profile), profile or bool(self.run_report_var.get())
+
+    def _get_output_format(self) -> str:
+        return "compact" if self.compact_var.get() else "pretty"
+
+    def _restore_pair_key(self):
+        name = self.settings.get("pair_key_strategy", "filename")
+        self.pair_key_var.set(name if name in PAIR_KEY_STRATEGIES else "filename")
+        self.pair_pattern_var.set(self.settings.get("pair_key_pattern", ""))
+
+    def _persist_pair_key(self):
+        self.settings["pair_key_strategy"] = self.pair_key_var.get()
+        self.settings["pair_key_pattern"] = self.pair_pattern_var.get().strip()
+        _save_settings(self.settings)
+
+    def _restore_rules_path(self):
+        self.rules_path_var.set(self.settings.get("rules_file", ""))
+
+    def _persist_rules_path(self):
+        self.settings["rules_file"] = self.rules_path_var.get().strip()
+        _save_settings(self.settings)
+
+    def _get_rules(self) -> tuple[bool, RuleSet | None]:
+        """(ok, the compiled rule file or None if blank); ok is False (after telling the user) if it is invalid."""
+        text = self.rules_path_var.get().strip()
+        if not text:
+            return True, None
+        try:
+            return True, load_rules(Path(text))
+        except RuleError as e:
+            messagebox.showerror("Invalid rule file", str(e))
+            return False, None
+
+    def _get_pair_key(self) -> PairKeyStrategy | None:
+        """The selected strategy, or None (after telling the user) if the pattern is invalid."""
+        try:
+            return make_pair_key(self.pair_key_var.get(), self.pair_pattern_var.get().strip() or None)
+        except ValueError as e:
+            messagebox.showerror("Invalid pair pattern", str(e))
+            return None
+
     # ----------------------------
     # Logging helpers
     # ----------------------------
+    # Jobs run on a worker thread and must never touch Tk widgets directly.
+    # _set_status / _set_progress / _log only enqueue; _drain_ui_queue applies
+    # everything on the Tk thread every UI_DRAIN_INTERVAL_MS, in batches.
+
+    def _post(self, kind: str, *payload):
+        self._ui_queue.put((kind, payload))
 
     def _set_status(self, text: str):
-        self.status_label.config(text=text)
-        self.update_idletasks()
+        self._post("status", text)
+
+    def _set_progress(self, value: int, maximum: int | None = None):
+        self._post("progress", value, maximum)
 
     def _clear_log(self):
         self.log.delete("1.0", tk.END)
 
     def _log(self, text: str = "", tag: str | None = None):
-        if tag:
-            self.log.insert(tk.END, text + "\n", tag)
-        else:
-            self.log.insert(tk.END, text + "\n")
-        self.log.see(tk.END)
-        self.update_idletasks()
+        self._post("log", text, tag)
 
     def _log_header_plain(self, title: str):
         self._log(title, "hdr")
@@ -262,14 +488,64 @@ class JSON2OPMApp(tk.Tk):
         self._log("")
         self._log_header_plain(title)
 
-    def _log_lambda_line(self, line: str, base_tag: str | None):
-        # apply special styling to λ character inside a line
-        if "λ" not in line:
-            self._log(line, base_tag)
+    def _drain_ui_queue(self):
+        lines: list[tuple[str, str | None]] = []
+        status = None
+        progress = None
+        try:
+            for _ in range(UI_DRAIN_MAX_ITEMS):
+                kind, payload = self._ui_queue.get_nowait()
+                if kind == "log":
+                    lines.append(payload)
+                elif kind == "status":
+                    status = payload[0]
+                elif kind == "progress":
+                    progress = payload
+                elif kind == "call":
+                    # keep ordering: anything logged before the call lands first
+                    self._write_log_lines(lines)
+                    lines = []
+                    payload[0](*payload[1:])
+        except queue.Empty:
+            pass
+
+        self._write_log_lines(lines)
+        if progress is not None:
+            value, maximum = progress
+            if maximum is not None:
+                self.progress["maximum"] = maximum
+            self.progress["value"] = value
+        if status is not None:
+            self.status_label.config(text=status)
+
+        self.after(UI_DRAIN_INTERVAL_MS, self._drain_ui_queue)
+
+    def _write_log_lines(self, lines: list[tuple[str, str | None]]):
+        if not lines:
             return
 
-        start_index = self.log.index(tk.END)
-        self.log.insert(tk.END, line + "\n", base_tag if base_tag else None)
+        # One insert per run of same-tag lines; λ lines need per-line tagging.
+        run: list[str] = []
+        run_tag: str | None = None
+        for text, tag in lines:
+            if "λ" in text or tag != run_tag:
+                if run:
+                    self.log.insert(tk.END, "".join(run), run_tag)
+                    run = []
+                run_tag = tag
+            if "λ" in text:
+                self._insert_lambda_line(text, tag)
+            else:
+                run.append(text + "\n")
+        if run:
+            self.log.insert(tk.END, "".join(run), run_tag)
+
+        self.log.see(tk.END)
+
+    def _insert_lambda_line(self, line: str, base_tag: str | None):
+        # apply special styling to λ character inside a line
+        start_index = self.log.index("end-1c")
+        self.log.insert(tk.END, line + "\n", base_tag)
 
         try:
             pos = line.index("λ")
@@ -280,178 +556,540 @@ class JSON2OPMApp(tk.Tk):
         except Exception:
             pass
 
-        self.log.see(tk.END)
-        self.update_idletasks()
+    # ----------------------------
+    # Background jobs
+    # ----------------------------
+
+    def _start_job(self, fn, *args):
+        self._cancel_event = threading.Event()
+        self._set_running(True)
+        fut = self._job_executor.submit(fn, *args)
+        fut.add_done_callback(lambda f: self._post("call", self._on_job_done, f))
+
+    def _run_measured(self, metrics: RunMetrics, fn, *args):
+        """Worker thread: run `fn(*args, metrics=metrics)`; the profilers are stopped however it ends."""
+        metrics.start()
+        try:
+            fn(*args, metrics=metrics)
+        finally:
+            metrics.stop()
+
+    def _on_job_done(self, fut):
+        self._set_running(False)
+        exc = fut.exception()
+        if exc is not None:
+            self._write_log_lines([("", None), (f"❌ Unexpected error: {exc}", "err")])
+            self.status_label.config(text="Failed.")
+
+    def _set_running(self, running: bool):
+        state = "disabled" if running else "normal"
+        self.convert_btn.config(state=state)
+        self.analyze_btn.config(state=state)
+        self.stats_btn.config(state=state)
+        self.cancel_btn.config(state="normal" if running else "disabled")
+
+    def cancel_job(self):
+        self._cancel_event.set()
+        self.cancel_btn.config(state="disabled")
+        self.status_label.config(text="Cancelling...")
+
+    def _on_close(self):
+        self._cancel_event.set()
+        self._job_executor.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
+    def _set_punch_result(self, rows: list[dict], path: Path):
+        self.last_punch_rows = rows
+        self.last_punch_path = path
+        self.export_punch_btn.config(state="normal")
+
+    def _reset_run_state(self):
+        self._clear_log()
+        self.export_punch_btn.config(state="disabled")
+        self.last_punch_rows = []
+        self.last_punch_path = None
+        self.progress["value"] = 0
 
     # ----------------------------
     # Core: Convert
     # ----------------------------
 
-    def _explain_duplicate_output(self, out_path: Path, src_path: Path) -> str:
-        return (
-            f"Output file already exists and overwrite is disabled:\n"
-            f"  Output: {out_path}\n"
-            f"  Input : {src_path}\n\n"
-            f"Fix: choose an empty output folder, delete/rename the existing .opm file, or rename the input JSON(s) "
-            f"so they produce unique output names."
-        )
-
     def convert(self):
         if not self.input_dir or not self.output_dir:
             messagebox.showerror("Missing folder", "Please select both input (JSON) and output folders.")
             return
 
-        json_files = list(self.input_dir.glob("*.json"))
-        if not json_files:
-            messagebox.showwarning("No files", "No JSON files found in input folder.")
+        pair_key = self._get_pair_key()
+        if pair_key is None:
+            return
+        rules_ok, rules = self._get_rules()
+        if not rules_ok:
             return
 
         self._persist_paths()
         self._persist_length_threshold()
         self._persist_merge_toggle()
         self._persist_punch_toggle()
+        self._persist_incremental_toggle()
+        self._persist_compact_toggle()
+        self._persist_readings_toggle()
+        self._persist_zip_toggle()
+        self._persist_pair_key()
+        self._persist_rules_path()
+        self._persist_run_report_toggles()
+
+        # The inputs are listed on the worker thread: archives and JSONL files
+        # are opened to list their results, which can take a while on a share
+        metrics, run_report = self._new_metrics("convert")
+        self._reset_run_state()
+        self._set_status("Listing inputs...")
+        self._start_job(
+            self._run_measured,
+            metrics,
+            self._run_convert,
+            self.input_dir,
+            self.output_dir,
+            self._get_length_threshold(),
+            bool(self.merge_var.get()),
+            bool(self.generate_punch_var.get()),
+            bool(self.incremental_var.get()),
+            self._get_output_format(),
+            pair_key,
+            bool(self.export_readings_var.get()),
+            bool(self.zip_outputs_var.get()),
+            rules,
+            run_report,
+        )
 
-        self._clear_log()
-        self.export_punch_btn.config(state="disabled")
-        self.last_punch_rows = []
-        self.last_punch_path = None
+    def _run_convert(
+        self,
+        input_dir: Path,
+        output_dir: Path,
+        length_threshold: float,
+        merge_enabled: bool,
+        punch_enabled: bool,
+        incremental: bool = False,
+        output_format: str = "pretty",
+        pair_key: PairKeyStrategy | None = None,
+        readings_enabled: bool = False,
+        zip_enabled: bool = False,
+        rules: RuleSet | None = None,
+        run_report: bool = False,
+        metrics: RunMetrics | None = None,
+    ):
+        """
+        Worker thread: list the inputs, convert, then report.
+
+        Pairs are checked from the converter's OpmFeatures as soon as both
+        sides are converted, and eligible pairs merged from the documents
+        still in memory, so each file is parsed once per run and only the
+        documents still waiting for their partner are held.
+        """
+        cancel = self._cancel_event
+        t0 = time.perf_counter()
+        json_files = find_json_inputs([input_dir])
+        if metrics is not None:
+            metrics.add("list", time.perf_counter() - t0, files=len(json_files))
+        if not json_files:
+            self._set_status("Ready.")
+            self._post("call", messagebox.showwarning, "No files", "No JSON files found in input folder.")
+            return
+
+        total = len(json_files)
+        self._set_progress(0, total)
+        self._set_status(f"Converting 0 / {total}")
+
+        done = 0
+        key_strategy = pair_key or DEFAULT_PAIR_KEY
+        merger = (
+            MergeCollector(output_dir, cancel, incremental=incremental, output_format=output_format, jobs=default_jobs())
+            if merge_enabled else None
+        )
+        pairs = PairStream(length_threshold, on_eligible=merger, pair_key=key_strategy, cancel=cancel, rules=rules)
+        pair_seconds = 0.0
+        readings: ReadingsWriter | None = None
+        readings_error: str | None = None
+        if readings_enabled:
+            try:
+                output_dir.mkdir(parents=True, exist_ok=True)
+                readings = ReadingsWriter(default_readings_path(output_dir))
+            except Exception as e:
+                readings_error = str(e)
+
+        def on_result(r: ConvertResult):
+            nonlocal done, pair_seconds
+            done += 1
+            if readings is not None and r.readings is not None:
+                # Written as results arrive, so the rows never pile up in memory
+                key, side, _ = key_strategy.key(r.out_path, r.features)
+                readings.add(r.out_path, r.readings, key, side)
+                r.readings = None
+            if r.ok and r.action != SKIPPED:
+                t = time.perf_counter()
+                pairs.add(r.out_path, r.features, r.doc)
+                r.doc = None
+                pair_seconds += time.perf_counter() - t
+            self._set_progress(done)
+            self._set_status(f"Converting {done} / {total}")
+
+        t0 = time.perf_counter()
+        try:
+            results = convert_batch(
+                json_files,
+                output_dir,
+                keep_docs=merger is not None and merger.wants_docs,
+                incremental=incremental,
+                output_format=output_format,
+                on_result=on_result,
+                cancel=cancel,
+                keep_readings=readings is not None,
+                rules=rules,
+                metrics=metrics,
+                order=key_strategy.order_key,
+            )
+        except BaseException:
+            if readings is not None:
+                readings.discard()
+            raise
+        # Pair checks and merges done along the way aren't conversion time
+        convert_seconds = time.perf_counter() - t0 - pair_seconds
+        features = features_by_output_path(results)
+        # Seed the output folder's index so a later "Analyze OPM Folder" is instant
+        record_features(output_dir, features, hashes_by_output_path(results))
+
+        # Skipped (up-to-date) outputs weren't opened; get their features from the index
+        skipped = [r.out_path for r in results if r.ok and r.action == SKIPPED]
+        if skipped:
+            features.update(load_cached_features(output_dir, skipped, prune=False, rules=rules)[0])
 
         ok_msgs: list[str] = []
         err_msgs: list[str] = []
+        if readings is not None:
+            # Skipped outputs weren't opened by the converter, so read them here
+            for p in skipped:
+                readings.add_file(p, pair_key, features.get(p))
+            readings.close()
+            self._readings_msgs(readings.result(), ok_msgs, err_msgs)
+        elif readings_error:
+            err_msgs.append(f"❌ READINGS   Failed to write table: {readings_error}")
+
+        # Report in input order, not pool completion order
+        produced_opm_paths: list[Path] = []
+        json_ok = 0
+        json_fail = 0
+        for r in results:
+            if r.ok and r.action == SKIPPED:
+                # Not listed one by one; counted in the summary
+                produced_opm_paths.append(r.out_path)
+            elif r.ok:
+                json_ok += 1
+                produced_opm_paths.append(r.out_path)
+                verb = "UPDATED  " if r.action == UPDATED else "CONVERTED"
+                ok_msgs.append(f"✅ {verb}  {r.src_path.name}  ->  {r.out_path.name}")
+            else:
+                json_fail += 1
+                err_msgs.append(f"❌ FAILED     {r.src_path.name}  ->  {r.error}")
+
+        if cancel.is_set():
+            if merger is not None:
+                merger.result()
+            self._log_cancelled(ok_msgs, err_msgs)
+            return
 
-        self.convert_btn.config(state="disabled")
-        try:
-            total = len(json_files)
-            self.progress["value"] = 0
-            self.progress["maximum"] = total
-            self._set_status(f"Converting 0 / {total}")
+        t = time.perf_counter()
+        if skipped:
+            self._set_status("Analyzing A/Z pairs...")
+            for p in skipped:
+                pairs.add(p, features.get(p))
+        analysis = pairs.result()
+        pair_seconds += time.perf_counter() - t
+        if metrics is not None:
+            # Merges done inline are the merge stage's time
+            inline = merger.inline_seconds if merger is not None else 0.0
+            metrics.add("analyze", pair_seconds - inline, files=len(produced_opm_paths))
+
+        self._merge_and_report(
+            analysis,
+            merger,
+            produced_opm_paths,
+            output_dir,
+            merge_enabled,
+            punch_enabled,
+            ok_msgs,
+            err_msgs,
+            json_ok,
+            json_fail,
+            convert_counts=count_actions(results) if incremental else None,
+            output_format=output_format,
+            bytes_written=total_bytes_written(results),
+            convert_seconds=convert_seconds,
+            zip_enabled=zip_enabled,
+            run_report=run_report,
+            metrics=metrics,
+        )
 
-            produced_opm_paths: list[Path] = []
-            json_ok = 0
-            json_fail = 0
+    def _merge_and_report(
+        self,
+        analysis: dict,
+        merger: MergeCollector | None,
+        opm_paths: list[Path],
+        out_dir: Path,
+        merge_enabled: bool,
+        punch_enabled: bool,
+        ok_msgs: list[str],
+        err_msgs: list[str],
+        json_ok: int = 0,
+        json_fail: int = 0,
+        convert_counts: dict[str, int] | None = None,
+        output_format: str = "pretty",
+        bytes_written: int = 0,
+        convert_seconds: float = 0.0,
+        zip_enabled: bool = False,
+        run_report: bool = False,
+        metrics: RunMetrics | None = None,
+    ):
+        """
+        Worker thread: the tail of Convert, once every pair has been checked.
 
-            for i, src_path in enumerate(json_files, start=1):
-                try:
-                    src_json = load_json(src_path)
-                    opm_json = map_pxm_json_to_opm(src_json)
-                    out_path = self.output_dir / (src_path.stem + ".opm")
+        `convert_counts` (from count_actions) marks an incremental convert run:
+        the summary then breaks conversions down, and merges that are already
+        newer than their inputs are skipped instead of failing as duplicates.
+        `bytes_written` / `convert_seconds` describe the convert step.
+        """
+        cancel = self._cancel_event
+        if merger is not None:
+            # Tally (and wait for) the merges now, so the ZIP includes them
+            merger.result()
+        if zip_enabled and not cancel.is_set():
+            self._set_status("Packing ZIP...")
+            zip_path = default_output_zip_path(out_dir)
+            try:
+                write_output_zip(zip_path, run_outputs(out_dir, opm_paths))
+                ok_msgs.append(f"✅ ZIP        {len(opm_paths)} results  ->  {zip_path.name}")
+            except OSError as e:
+                err_msgs.append(f"❌ ZIP        Failed to write {zip_path.name}: {e}")
+        self._report(
+            analysis,
+            merger,
+            out_dir,
+            merge_enabled,
+            punch_enabled,
+            ok_msgs,
+            err_msgs,
+            json_ok,
+            json_fail,
+            convert_counts,
+            output_format,
+            bytes_written,
+            convert_seconds,
+            run_report,
+            metrics,
+        )
 
-                    if out_path.exists():
-                        raise FileExistsError(self._explain_duplicate_output(out_path, src_path))
+    def _report(
+        self,
+        analysis: dict,
+        merger: MergeCollector | None,
+        out_dir: Path,
+        merge_enabled: bool,
+        punch_enabled: bool,
+        ok_msgs: list[str],
+        err_msgs: list[str],
+        json_ok: int = 0,
+        json_fail: int = 0,
+        convert_counts: dict[str, int] | None = None,
+        output_format: str = "pretty",
+        bytes_written: int = 0,
+        convert_seconds: float = 0.0,
+        run_report: bool = False,
+        metrics: RunMetrics | None = None,
+    ):
+        """
+        Worker thread: merge tally, punch list and the Results / Errors / Summary log.
 
-                    with out_path.open("w", encoding="utf-8") as f:
-                        json.dump(opm_json, f, indent=2)
+        With `metrics`, the merge and punch list stages are added to it and
+        the stage times end the Summary; `run_report` also writes them to a
+        JSON run report in `out_dir`.
+        """
+        cancel = self._cancel_event
+        incremental = convert_counts is not None
+        stats = analysis["stats"]
+        error_blocks = analysis["error_blocks"]
+        punch_rows = analysis["punch_rows"]
+        orphans: list[Orphan] = analysis["orphans"]
+        length_threshold = analysis["length_threshold"]
+
+        # Merge (optional)
+        merge_stats = {"merged": 0, "up_to_date": 0, "write_errors": 0, "not_eligible": 0}
+        if merger is not None:
+            merge_out = merger.result()
+            if metrics is not None:
+                metrics.add(
+                    "merge", merge_out["seconds"], files=merge_out["merged"], nbytes=merge_out["bytes_written"],
+                    errors=merge_out["write_errors"],
+                )
+            merge_stats["merged"] = merge_out["merged"]
+            merge_stats["up_to_date"] = merge_out["up_to_date"]
+            merge_stats["write_errors"] = merge_out["write_errors"]
+            ok_msgs.extend(merge_out["merged_msgs"])
+            err_msgs.extend(merge_out["merge_write_errors"])
+
+        if cancel.is_set():
+            self._log_cancelled(ok_msgs, err_msgs)
+            return
 
-                    produced_opm_paths.append(out_path)
-                    json_ok += 1
-                    ok_msgs.append(f"✅ CONVERTED  {src_path.name}  ->  {out_path.name}")
+        pairs_checked = stats.get("pairs_checked", 0)
+        eligible = stats.get("eligible_pairs", 0)
+        merge_stats["not_eligible"] = max(0, pairs_checked - eligible)
 
+        # Punch list (optional) - CSV only
+        punch_out_path = None
+        if punch_enabled:
+            if punch_rows:
+                punch_out_path = default_punch_list_path(out_dir, punch_rows)
+                t0 = time.perf_counter()
+                try:
+                    write_punch_list_csv(punch_out_path, punch_rows)
+                    ok_msgs.append(f"✅ PUNCH LIST  Created  ->  {punch_out_path.name}")
+                    self._post("call", self._set_punch_result, punch_rows, punch_out_path)
+                except Exception as e:
+                    punch_out_path = None
+                    err_msgs.append(f"❌ PUNCH LIST  Failed to write CSV: {e}")
+                if metrics is not None:
+                    size = punch_out_path.stat().st_size if punch_out_path is not None else 0
+                    metrics.add(
+                        "punch", time.perf_counter() - t0, nbytes=size, errors=int(punch_out_path is None),
+                    )
+            else:
+                ok_msgs.append("✅ PUNCH LIST  No issues found; no Punch List created.")
+
+        # Run report (optional); every stage has been timed by now
+        report_path = None
+        if metrics is not None:
+            metrics.stop()
+            if run_report:
+                report_path = default_run_report_path(out_dir, metrics.command)
+                try:
+                    metrics.write_report(
+                        report_path,
+                        jobs=default_jobs(),
+                        output_format=output_format,
+                        length_threshold=length_threshold,
+                        summary={
+                            "json_converted": json_ok,
+                            "json_failed": json_fail,
+                            "pairs_checked": pairs_checked,
+                            "orphans": len(orphans),
+                            "stats": stats,
+                            "merge": merge_stats if merge_enabled else None,
+                            "punch_list": str(punch_out_path) if punch_out_path else None,
+                        },
+                    )
+                    ok_msgs.append(f"✅ RUN REPORT  Created  ->  {report_path.name}")
                 except Exception as e:
-                    json_fail += 1
-                    err_msgs.append(f"❌ FAILED     {src_path.name}  ->  {e}")
-
-                self.progress["value"] = i
-                self._set_status(f"Converting {i} / {total}")
-
-            # Analyze A/Z from produced outputs
-            analysis = self._analyze_pairs_from_opm_paths(produced_opm_paths)
-            stats = analysis["stats"]
-            error_blocks = analysis["error_blocks"]
-            eligible_pairs = analysis["eligible_pairs"]
-            punch_rows = analysis["punch_rows"]
-            length_threshold = analysis["length_threshold"]
-
-            # Merge (optional)
-            merge_stats = {"merged": 0, "write_errors": 0, "not_eligible": 0}
-            if self.merge_var.get():
-                merge_out = self._merge_eligible_pairs(eligible_pairs, self.output_dir)
-                merge_stats["merged"] = merge_out["merged"]
-                merge_stats["write_errors"] = merge_out["write_errors"]
-                ok_msgs.extend(merge_out["merged_msgs"])
-                err_msgs.extend(merge_out["merge_write_errors"])
-
-            pairs_checked = stats.get("pairs_checked", 0)
-            eligible = stats.get("eligible_pairs", 0)
-            merge_stats["not_eligible"] = max(0, pairs_checked - eligible)
-
-            # Punch list (optional) - CSV only
-            punch_out_path = None
-            if self.generate_punch_var.get():
-                if punch_rows:
-                    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    ose = self._guess_ose_from_any(punch_rows) or "OSE"
-                    punch_out_path = self.output_dir / f"Punch List - {ose} - {ts}.csv"
-                    try:
-                        self._write_punch_list_csv(punch_out_path, punch_rows)
-                        ok_msgs.append(f"✅ PUNCH LIST  Created  ->  {punch_out_path.name}")
-                        self.last_punch_rows = punch_rows
-                        self.last_punch_path = punch_out_path
-                        self.export_punch_btn.config(state="normal")
-                    except Exception as e:
-                        err_msgs.append(f"❌ PUNCH LIST  Failed to write CSV: {e}")
-                else:
-                    ok_msgs.append("✅ PUNCH LIST  No issues found; no Punch List created.")
-
-            # RESULTS (top)
-            self._log_section_plain("Results")
-            for m in ok_msgs:
-                self._log(m, "ok")
-
-            # ERRORS (bottom-ish, before summary)
-            has_any_errors = bool(err_msgs) or bool(error_blocks) or json_fail > 0
-            if has_any_errors:
-                self._log_section_plain("Errors")
-                for m in err_msgs:
-                    self._log(m, "err")
-
-                for block in error_blocks:
-                    # block is already formatted; includes whether it's FAILURE vs MISMATCH
-                    for ln in block:
-                        if "λ" in ln:
-                            self._log_lambda_line(ln, "err")
-                        else:
-                            self._log(ln, "err")
-                    self._log("", "err")
-
-            # SUMMARY
-            self._log_section_plain("Summary")
-
-            summary_lines = [
-                f"JSON Converted: {json_ok}   Failed: {json_fail}",
-                f"A/Z pairs checked: {pairs_checked}",
-                "",
-                "Issue counts (pairs may include multiple issues):",
-                f"  🔥  High Loss failures: {stats.get('high_loss_pairs', 0)}",
-                f"  🔀  Polarity mismatches/unknown: {stats.get('polarity_issue_pairs', 0)}",
-                f"  λ  Wavelength mismatches: {stats.get('wavelength_mismatches', 0)}",
-                f"  📏  Length missing/mismatched: {stats.get('length_issue_pairs', 0)}",
-                "",
-                "Merge",
-                f"  Eligible pairs to merge: {eligible} of {pairs_checked}   (threshold Δ={self._fmt(length_threshold)})",
-                f"  ✅  Merged: {merge_stats['merged']}" if self.merge_var.get() else "  (merge disabled)",
+                    report_path = None
+                    err_msgs.append(f"❌ RUN REPORT  Failed to write: {e}")
+
+        # RESULTS (top)
+        self._log_section_plain("Results")
+        for m in ok_msgs:
+            self._log(m, "ok")
+
+        # ERRORS (bottom-ish, before summary)
+        has_any_errors = bool(err_msgs) or bool(error_blocks) or bool(orphans) or json_fail > 0
+        if has_any_errors:
+            self._log_section_plain("Errors")
+            for m in err_msgs:
+                self._log(m, "err")
+
+            for o in orphans:
+                self._log(f"⚠ ORPHAN     {o.message()}", "err")
+            if orphans:
+                self._log("", "err")
+
+            for block in error_blocks:
+                # block is already formatted; includes whether it's FAILURE vs MISMATCH
+                for ln in block:
+                    self._log(ln, "err")
+                self._log("", "err")
+
+        # SUMMARY
+        self._log_section_plain("Summary")
+
+        summary_lines = [
+            f"JSON Converted: {json_ok}   Failed: {json_fail}",
+        ]
+        if incremental:
+            summary_lines += [
+                f"  New: {convert_counts[CONVERTED]}   Updated: {convert_counts[UPDATED]}"
+                f"   Skipped (up to date): {convert_counts[SKIPPED]}",
+            ]
+        if bytes_written:
+            summary_lines += [
+                f"  Written: {bytes_written / 1e6:.1f} MB in {convert_seconds:.1f} s"
+                f"   ({mb_per_s(bytes_written, convert_seconds)} MB/s, {output_format})",
+            ]
+        summary_lines += [
+            f"A/Z pairs checked: {pairs_checked}",
+            f"Unpaired files (orphans): {len(orphans)}",
+            "",
+            "Issue counts (pairs may include multiple issues):",
+            f"  🔥  High Loss failures: {stats.get('high_loss_pairs', 0)}",
+            f"  🔀  Polarity mismatches/unknown: {stats.get('polarity_issue_pairs', 0)}",
+            f"  λ  Wavelength mismatches: {stats.get('wavelength_mismatches', 0)}",
+            f"  📏  Length missing/mismatched: {stats.get('length_issue_pairs', 0)}",
+            f"  📐  Rule file checks failed: {stats.get('rule_issue_pairs', 0)}",
+            "",
+            "Merge",
+            f"  Eligible pairs to merge: {eligible} of {pairs_checked}   (threshold Δ={fmt(length_threshold)})",
+            f"  ✅  Merged: {merge_stats['merged']}" if merge_enabled else "  (merge disabled)",
+        ]
+        if merge_enabled and incremental:
+            summary_lines += [f"  ⏭  Up to date: {merge_stats['up_to_date']}"]
+        if merge_enabled:
+            summary_lines += [
+                f"  ⛔  Not eligible: {merge_stats['not_eligible']}",
+                f"  ⚠  Merge write errors: {merge_stats['write_errors']}",
             ]
-            if self.merge_var.get():
-                summary_lines += [
-                    f"  ⛔  Not eligible: {merge_stats['not_eligible']}",
-                    f"  ⚠  Merge write errors: {merge_stats['write_errors']}",
-                ]
-
-            if self.generate_punch_var.get():
-                if punch_out_path:
-                    summary_lines += ["", f"Punch List: {punch_out_path.name}"]
-                else:
-                    summary_lines += ["", "Punch List: (not created)"]
-
-            for ln in summary_lines:
-                if "λ" in ln:
-                    self._log_lambda_line(ln, "sum")
-                else:
-                    self._log(ln, "sum")
 
+        if punch_enabled:
+            if punch_out_path:
+                summary_lines += ["", f"Punch List: {punch_out_path.name}"]
+            else:
+                summary_lines += ["", "Punch List: (not created)"]
+
+        if metrics is not None:
+            summary_lines += ["", "Timing", f"  ⏱  {metrics.summary_line()}"]
+            if report_path is not None:
+                summary_lines += [f"  Run report: {report_path.name}"]
+
+        for ln in summary_lines:
+            self._log(ln, "sum")
+
+        if json_ok or json_fail:
             self._set_status(f"Done. Converted: {json_ok}  Failed: {json_fail}")
+        else:
+            self._set_status("Done.")
 
-        finally:
-            self.convert_btn.config(state="normal")
+    def _readings_msgs(self, result: dict, ok_msgs: list[str], err_msgs: list[str]):
+        ok_msgs.append(
+            f"✅ READINGS   {result['rows']} rows from {result['files']} files  ->  "
+            f"{result['path'].name}   ({result['format']})"
+        )
+        for path, error in result["errors"]:
+            err_msgs.append(f"❌ READINGS   {path.name}  ->  {error}")
+
+    def _log_cancelled(self, ok_msgs: list[str], err_msgs: list[str]):
+        self._log_section_plain("Results")
+        for m in ok_msgs:
+            self._log(m, "ok")
+        if err_msgs:
+            self._log_section_plain("Errors")
+            for m in err_msgs:
+                self._log(m, "err")
+        self._log_section_plain("Summary")
+        self._log("⛔  Cancelled by user; remaining steps were skipped.", "sum")
+        self._set_status("Cancelled.")
 
     def _make_text_readonly_but_copyable(self, text):
         """
@@ -506,131 +1144,244 @@ class JSON2OPMApp(tk.Tk):
 
         out_dir = self.output_dir or self.opm_results_dir
 
+        pair_key = self._get_pair_key()
+        if pair_key is None:
+            return
+        rules_ok, rules = self._get_rules()
+        if not rules_ok:
+            return
+
         self._persist_length_threshold()
         self._persist_merge_toggle()
         self._persist_punch_toggle()
+        self._persist_compact_toggle()
+        self._persist_readings_toggle()
+        self._persist_pair_key()
+        self._persist_rules_path()
+        self._persist_run_report_toggles()
+
+        # The folder is listed on the worker thread (it may be a large network share)
+        metrics, run_report = self._new_metrics("analyze")
+        self._reset_run_state()
+        self._set_status("Listing OPM files...")
+        self._start_job(
+            self._run_measured,
+            metrics,
+            self._run_analyze,
+            self.opm_results_dir,
+            out_dir,
+            self._get_length_threshold(),
+            bool(self.merge_var.get()),
+            bool(self.generate_punch_var.get()),
+            self._get_output_format(),
+            pair_key,
+            bool(self.export_readings_var.get()),
+            rules,
+            run_report,
+        )
 
-        opm_files = list(self.opm_results_dir.glob("*.opm"))
-        if not opm_files:
-            messagebox.showwarning("No files", "No .opm files found in the selected results folder.")
+    def _run_analyze(
+        self,
+        opm_dir: Path,
+        out_dir: Path,
+        length_threshold: float,
+        merge_enabled: bool,
+        punch_enabled: bool,
+        output_format: str = "pretty",
+        pair_key: PairKeyStrategy | None = None,
+        readings_enabled: bool = False,
+        rules: RuleSet | None = None,
+        run_report: bool = False,
+        metrics: RunMetrics | None = None,
+    ):
+        """
+        Worker thread: stream the folder (pairs are checked as soon as both
+        sides are listed, features come from the folder's index and files it
+        doesn't know are parsed across a process pool), then report.
+        """
+        cancel = self._cancel_event
+        merger = (
+            MergeCollector(out_dir, cancel, output_format=output_format, jobs=default_jobs())
+            if merge_enabled else None
+        )
+        index = open_feature_index(opm_dir, rules)
+        seen: list[Path] = []
+        checks: list[PairCheck] = []
+        orphans: list[Orphan] = []
+        t0 = time.perf_counter()
+        try:
+            for check in iter_folder_pair_checks(
+                opm_dir, length_threshold, cancel=cancel, on_eligible=merger, index=index, seen=seen,
+                pair_key=pair_key, orphans=orphans, jobs=default_jobs(), rules=rules,
+            ):
+                checks.append(check)
+                self._set_status(f"Analyzing A/Z pairs {len(checks)}   ({len(seen)} files listed)")
+        finally:
+            if index is not None:
+                index.close()
+        if metrics is not None:
+            # With one job the merges ran inside the analysis; they are the merge stage's time
+            inline = merger.inline_seconds if merger is not None else 0.0
+            metrics.add("analyze", time.perf_counter() - t0 - inline, files=len(seen))
+
+        if not seen:
+            self._set_status("Ready.")
+            self._post("call", messagebox.showwarning, "No files", "No .opm files found in the selected results folder.")
             return
 
-        self._clear_log()
-        self.export_punch_btn.config(state="disabled")
-        self.last_punch_rows = []
-        self.last_punch_path = None
-
         ok_msgs: list[str] = []
+        if index is not None and (index.hits or index.parsed):
+            ok_msgs.append(f"✅ INDEX      {index.hits} unchanged (cached), {index.parsed} new/changed (parsed)")
+
         err_msgs: list[str] = []
+        if readings_enabled and not cancel.is_set():
+            t0 = time.perf_counter()
+            self._export_readings(opm_dir, out_dir, seen, pair_key, ok_msgs, err_msgs)
+            if metrics is not None:
+                metrics.add("readings", time.perf_counter() - t0, files=len(seen))
+
+        self._set_progress(len(checks), len(checks))
+        self._report(
+            summarize_pair_checks(checks, length_threshold, orphans),
+            merger,
+            out_dir,
+            merge_enabled,
+            punch_enabled,
+            ok_msgs,
+            err_msgs,
+            output_format=output_format,
+            run_report=run_report,
+            metrics=metrics,
+        )
 
-        self.analyze_btn.config(state="disabled")
+    def _export_readings(
+        self,
+        opm_dir: Path,
+        out_dir: Path,
+        opm_paths: list[Path],
+        pair_key: PairKeyStrategy | None,
+        ok_msgs: list[str],
+        err_msgs: list[str],
+    ):
+        """Worker thread: second pass over an analyzed folder to write the readings table."""
+        total = len(opm_paths)
+        self._set_progress(0, total)
+
+        def on_file(done: int):
+            self._set_progress(done)
+            self._set_status(f"Exporting readings {done} / {total}")
+
+        features: dict[Path, OpmFeatures] = {}
+        if pair_key is not None and pair_key.uses_features:
+            # Just refreshed by the analysis, so these are all cache hits
+            features = load_cached_features(opm_dir, opm_paths, prune=False)[0]
         try:
-            self.progress["value"] = 0
-            self.progress["maximum"] = len(opm_files)
-            self._set_status("Scanning OPM files...")
-
-            for i, _ in enumerate(opm_files, start=1):
-                self.progress["value"] = i
-                if i % 25 == 0 or i == len(opm_files):
-                    self._set_status(f"Found {i} / {len(opm_files)} OPM files")
-
-            analysis = self._analyze_pairs_from_opm_paths(opm_files)
-            stats = analysis["stats"]
-            error_blocks = analysis["error_blocks"]
-            eligible_pairs = analysis["eligible_pairs"]
-            punch_rows = analysis["punch_rows"]
-            length_threshold = analysis["length_threshold"]
-
-            # Merge (optional)
-            merge_stats = {"merged": 0, "write_errors": 0, "not_eligible": 0}
-            if self.merge_var.get():
-                merge_out = self._merge_eligible_pairs(eligible_pairs, out_dir)
-                merge_stats["merged"] = merge_out["merged"]
-                merge_stats["write_errors"] = merge_out["write_errors"]
-                ok_msgs.extend(merge_out["merged_msgs"])
-                err_msgs.extend(merge_out["merge_write_errors"])
-
-            pairs_checked = stats.get("pairs_checked", 0)
-            eligible = stats.get("eligible_pairs", 0)
-            merge_stats["not_eligible"] = max(0, pairs_checked - eligible)
-
-            # Punch list (optional) - CSV
-            punch_out_path = None
-            if self.generate_punch_var.get():
-                if punch_rows:
-                    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    ose = self._guess_ose_from_any(punch_rows) or "OSE"
-                    punch_out_path = out_dir / f"Punch List - {ose} - {ts}.csv"
-                    try:
-                        self._write_punch_list_csv(punch_out_path, punch_rows)
-                        ok_msgs.append(f"✅ PUNCH LIST  Created  ->  {punch_out_path.name}")
-                        self.last_punch_rows = punch_rows
-                        self.last_punch_path = punch_out_path
-                        self.export_punch_btn.config(state="normal")
-                    except Exception as e:
-                        err_msgs.append(f"❌ PUNCH LIST  Failed to write CSV: {e}")
-                else:
-                    ok_msgs.append("✅ PUNCH LIST  No issues found; no Punch List created.")
-
-            # RESULTS
-            self._log_section_plain("Results")
-            for m in ok_msgs:
-                self._log(m, "ok")
-
-            # ERRORS
-            has_any_errors = bool(err_msgs) or bool(error_blocks)
-            if has_any_errors:
-                self._log_section_plain("Errors")
-                for m in err_msgs:
-                    self._log(m, "err")
-
-                for block in error_blocks:
-                    for ln in block:
-                        if "λ" in ln:
-                            self._log_lambda_line(ln, "err")
-                        else:
-                            self._log(ln, "err")
-                    self._log("", "err")
-
-            # SUMMARY
-            self._log_section_plain("Summary")
-
-            summary_lines = [
-                f"JSON Converted: 0   Failed: 0",
-                f"A/Z pairs checked: {pairs_checked}",
-                "",
-                "Issue counts (pairs may include multiple issues):",
-                f"  🔥  High Loss failures: {stats.get('high_loss_pairs', 0)}",
-                f"  🔀  Polarity mismatches/unknown: {stats.get('polarity_issue_pairs', 0)}",
-                f"  λ  Wavelength mismatches: {stats.get('wavelength_mismatches', 0)}",
-                f"  📏  Length missing/mismatched: {stats.get('length_issue_pairs', 0)}",
-                "",
-                "Merge",
-                f"  Eligible pairs to merge: {eligible} of {pairs_checked}   (threshold Δ={self._fmt(length_threshold)})",
-                f"  ✅  Merged: {merge_stats['merged']}" if self.merge_var.get() else "  (merge disabled)",
-            ]
-            if self.merge_var.get():
-                summary_lines += [
-                    f"  ⛔  Not eligible: {merge_stats['not_eligible']}",
-                    f"  ⚠  Merge write errors: {merge_stats['write_errors']}",
-                ]
-
-            if self.generate_punch_var.get():
-                if punch_out_path:
-                    summary_lines += ["", f"Punch List: {punch_out_path.name}"]
-                else:
-                    summary_lines += ["", "Punch List: (not created)"]
-
-            for ln in summary_lines:
-                if "λ" in ln:
-                    self._log_lambda_line(ln, "sum")
-                else:
-                    self._log(ln, "sum")
+            result = export_readings(
+                default_readings_path(out_dir), opm_paths, pair_key,
+                features=features, cancel=self._cancel_event, on_progress=on_file,
+            )
+        except Exception as e:
+            err_msgs.append(f"❌ READINGS   Failed to write table: {e}")
+            return
+        self._readings_msgs(result, ok_msgs, err_msgs)
 
-            self._set_status("Done.")
+    # ----------------------------
+    # Fleet loss statistics
+    # ----------------------------
 
-        finally:
-            self.analyze_btn.config(state="normal")
+    def fleet_stats_opm_folder(self):
+        if not self.opm_results_dir or not self.opm_results_dir.exists():
+            messagebox.showerror("Missing folder", "Please select an OPM results folder first.")
+            return
+        from json2opm.fleet import require_numpy
+
+        try:
+            require_numpy()
+        except RuntimeError as e:
+            messagebox.showerror("NumPy not installed", str(e))
+            return
+
+        pair_key = self._get_pair_key()
+        if pair_key is None:
+            return
+        self._persist_pair_key()
+
+        self._reset_run_state()
+        self._set_status("Listing OPM files...")
+        self._start_job(self._run_fleet_stats, self.opm_results_dir, pair_key)
+
+    def _run_fleet_stats(self, opm_dir: Path, pair_key: PairKeyStrategy):
+        """Worker thread: load every reading of the folder, then log the statistics."""
+        from json2opm.fleet import fleet_stats, load_reading_table
+
+        cancel = self._cancel_event
+        paths = sorted(iter_opm_files(opm_dir))
+        if not paths:
+            self._set_status("Ready.")
+            self._post("call", messagebox.showwarning, "No files", "No .opm files found in the selected results folder.")
+            return
+
+        features: dict[Path, OpmFeatures] = {}
+        if pair_key.uses_features:
+            features = load_cached_features(opm_dir, paths, prune=False)[0]
+
+        def on_file(done: int, total: int):
+            self._set_progress(done, total)
+            self._set_status(f"Reading {done} / {total}")
+
+        table = load_reading_table(
+            paths, pair_key, jobs=default_jobs(), cancel=cancel, on_progress=on_file, features=features
+        )
+        if cancel.is_set():
+            self._log_cancelled([], [])
+            return
+        stats = fleet_stats(table, top=10)
+
+        self._log_section_plain("Loss by wavelength")
+        for w in stats["per_wavelength"]:
+            p = w["percentiles_db"]
+            self._log(
+                f"λ {w['wavelength_nm']} nm   n={w['readings']}   mean={fmt(w['mean_db'])} dB   "
+                f"p50={fmt(p['p50'])}  p95={fmt(p['p95'])}  p99={fmt(p['p99'])}   "
+                f"max={fmt(w['max_db'])}   fail={w['fail']}   outliers={w['outliers']}",
+                "ok",
+            )
+
+        az = stats["az_delta"]
+        self._log_section_plain("A vs Z loss delta")
+        for w in az["per_wavelength"]:
+            self._log(
+                f"λ {w['wavelength_nm']} nm   matched={w['matched']}   mean(A-Z)={fmt(w['mean_db'])} dB   "
+                f"|Δ| p50={fmt(w['p50_abs_db'])}  p95={fmt(w['p95_abs_db'])}  max={fmt(w['max_abs_db'])}",
+                "ok",
+            )
+
+        if stats["outliers"] or az["largest"] or table.errors:
+            self._log_section_plain("Errors")
+            for path, error in table.errors:
+                self._log(f"❌ UNREADABLE  {path.name}  ->  {error}", "err")
+            for o in stats["outliers"]:
+                self._log(
+                    f"⚠ OUTLIER    {o['file']}  fiber {o['fiber']}  λ {o['wavelength_nm']}  "
+                    f"{fmt(o['loss_db'])} dB  ({fmt(o['beyond_fence_db'])} dB beyond fence)",
+                    "err",
+                )
+            for d in az["largest"]:
+                self._log(
+                    f"⚠ A/Z Δ      {d['pair_key']}  fiber {d['fiber']}  λ {d['wavelength_nm']}  "
+                    f"A={fmt(d['a_db'])}  Z={fmt(d['z_db'])}  Δ={fmt(d['delta_db'])} dB",
+                    "err",
+                )
+
+        self._log_section_plain("Summary")
+        for ln in [
+            f"Files: {stats['files']}   Unreadable: {stats['unreadable_files']}",
+            f"Readings: {stats['readings']}   Fail: {stats['fail_readings']}",
+            f"A/Z pairs: {stats['pairs']}   Fiber/wavelength matches: {az['matched']}",
+            "(outlier and A/Z Δ lists show the 10 largest)",
+        ]:
+            self._log(ln, "sum")
+        self._set_status("Done.")
 
     # ----------------------------
     # Export last punch list again
@@ -650,716 +1401,11 @@ class JSON2OPMApp(tk.Tk):
             return
 
         try:
-            self._write_punch_list_csv(Path(fp), self.last_punch_rows)
+            write_punch_list_csv(Path(fp), self.last_punch_rows)
             messagebox.showinfo("Saved", f"Punch List saved:\n{fp}")
         except Exception as e:
             messagebox.showerror("Export failed", str(e))
 
-    # ----------------------------
-    # A/Z Pairing + analysis logic
-    # ----------------------------
-
-    def _extract_az_pair_key(self, stem: str) -> tuple[str | None, str | None]:
-        """
-        Convert filename stem into:
-          pair_key: same for A and Z
-          side: "A" or "Z"
-        Examples:
-          P1_A03_C06_...   -> pair_key=P1_03_C06_...  side=A
-          P1_Z03_C06_...   -> pair_key=P1_03_C06_...  side=Z
-        """
-        m = re.match(r"^(P\d+)_([AZ])(\d{2})_(.+)$", stem, re.IGNORECASE)
-        if not m:
-            return None, None
-        p, side, num, rest = m.group(1), m.group(2).upper(), m.group(3), m.group(4)
-        return f"{p}_{num}_{rest}", side
-
-    def _analyze_pairs_from_opm_paths(self, opm_paths: list[Path]) -> dict:
-        pairs: dict[str, dict[str, Path]] = {}
-        for p in opm_paths:
-            key, side = self._extract_az_pair_key(p.stem)
-            if not key or side not in ("A", "Z"):
-                continue
-            pairs.setdefault(key, {})[side] = p
-
-        length_threshold = self._get_length_threshold()
-
-        stats = {
-            "pairs_checked": 0,
-
-            # merge-blocking mismatches ONLY
-            "mismatched_pairs": 0,
-            "polarity_issue_pairs": 0,     # ✅ NEW: missing OR mismatch OR pol-status unknown
-            "wavelength_mismatches": 0,
-            "length_issue_pairs": 0,
-
-            # failure-only (not merge-blocking)
-            "high_loss_pairs": 0,
-
-            "eligible_pairs": 0,
-        }
-
-        error_blocks: list[list[str]] = []
-        eligible_pairs: list[tuple[str, Path, Path]] = []
-        punch_pair_docs: list[dict] = []
-        punch_rows: list[dict] = []
-
-        for key, sides in sorted(pairs.items()):
-            if "A" not in sides or "Z" not in sides:
-                continue
-
-            stats["pairs_checked"] += 1
-
-            try:
-                a_doc = load_json(sides["A"])
-                z_doc = load_json(sides["Z"])
-                punch_pair_docs.append({"pair_key": key, "A_doc": a_doc, "Z_doc": z_doc})
-
-                # -------- High loss (failure-only) --------
-                a_high_loss = self._has_high_loss(a_doc)
-                z_high_loss = self._has_high_loss(z_doc)
-                high_loss = a_high_loss or z_high_loss
-                if high_loss:
-                    stats["high_loss_pairs"] += 1
-
-                # -------- Polarity --------
-                expected_pol = self._get_expected_polarity(a_doc) or self._get_expected_polarity(z_doc)
-                a_pol = self._get_actual_polarity(a_doc)
-                z_pol = self._get_actual_polarity(z_doc)
-                pol_status_a = self._get_polarity_status(a_doc)
-                pol_status_z = self._get_polarity_status(z_doc)
-
-                polarity_missing = (a_pol is None) or (z_pol is None)
-                polarity_mismatch = (a_pol is not None and z_pol is not None and a_pol != z_pol)
-                polarity_unknown = (pol_status_a == "Unknown") or (pol_status_z == "Unknown")
-
-                polarity_issue = polarity_missing or polarity_mismatch or polarity_unknown
-
-                # -------- Wavelength (merge blocker) --------
-                a_wl = self._get_wavelengths_nm(a_doc)
-                z_wl = self._get_wavelengths_nm(z_doc)
-                wavelength_mismatch = (a_wl != z_wl)
-                if wavelength_mismatch:
-                    stats["wavelength_mismatches"] += 1
-
-                # -------- Length (merge blocker) --------
-                a_len, a_missing = self._get_length_numeric_or_missing(a_doc)
-                z_len, z_missing = self._get_length_numeric_or_missing(z_doc)
-                length_missing = a_missing or z_missing
-
-                length_delta = None
-                length_mismatch = False
-                if a_len is not None and z_len is not None:
-                    length_delta = abs(float(a_len) - float(z_len))
-                    length_mismatch = (length_delta > length_threshold)
-
-                length_issue = length_missing or length_mismatch
-                if length_issue:
-                    stats["length_issue_pairs"] += 1
-
-                # -------- Merge blockers (MISMATCH definition) --------
-                has_merge_blocker = polarity_missing or polarity_mismatch or wavelength_mismatch or length_issue
-
-                # Count polarity issue pairs (independent of merge blocker)
-                if polarity_issue:
-                    stats["polarity_issue_pairs"] += 1
-
-                # Punch row if any issue
-                if has_merge_blocker or high_loss:
-                    punch_rows.append(self._build_punch_row(
-                        pair_key=key,
-                        a_doc=a_doc,
-                        z_doc=z_doc,
-                        mismatch=has_merge_blocker,
-                        failure_high_loss=high_loss,
-                        a_fail=a_high_loss,
-                        z_fail=z_high_loss,
-                        polarity_issue=polarity_issue,
-                        wavelength_issue=wavelength_mismatch,
-                        length_issue=length_issue,
-                    ))
-
-                # -------- Error blocks rendering --------
-                if high_loss and not has_merge_blocker:
-                    side_txt = "A" if a_high_loss and not z_high_loss else "Z" if z_high_loss and not a_high_loss else "A+Z"
-                    error_blocks.append([
-                        f"❌ A/Z FAILURE   {key}",
-                        "  🔥 | High Loss",
-                        f"    Side: {side_txt}",
-                        "    One or more readings have Status=Fail",
-                        "",
-                    ])
-                    eligible_pairs.append((key, sides["A"], sides["Z"]))
-                    continue
-
-                if not has_merge_blocker and not high_loss:
-                    eligible_pairs.append((key, sides["A"], sides["Z"]))
-                    continue
-
-                if has_merge_blocker:
-                    stats["mismatched_pairs"] += 1
-
-                    lines: list[str] = [f"❌ A/Z MISMATCH  {key}"]
-
-                    if high_loss:
-                        side_txt = "A" if a_high_loss and not z_high_loss else "Z" if z_high_loss and not a_high_loss else "A+Z"
-                        lines += [
-                            "  🔥 | High Loss",
-                            f"    Side: {side_txt}",
-                            "    One or more readings have Status=Fail",
-                            "",
-                        ]
-
-                    if polarity_missing or polarity_mismatch:
-                        lines += [
-                            "  🔀 | Polarity",
-                            f"    Expected: {self._fmt(expected_pol)}",
-                            f"    A: {self._fmt(a_pol)}",
-                            f"    Z: {self._fmt(z_pol)}",
-                            "",
-                        ]
-
-                    if wavelength_mismatch:
-                        lines += [
-                            "  λ | Wavelength",
-                            f"    A: {a_wl}",
-                            f"    Z: {z_wl}",
-                            "",
-                        ]
-
-                    if length_missing:
-                        lines += [
-                            "  📏 | Length",
-                            f"    A: {self._fmt(a_len)}",
-                            f"    Z: {self._fmt(z_len)}",
-                            "",
-                        ]
-
-                    if length_mismatch:
-                        lines += [
-                            "  📏 | Length",
-                            f"    Length mismatch: A={self._fmt(float(a_len))}  Z={self._fmt(float(z_len))}",
-                            f"    Delta: {self._fmt(length_delta)}   Threshold: {self._fmt(length_threshold)}",
-                            "",
-                        ]
-
-                    error_blocks.append(lines)
-                    continue
-
-            except Exception as e:
-                stats["mismatched_pairs"] += 1
-                error_blocks.append([f"❌ A/Z MISMATCH  {key}", f"  Compare error: {e}", ""])
-                punch_rows.append(self._build_punch_row(
-                    pair_key=key,
-                    a_doc=None,
-                    z_doc=None,
-                    mismatch=True,
-                    failure_high_loss=False,
-                    a_fail=False,
-                    z_fail=False,
-                    polarity_issue=False,
-                    wavelength_issue=False,
-                    length_issue=False,
-                    note=f"Compare error: {e}",
-                ))
-
-        stats["eligible_pairs"] = len(eligible_pairs)
-
-        return {
-            "stats": stats,
-            "error_blocks": error_blocks,
-            "eligible_pairs": eligible_pairs,
-            "punch_pair_docs": punch_pair_docs,
-            "punch_rows": punch_rows,
-            "length_threshold": length_threshold,
-        }
-
-    
-
-    # ----------------------------
-    # Merge
-    # ----------------------------
-
-    def _worst_verdict(self, a: str | None, z: str | None) -> str:
-        # conservative: Fail beats Pass; Unknown beats Pass
-        order = {"Fail": 3, "Unknown": 2, "Pass": 1, None: 0}
-        return a if order.get(a, 0) >= order.get(z, 0) else z
-
-    def _merge_opm_docs(self, a_doc: dict, z_doc: dict) -> dict:
-        """
-        Simple merge: keep A doc as base, append Z Measurements to A Measurements,
-        and update verdict fields conservatively.
-        """
-        merged = copy.deepcopy(a_doc)
-
-        a_od = merged.get("OpticalData", {})
-        z_od = z_doc.get("OpticalData", {})
-
-        a_meas = a_od.get("Measurements", [])
-        z_meas = z_od.get("Measurements", [])
-
-        combined = []
-        for m in (a_meas or []):
-            m2 = copy.deepcopy(m)
-            if "ResultState" not in m2:
-                m2["ResultState"] = "Active"
-            fl = m2.get("FiberLength")
-            if isinstance(fl, dict) and "Origin" not in fl:
-                fl["Origin"] = "Unknown"
-            combined.append(m2)
-
-        for m in (z_meas or []):
-            m2 = copy.deepcopy(m)
-            if "ResultState" not in m2:
-                m2["ResultState"] = "Active"
-            fl = m2.get("FiberLength")
-            if isinstance(fl, dict) and "Origin" not in fl:
-                fl["Origin"] = "Unknown"
-            combined.append(m2)
-
-        a_od["Measurements"] = combined
-        if "AutoWavelength" not in a_od:
-            a_od["AutoWavelength"] = False
-
-        worst = self._worst_verdict(a_doc.get("GlobalVerdict"), z_doc.get("GlobalVerdict"))
-        merged["GlobalVerdict"] = worst
-        a_od["Status"] = worst
-        merged["OpticalData"] = a_od
-
-        return merged
-
-    def _merge_eligible_pairs(self, eligible_pairs: list[tuple[str, Path, Path]], out_dir: Path) -> dict:
-        merged_msgs: list[str] = []
-        merge_write_errors: list[str] = []
-        merged = 0
-        write_errors = 0
-
-        for pair_key, a_path, z_path in eligible_pairs:
-            try:
-                a_doc = load_json(a_path)
-                z_doc = load_json(z_path)
-                merged_doc = self._merge_opm_docs(a_doc, z_doc)
-
-                out_path = out_dir / f"{a_path.stem}_MergeMF.opm"
-                if out_path.exists():
-                    raise FileExistsError(f"Output already exists: {out_path.name}")
-
-                with out_path.open("w", encoding="utf-8") as f:
-                    json.dump(merged_doc, f, indent=2)
-
-                merged += 1
-                merged_msgs.append(f"✅ MERGED     {pair_key}  ->  {out_path.name}")
-
-            except Exception as e:
-                write_errors += 1
-                merge_write_errors.append(f"❌ MERGE ERR  {pair_key}  ->  {e}")
-
-        return {
-            "merged": merged,
-            "write_errors": write_errors,
-            "merged_msgs": merged_msgs,
-            "merge_write_errors": merge_write_errors,
-        }
-
-    # ----------------------------
-    # Punch List (CSV) helpers
-    # ----------------------------
-
-    def _guess_ose_from_any(self, rows: list[dict]) -> str | None:
-        for r in rows:
-            v = r.get("OSE")
-            if v:
-                return str(v)
-        return None
-
-    def _write_punch_list_csv(self, out_path: Path, rows: list[dict]) -> None:
-        headers = [
-            "OSE",
-            "Cable ID",
-            "Location A",
-            "Location B",
-            "Test Date",
-            "Tester",
-            "Pair Key",
-            "Issue Type",
-            "Details",
-        ]
-        with out_path.open("w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=headers)
-            w.writeheader()
-            for r in rows:
-                w.writerow({h: r.get(h, "") for h in headers})
-
-    def _build_punch_row(
-        self,
-        pair_key: str,
-        a_doc: dict | None,
-        z_doc: dict | None,
-        mismatch: bool,
-        failure_high_loss: bool,
-        a_fail: bool,
-        z_fail: bool,
-        polarity_issue: bool,
-        wavelength_issue: bool,
-        length_issue: bool,
-        note: str | None = None,
-    ) -> dict:
-        # Use A doc as primary for metadata, fallback to Z
-        doc = a_doc or z_doc or {}
-        cable_id = self._get_job_cable_id(doc) or ""
-        loc_a, loc_b = self._split_locations_from_cable_id(cable_id)
-
-        test_date = self._get_test_datetime(doc) or ""
-        tester = self._get_tester_string(doc) or ""
-
-        # OSE = “option A for Short label” in your terms; we’ll derive from JobId if possible
-        ose = self._get_ose_from_job_id(doc) or ""
-
-        issue_parts = []
-        if mismatch:
-            issue_parts.append("MISMATCH")
-        if failure_high_loss:
-            issue_parts.append("FAILURE")
-        issue_type = "+".join(issue_parts) if issue_parts else "ISSUE"
-
-        details = []
-        if note:
-            details.append(note)
-        if failure_high_loss:
-            sides = []
-            if a_fail:
-                sides.append("A")
-            if z_fail:
-                sides.append("Z")
-            details.append(f"High Loss (Status=Fail) side={('/'.join(sides) if sides else '?')}")
-        if polarity_issue:
-            details.append("Polarity issue")
-        if wavelength_issue:
-            details.append("Wavelength mismatch")
-        if length_issue:
-            details.append("Length missing/mismatch")
-
-        return {
-            "OSE": ose,
-            "Cable ID": cable_id,
-            "Location A": loc_a,
-            "Location B": loc_b,
-            "Test Date": test_date,
-            "Tester": tester,
-            "Pair Key": pair_key,
-            "Issue Type": issue_type,
-            "Details": "; ".join(details),
-        }
-
-    # ----------------------------
-    # Data extraction helpers
-    # ----------------------------
-
-    def _fmt(self, v) -> str:
-        if v is None:
-            return "(missing)"
-        if isinstance(v, float):
-            # keep it readable without tons of noise
-            return f"{v:.3f}".rstrip("0").rstrip(".")
-        return str(v)
-
-    def _get_job_cable_id(self, doc: dict) -> str | None:
-        # Your note: Cable ID is populated from JobId
-        job = doc.get("JobId")
-        if not job:
-            return None
-        # Example: "PATH_1_LCO1-NS3-LCO2-DHB-00001.A03"
-        # We want the middle “cable id chunk”
-        m = re.search(r"PATH_\d+_(.+)", str(job))
-        if not m:
-            return str(job)
-        return m.group(1)
-
-    def _split_locations_from_cable_id(self, cable_id: str) -> tuple[str, str]:
-        # Example: LCO1-NS3-LCO2-DHB-00001.A03
-        # You said: LCO1-NS3 is Location A and LCO2-DHB is Location B.
-        # So we take first two hyphen chunks for A and next two for B.
-        if not cable_id:
-            return "", ""
-        base = cable_id.split(".")[0]
-        parts = base.split("-")
-        if len(parts) >= 4:
-            loc_a = "-".join(parts[0:2])
-            loc_b = "-".join(parts[2:4])
-            return loc_a, loc_b
-        return "", ""
-
-    def _get_ose_from_job_id(self, doc: dict) -> str | None:
-        job = doc.get("JobId")
-        if not job:
-            return None
-        # Try to find something like "...A03" (path / segment)
-        m = re.search(r"\.(A\d+|Z\d+)$", str(job))
-        if m:
-            return m.group(1)
-        return None
-
-    def _get_test_datetime(self, doc: dict) -> str | None:
-        # We’ll try a few common spots
-        for k in ("DateTime", "TestDateTime", "Timestamp", "CreatedAt", "TestDate"):
-            v = doc.get(k)
-            if v:
-                return str(v)
-        # Sometimes under OpticalData
-        od = doc.get("OpticalData")
-        if isinstance(od, dict):
-            for k in ("DateTime", "TestDateTime", "Timestamp", "TestDate"):
-                v = od.get(k)
-                if v:
-                    return str(v)
-        return None
-
-    def _get_tester_string(self, doc: dict) -> str | None:
-        # Try a bunch of likely keys without being brittle
-        candidates = []
-        for k in ("TestSet", "TestSetName", "TestSetModel", "Instrument", "InstrumentName", "Tester", "Operator"):
-            v = doc.get(k)
-            if v:
-                candidates.append(str(v))
-        od = doc.get("OpticalData")
-        if isinstance(od, dict):
-            for k in ("TestSet", "Instrument", "InstrumentName", "Tester", "Operator"):
-                v = od.get(k)
-                if v:
-                    candidates.append(str(v))
-        if candidates:
-            return " | ".join(dict.fromkeys(candidates))  # de-dupe while keeping order
-        return None
-    # ---- Polarity ----
-
-    def _get_opm_root(self, doc: dict) -> dict:
-        """
-        Return the dict where OPM result fields usually live.
-
-        Handles both schemas:
-          - full OPM: doc["Measurement"]["OpmResultData"] (common for native test-set exports)
-          - already-rooted: doc contains "Connectors"/"Measurements" directly (some generated outputs)
-        """
-        if not isinstance(doc, dict):
-            return {}
-        m = doc.get("Measurement")
-        if isinstance(m, dict):
-            od = m.get("OpmResultData")
-            if isinstance(od, dict):
-                return od
-        return doc
-
-    def _get_expected_polarity(self, doc: dict) -> str | None:
-        root = self._get_opm_root(doc)
-        con = root.get("Connectors")
-        if not isinstance(con, dict):
-            return None
-        exp = con.get("ExpectedConnectors")
-        if not isinstance(exp, dict):
-            return None
-        pol = exp.get("PolarityType")
-        return self._normalize_polarity(pol) if pol else None
-
-    def _get_actual_polarity(self, doc: dict) -> str | None:
-        root = self._get_opm_root(doc)
-        con = root.get("Connectors")
-        if not isinstance(con, dict):
-            return None
-        act = con.get("ActualConnectors")
-        if not isinstance(act, dict):
-            return None
-        pol = act.get("PolarityType")
-        return self._normalize_polarity(pol) if pol else None
-
-    def _get_polarity_status(self, doc: dict) -> str | None:
-        """
-        Return polarity status, if present.
-
-        Primary:
-          Measurement.OpmResultData.Connectors.PolarityStatus
-
-        Fallback:
-          Connectors.PolarityStatus
-        """
-        if not isinstance(doc, dict):
-            return None
-
-        root = self._get_opm_root(doc)
-        con = root.get("Connectors")
-        if isinstance(con, dict):
-            ps = con.get("PolarityStatus")
-            if ps is not None:
-                return str(ps)
-
-        return None
-
-    def _get_wavelengths_nm(self, doc: dict) -> list[int]:
-        """Return sorted unique list of wavelengths (nm) seen in Measurements."""
-        root = self._get_opm_root(doc)
-
-        out: set[int] = set()
-        meas = root.get("Measurements")
-        if not isinstance(meas, list):
-            # fallback: some variants store measurements under OpticalData
-            od = doc.get("OpticalData")
-            if isinstance(od, dict):
-                meas = od.get("Measurements")
-        if not isinstance(meas, list):
-            return []
-
-        for m in meas:
-            if not isinstance(m, dict):
-                continue
-            w = m.get("Wavelength")
-            if isinstance(w, (int, float)):
-                out.add(int(w))
-        return sorted(out)
-
-    def _normalize_polarity(self, pol) -> str:
-        s = str(pol).strip()
-        # unify separators: "MPO B" -> "MPO_B"
-        s = s.replace(" ", "_")
-        # collapse double underscores just in case
-        while "__" in s:
-            s = s.replace("__", "_")
-        return s
-    # ---- Length ----
-
-    def _get_length_numeric_or_missing(self, doc: dict) -> tuple[float | None, bool]:
-        """
-        ONLY care about FiberLength.LengthInfo.Length numeric vs null.
-        Ignore FiberLength.Status entirely.
-
-        Primary OPM path:
-        Measurement.OpmResultData.Measurements[i].FiberLength.LengthInfo.Length
-
-        Fallbacks:
-        Measurement.OpmResultData.FiberLength.LengthInfo.Length
-        OpticalData.Measurements[...] (older/alternate)
-        doc.FiberLength.LengthInfo.Length
-        """
-        if not isinstance(doc, dict):
-            return None, True
-
-        # -----------------------------
-        # Primary: Measurement -> OpmResultData -> Measurements[]
-        # -----------------------------
-        m = doc.get("Measurement")
-        if isinstance(m, dict):
-            od = m.get("OpmResultData")
-            if isinstance(od, dict):
-                meas = od.get("Measurements")
-                if isinstance(meas, list):
-                    for meas_row in meas:
-                        if not isinstance(meas_row, dict):
-                            continue
-                        fl = meas_row.get("FiberLength")
-                        if not isinstance(fl, dict):
-                            continue
-                        li = fl.get("LengthInfo")
-                        if isinstance(li, dict) and ("Length" in li):
-                            val = li.get("Length")
-                            if val is None:
-                                return None, True
-                            try:
-                                return float(val), False
-                            except Exception:
-                                return None, True
-
-                # Some variants store FiberLength at OpmResultData level
-                fl = od.get("FiberLength")
-                if isinstance(fl, dict):
-                    li = fl.get("LengthInfo")
-                    if isinstance(li, dict) and ("Length" in li):
-                        val = li.get("Length")
-                        if val is None:
-                            return None, True
-                        try:
-                            return float(val), False
-                        except Exception:
-                            return None, True
-
-        # -----------------------------
-        # Fallback: OpticalData (older/alternate schema)
-        # -----------------------------
-        od2 = doc.get("OpticalData")
-        if isinstance(od2, dict):
-            meas = od2.get("Measurements")
-            if isinstance(meas, list):
-                for meas_row in meas:
-                    if not isinstance(meas_row, dict):
-                        continue
-                    fl = meas_row.get("FiberLength")
-                    if not isinstance(fl, dict):
-                        continue
-                    li = fl.get("LengthInfo")
-                    if isinstance(li, dict) and ("Length" in li):
-                        val = li.get("Length")
-                        if val is None:
-                            return None, True
-                        try:
-                            return float(val), False
-                        except Exception:
-                            return None, True
-
-        # -----------------------------
-        # Last fallback: doc-level FiberLength
-        # -----------------------------
-        fl = doc.get("FiberLength")
-        if isinstance(fl, dict):
-            li = fl.get("LengthInfo")
-            if isinstance(li, dict) and ("Length" in li):
-                val = li.get("Length")
-                if val is None:
-                    return None, True
-                try:
-                    return float(val), False
-                except Exception:
-                    return None, True
-
-        return None, True
-
-    # ---- High loss ----
-
-    def _has_high_loss(self, doc: dict) -> bool:
-        """
-        True if the result contains any FAIL indication.
-        This is NOT used as a merge blocker (per your rules) — it's for reporting only.
-        """
-        try:
-            gv = doc.get("GlobalVerdict")
-            if gv == "Fail":
-                return True
-
-            od = (doc.get("Measurement") or {}).get("OpmResultData") or {}
-            if od.get("Status") == "Fail":
-                return True
-
-            measurements = od.get("Measurements", [])
-            if not isinstance(measurements, list):
-                return False
-
-            for m in measurements:
-                if not isinstance(m, dict):
-                    continue
-
-                # Sometimes individual measurement may have a Status/Verdict
-                if m.get("Status") == "Fail" or m.get("Verdict") == "Fail":
-                    return True
-
-                readings = m.get("Readings", [])
-                if not isinstance(readings, list):
-                    continue
-
-                for r in readings:
-                    if isinstance(r, dict) and r.get("Status") == "Fail":
-                        return True
-
-            return False
-        except Exception:
-            # If something is malformed, don't crash analysis;
-            # just assume not high loss here and let other logic catch issues.
-            return False
 
 if __name__ == "__main__":
     app = JSON2OPMApp()
@@ -0,0 +1,189 @@
+"""
+Exchange JSON read straight out of .zip / .tar.gz bundles.
+
+An ArchiveMember stands in for a Path wherever the converter takes an input
+(name, stem, read_bytes, stat, resolve), so convert_batch, the manifest and
+the reports need no special cases. Members are decompressed by whichever
+worker converts them: each worker thread/process keeps its own handle per
+archive, so a worker moving through a bundle never re-reads the parts before
+its position, and nothing is extracted to disk.
+
+Listing a .zip only reads its central directory. A .tar.gz has no index, so
+listing it decompresses it once; the members are then returned in archive
+order, which keeps the workers' reads moving forward through the stream.
+"""
+import gzip
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar.gz", ".tgz", ".tar")
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES
+
+
+def _suffix(path: Path) -> str:
+    name = path.name.lower()
+    for s in ARCHIVE_SUFFIXES:
+        if name.endswith(s):
+            return s
+    return ""
+
+
+def is_archive(path: Path) -> bool:
+    return bool(_suffix(path))
+
+
+class MemberStat(NamedTuple):
+    """The two os.stat_result fields the manifest compares."""
+
+    st_size: int
+    st_mtime_ns: int
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """One .json inside an archive. Picklable, so it can go to a process pool."""
+
+    archive: Path
+    member: str
+    size: int
+    mtime_ns: int
+    # Start of the member's data in the uncompressed tar stream (tar only)
+    offset: int = -1
+
+    @property
+    def name(self) -> str:
+        return self.member.rsplit("/", 1)[-1]
+
+    @property
+    def stem(self) -> str:
+        return Path(self.name).stem
+
+    def __str__(self) -> str:
+        return f"{self.archive}/{self.member}"
+
+    def read_bytes(self) -> bytes:
+        handle = _handle(self.archive)
+        if isinstance(handle, zipfile.ZipFile):
+            return handle.read(self.member)
+        handle.seek(self.offset)
+        data = handle.read(self.size)
+        if len(data) != self.size:
+            raise EOFError(f"Truncated archive member: {self}")
+        return data
+
+    def stat(self) -> MemberStat:
+        return MemberStat(self.size, self.mtime_ns)
+
+    def resolve(self) -> "ArchiveMember":
+        return ArchiveMember(self.archive.resolve(), self.member, self.size, self.mtime_ns, self.offset)
+
+
+# Per-thread open archives: worker threads never share a file position
+_local = threading.local()
+
+
+def _handle(archive: Path):
+    handles = getattr(_local, "handles", None)
+    if handles is None:
+        handles = _local.handles = {}
+    h = handles.get(archive)
+    if h is None:
+        if _suffix(archive) in ZIP_SUFFIXES:
+            h = zipfile.ZipFile(archive)
+        elif _suffix(archive) == ".tar":
+            h = archive.open("rb")
+        else:
+            h = gzip.open(archive, "rb")
+        handles[archive] = h
+    return h
+
+
+def close_archives() -> None:
+    """Close the calling thread's archive handles (they otherwise live as long as the thread)."""
+    handles = getattr(_local, "handles", None) or {}
+    for h in handles.values():
+        try:
+            h.close()
+        except OSError:
+            pass
+    handles.clear()
+
+
+def _is_json(member: str) -> bool:
+    name = member.rsplit("/", 1)[-1]
+    # Skip macOS resource forks (__MACOSX/._foo.json) and other dotfiles
+    return name.lower().endswith(".json") and not name.startswith(".")
+
+
+def list_json_members(archive: Path) -> list[ArchiveMember]:
+    """
+    Every *.json file in `archive`, in archive order.
+    Raises OSError if it can't be read and ValueError if it isn't a valid archive.
+    """
+    members: list[ArchiveMember] = []
+    try:
+        if _suffix(archive) in ZIP_SUFFIXES:
+            with zipfile.ZipFile(archive) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not _is_json(info.filename):
+                        continue
+                    mtime_ns = int(time.mktime(info.date_time + (0, 0, -1))) * 1_000_000_000
+                    members.append(ArchiveMember(archive, info.filename, info.file_size, mtime_ns))
+            return members
+
+        with tarfile.open(archive, "r:*") as tf:
+            for info in tf:
+                if not info.isfile() or info.sparse is not None or not _is_json(info.name):
+                    continue
+                mtime_ns = int(info.mtime) * 1_000_000_000
+                members.append(ArchiveMember(archive, info.name, info.size, mtime_ns, info.offset_data))
+        return members
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, gzip.BadGzipFile) as e:
+        raise ValueError(f"Unreadable archive {archive.name}: {e}") from None
+
+
+def default_output_zip_path(out_dir: Path) -> Path:
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return out_dir / f"JSON2OPM - {ts}.zip"
+
+
+def run_outputs(out_dir: Path, opm_paths: Iterable[Path]) -> list[Path]:
+    """`opm_paths` plus the *_MergeMF.opm next to each one that exists, for write_output_zip."""
+    out: list[Path] = []
+    for p in opm_paths:
+        out.append(p)
+        merged = out_dir / f"{p.stem}_MergeMF.opm"
+        if merged.exists():
+            out.append(merged)
+    return out
+
+
+def write_output_zip(zip_path: Path, paths: Iterable[Path]) -> int:
+    """
+    Pack `paths` (flat, by name) into a deflated ZIP, written to a temp file
+    and swapped in with os.replace. Returns the ZIP's size in bytes.
+    """
+    fd, tmp = tempfile.mkstemp(dir=zip_path.parent, prefix=f".{zip_path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for p in paths:
+                zf.write(p, arcname=p.name)
+        os.replace(tmp, zip_path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return zip_path.stat().st_size
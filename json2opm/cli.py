@@ -0,0 +1,716 @@
+"""
+Headless command-line front end.
+
+Every line written to stdout is one JSON object with an "event" key, so a
+pipeline can consume progress and results as they happen. Human-readable
+diagnostics go to stderr. This module must never import tkinter.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from json2opm.analysis import (
+    PairCheck,
+    PairStream,
+    iter_folder_pair_checks,
+    iter_opm_files,
+    summarize_pair_checks,
+)
+from json2opm.archive import default_output_zip_path, run_outputs, write_output_zip
+from json2opm.export import EXPORT_FORMATS
+from json2opm.features import OpmFeatures
+from json2opm.jsonl import OpmBundleWriter, split_bundle
+from json2opm.index import load_cached_features, open_feature_index, record_features
+from json2opm.instrument import RunMetrics, default_run_report_path
+from json2opm.engine import (
+    EXECUTOR_KINDS,
+    SKIPPED,
+    ConvertResult,
+    convert_batch,
+    count_actions,
+    features_by_output_path,
+    default_jobs,
+    find_json_inputs,
+    hashes_by_output_path,
+    mb_per_s,
+    total_bytes_written,
+)
+from json2opm.merge import MergeCollector
+from json2opm.pairing import PAIR_KEY_STRATEGIES, Orphan, PairKeyStrategy, make_pair_key
+from json2opm.punch import default_punch_list_path, write_punch_list_csv
+from json2opm.rules import RuleError, load_rules
+from json2opm.watch import SUMMARY_FILENAME, PairWatcher
+from json2opm.writer import OUTPUT_FORMATS, write_json
+
+
+DEFAULT_LENGTH_THRESHOLD = 0.25
+
+
+def emit(event: str, **fields: Any) -> None:
+    print(json.dumps({"event": event, **fields}, ensure_ascii=False), flush=True)
+
+
+def _threshold(value: str) -> float:
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value!r}")
+
+
+def _pair_key(args: argparse.Namespace) -> PairKeyStrategy:
+    # Validated in main(), so this can't fail here
+    return make_pair_key(args.pair_key, args.pair_pattern)
+
+
+def _finish(
+    analysis: Dict[str, Any],
+    merger: Optional[MergeCollector],
+    out_dir: Path,
+    punch: bool,
+    metrics: Optional[RunMetrics] = None,
+) -> Dict[str, Any]:
+    """Merge events, punch list and the summary fields, once the analysis is complete."""
+    stats = analysis["stats"]
+    orphans: List[Orphan] = analysis["orphans"]
+    for o in orphans:
+        emit("orphan", **o.as_dict())
+
+    merge_summary: Optional[Dict[str, Any]] = None
+    if merger is not None:
+        merge_out = merger.result()
+        if metrics is not None:
+            metrics.add(
+                "merge", merge_out["seconds"], files=merge_out["merged"], nbytes=merge_out["bytes_written"],
+                errors=merge_out["write_errors"],
+            )
+        for msg in merge_out["merged_msgs"]:
+            emit("merged", message=msg)
+        for msg in merge_out["merge_write_errors"]:
+            emit("merge_error", message=msg)
+        merge_summary = {
+            "merged": merge_out["merged"],
+            "up_to_date": merge_out["up_to_date"],
+            "write_errors": merge_out["write_errors"],
+            "bytes_written": merge_out["bytes_written"],
+            "not_eligible": max(0, stats["pairs_checked"] - stats["eligible_pairs"]),
+        }
+
+    punch_path: Optional[Path] = None
+    punch_error: Optional[str] = None
+    if punch and analysis["punch_rows"]:
+        punch_path = default_punch_list_path(out_dir, analysis["punch_rows"])
+        t0 = time.perf_counter()
+        try:
+            write_punch_list_csv(punch_path, analysis["punch_rows"])
+        except Exception as e:
+            punch_error = str(e)
+            punch_path = None
+        if metrics is not None:
+            size = punch_path.stat().st_size if punch_path is not None else 0
+            metrics.add("punch", time.perf_counter() - t0, nbytes=size, errors=int(punch_error is not None))
+
+    return {
+        "stats": stats,
+        "length_threshold": analysis["length_threshold"],
+        "orphans": len(orphans),
+        "merge": merge_summary,
+        "punch_list": str(punch_path) if punch_path else None,
+        "punch_list_error": punch_error,
+    }
+
+
+def _start_metrics(args: argparse.Namespace) -> RunMetrics:
+    return RunMetrics(args.command, profile=args.profile).start()
+
+
+def _finish_metrics(metrics: RunMetrics, args: argparse.Namespace, out_dir: Path, summary: Dict[str, Any]) -> Optional[str]:
+    """Emit the stage timings and, if asked for, write the run report. Returns the report's path."""
+    metrics.stop()
+    emit("timings", wall_seconds=round(metrics.wall_seconds, 3), stages=metrics.stage_summary())
+    if not (args.run_report or args.profile):
+        return None
+    try:
+        path = metrics.write_report(
+            default_run_report_path(out_dir, args.command),
+            jobs=getattr(args, "jobs", None) or default_jobs(),
+            output_format=args.format,
+            length_threshold=args.threshold,
+            summary=summary,
+        )
+    except OSError as e:
+        print(f"Could not write the run report: {e}", file=sys.stderr)
+        return None
+    return str(path)
+
+
+def cmd_convert(args: argparse.Namespace) -> int:
+    metrics = _start_metrics(args)
+    with metrics.timed("list") as t:
+        json_files = find_json_inputs(args.inputs)
+        t.files = len(json_files)
+    if not json_files:
+        metrics.stop()
+        print("No JSON files found in input.", file=sys.stderr)
+        return 1
+
+    out_dir: Path = args.output
+    total = len(json_files)
+    done = 0
+    emit("start", stage="convert", total=total)
+
+    pair_key = _pair_key(args)
+    readings = None
+    readings_error: Optional[str] = None
+    if args.readings:
+        from json2opm.export import ReadingsWriter, default_readings_path
+
+        try:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            readings = ReadingsWriter(default_readings_path(out_dir))
+        except Exception as e:
+            # Convert anyway; the summary reports the table as failed
+            readings_error = str(e)
+
+    bundle: Optional[OpmBundleWriter] = None
+    if args.bundle:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        bundle = OpmBundleWriter(args.bundle)
+
+    merger = (
+        MergeCollector(
+            out_dir, incremental=args.incremental, output_format=args.format,
+            jobs=args.jobs or default_jobs(),
+            # Merged pairs go into the bundle too
+            bundle=bundle,
+        )
+        if args.merge else None
+    )
+    # Each pair is checked (and merged) as soon as its second side is converted,
+    # so only the documents still waiting for their partner are held
+    pairs = PairStream(args.threshold, on_eligible=merger, pair_key=pair_key, rules=args.rule_set)
+    pair_seconds = 0.0
+
+    def on_result(r: ConvertResult) -> None:
+        nonlocal done, pair_seconds
+        done += 1
+        if readings is not None and r.readings is not None:
+            # Streamed as results arrive; the rows aren't kept on the result
+            key, side, _ = pair_key.key(r.out_path, r.features)
+            readings.add(r.out_path, r.readings, key, side)
+            r.readings = None
+        if r.ok and r.action != SKIPPED:
+            t = time.perf_counter()
+            pairs.add(r.out_path, r.features, r.doc)
+            r.doc = None
+            pair_seconds += time.perf_counter() - t
+        emit(
+            "converted" if r.ok else "convert_error",
+            action=r.action if r.ok else None,
+            src=str(r.src_path),
+            out=str(r.out_path) if r.out_path else None,
+            error=r.error,
+            done=done,
+            total=total,
+        )
+
+    t0 = time.perf_counter()
+    try:
+        results = convert_batch(
+            json_files,
+            out_dir,
+            jobs=args.jobs,
+            executor=args.executor,
+            keep_docs=merger is not None and merger.wants_docs,
+            incremental=args.incremental,
+            output_format=args.format,
+            on_result=on_result,
+            keep_readings=readings is not None,
+            bundle=bundle,
+            rules=args.rule_set,
+            metrics=metrics,
+            order=pair_key.order_key,
+        )
+    except BaseException:
+        if bundle is not None:
+            bundle.discard()
+        if readings is not None:
+            readings.discard()
+        raise
+    # Pair checks and merges done along the way aren't conversion time
+    elapsed = time.perf_counter() - t0 - pair_seconds
+    written = total_bytes_written(results)
+    produced = [r.out_path for r in results if r.ok]
+    counts = count_actions(results)
+    failed = counts["failed"]
+    features = features_by_output_path(results)
+    if not args.no_index and bundle is None:
+        record_features(out_dir, features, hashes_by_output_path(results))
+        # Skipped outputs weren't opened; the index usually still has them
+        skipped = [r.out_path for r in results if r.ok and r.action == SKIPPED]
+        if skipped:
+            features.update(load_cached_features(out_dir, skipped, prune=False, rules=args.rule_set)[0])
+
+    readings_summary: Optional[Dict[str, Any]] = None
+    if readings is not None:
+        # Skipped outputs weren't opened by the converter, so read them here
+        for r in results:
+            if r.ok and r.action == SKIPPED:
+                readings.add_file(r.out_path, pair_key, features.get(r.out_path))
+        readings.close()
+        readings_summary = _readings_summary(readings.result())
+
+    t = time.perf_counter()
+    for r in results:
+        if r.ok and r.action == SKIPPED:
+            pairs.add(r.out_path, features.get(r.out_path))
+    analysis = pairs.result()
+    pair_seconds += time.perf_counter() - t
+    if bundle is not None:
+        # Only now: the pairs merged along the way were added to it
+        bundle.close()
+    # Merges done inline are the merge stage's time
+    inline = merger.inline_seconds if merger is not None else 0.0
+    metrics.add("analyze", pair_seconds - inline, files=len(produced))
+
+    for row in analysis["punch_rows"]:
+        emit("issue", **row)
+    summary = _finish(analysis, merger, out_dir, args.punch, metrics)
+    zip_path: Optional[Path] = None
+    zip_error: Optional[str] = None
+    if args.zip is not None:
+        zip_path = args.zip if args.zip.name else default_output_zip_path(out_dir)
+        try:
+            write_output_zip(zip_path, run_outputs(out_dir, produced))
+        except OSError as e:
+            zip_error = str(e)
+            zip_path = None
+
+    run_report = _finish_metrics(metrics, args, out_dir, summary)
+    emit(
+        "summary",
+        stage="convert",
+        converted=len(produced),
+        failed=failed,
+        actions=counts,
+        bytes_written=written,
+        seconds=round(elapsed, 3),
+        mb_per_s=mb_per_s(written, elapsed),
+        readings=readings_summary,
+        readings_error=readings_error,
+        bundle={"path": str(bundle.path), "records": bundle.records} if bundle is not None else None,
+        zip=str(zip_path) if zip_path else None,
+        zip_error=zip_error,
+        run_report=run_report,
+        **summary,
+    )
+
+    merge_errors = (summary["merge"] or {}).get("write_errors", 0)
+    readings_errors = (readings_summary or {}).get("errors", 0)
+    return 1 if failed or merge_errors or readings_errors or readings_error or zip_error or summary["punch_list_error"] else 0
+
+
+def _readings_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    for path, error in result["errors"]:
+        emit("read_error", file=str(path), error=error)
+    return {
+        "path": str(result["path"]),
+        "format": result["format"],
+        "files": result["files"],
+        "rows": result["rows"],
+        "errors": len(result["errors"]),
+    }
+
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    opm_dir: Path = args.opm_dir
+    if not opm_dir.is_dir():
+        print(f"Not a folder: {opm_dir}", file=sys.stderr)
+        return 1
+
+    out_dir: Path = args.output or opm_dir
+    emit("start", stage=args.command)
+    metrics = _start_metrics(args)
+
+    # Streamed: pairs are checked (and issues emitted) while the folder is
+    # still being listed; the summary and punch list are sorted at the end.
+    index = None if args.no_index else open_feature_index(opm_dir, args.rule_set)
+    jobs = args.jobs or default_jobs()
+    merger = MergeCollector(out_dir, output_format=args.format, jobs=jobs) if args.merge else None
+    seen: List[Path] = []
+    checks: List[PairCheck] = []
+    orphans: List[Orphan] = []
+    t0 = time.perf_counter()
+    try:
+        for check in iter_folder_pair_checks(
+            opm_dir, args.threshold, on_eligible=merger, index=index, seen=seen,
+            pair_key=_pair_key(args), orphans=orphans, jobs=jobs, rules=args.rule_set,
+        ):
+            checks.append(check)
+            if check.punch_row is not None:
+                emit("issue", **check.punch_row)
+    finally:
+        if index is not None:
+            index.close()
+    inline = merger.inline_seconds if merger is not None else 0.0
+    metrics.add("analyze", time.perf_counter() - t0 - inline, files=len(seen))
+
+    if not seen:
+        metrics.stop()
+        print("No .opm files found in the selected results folder.", file=sys.stderr)
+        return 1
+    if index is not None:
+        emit("index", cached=index.hits, parsed=index.parsed)
+
+    summary = _finish(summarize_pair_checks(checks, args.threshold, orphans), merger, out_dir, args.punch, metrics)
+    run_report = _finish_metrics(metrics, args, out_dir, summary)
+    emit("summary", stage=args.command, files=len(seen), run_report=run_report, **summary)
+
+    merge_errors = (summary["merge"] or {}).get("write_errors", 0)
+    return 1 if merge_errors or summary["punch_list_error"] else 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    opm_dir: Path = args.opm_dir
+    if not opm_dir.is_dir():
+        print(f"Not a folder: {opm_dir}", file=sys.stderr)
+        return 1
+    # Imported here so other commands never load NumPy
+    from json2opm.fleet import fleet_stats, load_reading_table, require_numpy
+
+    try:
+        require_numpy()
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    paths = sorted(iter_opm_files(opm_dir))
+    if not paths:
+        print("No .opm files found in the selected results folder.", file=sys.stderr)
+        return 1
+    emit("start", stage="stats", total=len(paths))
+
+    pair_key = _pair_key(args)
+    features: Dict[Path, OpmFeatures] = {}
+    if pair_key.uses_features and not args.no_index:
+        features = load_cached_features(opm_dir, paths, prune=False)[0]
+
+    t0 = time.perf_counter()
+    table = load_reading_table(paths, pair_key, jobs=args.jobs or default_jobs(), features=features)
+    t1 = time.perf_counter()
+    stats = fleet_stats(table, top=args.top)
+    t2 = time.perf_counter()
+
+    for path, error in table.errors:
+        emit("read_error", file=str(path), error=error)
+    emit("stats", **stats)
+
+    report_error: Optional[str] = None
+    if args.report:
+        try:
+            write_json(args.report, stats)
+        except OSError as e:
+            report_error = str(e)
+
+    emit(
+        "summary",
+        stage="stats",
+        files=stats["files"],
+        readings=stats["readings"],
+        load_seconds=round(t1 - t0, 3),
+        stats_seconds=round(t2 - t1, 3),
+        report=str(args.report) if args.report and not report_error else None,
+        report_error=report_error,
+    )
+    return 1 if table.errors or report_error else 0
+
+
+def cmd_split(args: argparse.Namespace) -> int:
+    bundle: Path = args.bundle
+    if not bundle.is_file():
+        print(f"Not a file: {bundle}", file=sys.stderr)
+        return 1
+    emit("start", stage="split")
+
+    t0 = time.perf_counter()
+    result = split_bundle(
+        bundle, args.output, names=args.name, overwrite=args.overwrite, output_format=args.format
+    )
+    elapsed = time.perf_counter() - t0
+
+    for path in result["written"]:
+        emit("written", out=str(path))
+    for error in result["errors"]:
+        emit("split_error", error=error)
+    for name in result["missing"]:
+        emit("missing", name=name)
+    emit(
+        "summary",
+        stage="split",
+        written=len(result["written"]),
+        errors=len(result["errors"]),
+        missing=len(result["missing"]),
+        bytes_written=result["bytes_written"],
+        seconds=round(elapsed, 3),
+    )
+    return 1 if result["errors"] or result["missing"] else 0
+
+
+def cmd_export(args: argparse.Namespace) -> int:
+    from json2opm.export import default_readings_path, export_readings
+
+    opm_dir: Path = args.opm_dir
+    if not opm_dir.is_dir():
+        print(f"Not a folder: {opm_dir}", file=sys.stderr)
+        return 1
+
+    paths = sorted(iter_opm_files(opm_dir))
+    if not paths:
+        print("No .opm files found in the selected results folder.", file=sys.stderr)
+        return 1
+    emit("start", stage="export", total=len(paths))
+
+    pair_key = _pair_key(args)
+    features: Dict[Path, OpmFeatures] = {}
+    if pair_key.uses_features and not args.no_index:
+        features = load_cached_features(opm_dir, paths, prune=False)[0]
+
+    out_path: Path = args.output or default_readings_path(opm_dir, args.format)
+    t0 = time.perf_counter()
+    try:
+        result = export_readings(out_path, paths, pair_key, features=features)
+    except OSError as e:
+        print(f"Could not write {out_path}: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - t0
+
+    summary = _readings_summary(result)
+    emit("summary", stage="export", seconds=round(elapsed, 3), **summary)
+    return 1 if summary["errors"] else 0
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    in_dir: Path = args.input_dir
+    if not in_dir.is_dir():
+        print(f"Not a folder: {in_dir}", file=sys.stderr)
+        return 1
+
+    watcher = PairWatcher(
+        in_dir,
+        args.output,
+        length_threshold=args.threshold,
+        merge=args.merge,
+        output_format=args.format,
+        poll_interval=args.interval,
+        debounce=args.debounce,
+        jobs=args.jobs,
+        use_index=not args.no_index,
+        summary_path=args.summary,
+        pair_key=_pair_key(args),
+        rules=args.rule_set,
+        on_event=emit,
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.write_summary()
+        emit("stopped")
+    return 0
+
+
+def _add_rules_argument(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--rules", type=Path, default=None, metavar="PATH",
+        help="JSON rule file with extra A/Z checks, applied after the built-in ones (see json2opm.rules)",
+    )
+
+
+def _add_pair_key_arguments(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--pair-key", choices=PAIR_KEY_STRATEGIES, default="filename",
+        help="Where the A/Z pair key comes from: file name (default), metadata.testPointName "
+             "(files converted by this tool) or the Identification.JobId suffix (.A02/.Z02)",
+    )
+    p.add_argument(
+        "--pair-pattern", default=None, metavar="REGEX",
+        help="Regex for the pair key, with a (?P<side>[AZ]) group; the key is the match minus "
+             "that letter (default depends on --pair-key)",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="json2opm",
+        description="Convert EXFO Exchange JSON to .opm, analyze A/Z pairs and merge clean pairs.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--threshold", type=_threshold, default=DEFAULT_LENGTH_THRESHOLD,
+        help=f"Length Δ threshold in raw units (default: {DEFAULT_LENGTH_THRESHOLD})",
+    )
+    common.add_argument("--punch", action="store_true", help="Write a Punch List CSV (issues only)")
+    common.add_argument(
+        "--no-index", action="store_true",
+        help="Don't read or update the folder's feature index (.json2opm_index.sqlite)",
+    )
+    common.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="pretty",
+        help="Layout of written .opm files: indented (pretty, default) or single-line (compact)",
+    )
+    _add_pair_key_arguments(common)
+    _add_rules_argument(common)
+    common.add_argument(
+        "--run-report", action="store_true",
+        help="Write a JSON run report (time, files, bytes and errors per stage) next to the outputs",
+    )
+    common.add_argument(
+        "--profile", action="store_true",
+        help="Also profile the run (cProfile .prof file and tracemalloc peak in the run report; slower)",
+    )
+
+    p = sub.add_parser("convert", parents=[common], help="Convert JSON → OPM, then analyze A/Z pairs")
+    p.add_argument(
+        "inputs", nargs="+", type=Path,
+        help="Input JSON files, .zip/.tar.gz bundles and/or folders (bundles in a folder are read too)",
+    )
+    p.add_argument("-o", "--output", type=Path, required=True, help="Output folder for .opm files")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker count (default: CPU count)")
+    p.add_argument("--executor", choices=EXECUTOR_KINDS, default="process", help="Worker pool kind")
+    p.add_argument("--merge", action="store_true", help="Merge eligible A/Z pairs into *_MergeMF.opm")
+    p.add_argument(
+        "--incremental", action="store_true",
+        help="Skip inputs unchanged since the last run and overwrite outputs of changed ones",
+    )
+    p.add_argument(
+        "--zip", nargs="?", type=Path, const=Path(), default=None, metavar="PATH",
+        help="Also pack this run's .opm outputs (and merges) into a ZIP "
+             "(default: 'JSON2OPM - <timestamp>.zip' in the output folder)",
+    )
+    p.add_argument(
+        "--bundle", type=Path, default=None, metavar="PATH",
+        help="Write all converted documents (and, with --merge, merges) to this one JSONL file instead of one .opm each "
+             "(see 'split'; not with --incremental or --zip)",
+    )
+    p.add_argument(
+        "--readings", action="store_true",
+        help="Also write every reading to 'Readings - <timestamp>.parquet' in the output folder "
+             "(CSV if pyarrow isn't installed)",
+    )
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("analyze", parents=[common], help="Analyze A/Z pairs in an existing OPM folder")
+    p.add_argument("opm_dir", type=Path, help="Folder containing .opm results")
+    p.add_argument("-o", "--output", type=Path, default=None, help="Folder for merge/punch outputs (default: opm_dir)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for pair checks and merging (default: CPU count)")
+    p.add_argument("--merge", action="store_true", help="Merge eligible A/Z pairs into *_MergeMF.opm")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("merge", parents=[common], help="Analyze an OPM folder and merge every eligible A/Z pair")
+    p.add_argument("opm_dir", type=Path, help="Folder containing .opm results")
+    p.add_argument("-o", "--output", type=Path, default=None, help="Folder for merged outputs (default: opm_dir)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for pair checks and merging (default: CPU count)")
+    p.set_defaults(func=cmd_analyze, merge=True)
+
+    p = sub.add_parser(
+        "stats", help="Fleet-wide loss statistics over every reading in an OPM folder (needs NumPy)"
+    )
+    p.add_argument("opm_dir", type=Path, help="Folder containing .opm results")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for reading files (default: CPU count)")
+    p.add_argument("--top", type=int, default=20, help="Outliers / largest A-Z deltas to list (default: 20)")
+    p.add_argument("--report", type=Path, default=None, help="Also write the statistics to this JSON file")
+    p.add_argument(
+        "--no-index", action="store_true",
+        help="Don't read the folder's feature index (.json2opm_index.sqlite)",
+    )
+    _add_pair_key_arguments(p)
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("split", help="Write the records of a JSONL bundle (convert --bundle) as .opm files")
+    p.add_argument("bundle", type=Path, help="JSONL bundle written by convert --bundle")
+    p.add_argument("-o", "--output", type=Path, required=True, help="Output folder for .opm files")
+    p.add_argument(
+        "--name", action="append", default=None,
+        help="Only this record (file stem, without .opm); repeat for several (default: all)",
+    )
+    p.add_argument("--overwrite", action="store_true", help="Replace existing .opm files")
+    p.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="pretty",
+        help="Layout of written .opm files: indented (pretty, default) or single-line (compact)",
+    )
+    p.set_defaults(func=cmd_split)
+
+    p = sub.add_parser(
+        "export", help="Write every reading in an OPM folder to one Parquet/CSV table"
+    )
+    p.add_argument("opm_dir", type=Path, help="Folder containing .opm results")
+    p.add_argument(
+        "-o", "--output", type=Path, default=None,
+        help="Output file (default: 'Readings - <timestamp>.<format>' in opm_dir)",
+    )
+    p.add_argument(
+        "--format", choices=EXPORT_FORMATS, default="parquet",
+        help="Table format when -o isn't given (default: parquet; CSV if pyarrow isn't installed)",
+    )
+    p.add_argument(
+        "--no-index", action="store_true",
+        help="Don't read the folder's feature index (.json2opm_index.sqlite)",
+    )
+    _add_pair_key_arguments(p)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser(
+        "watch", help="Watch a drop folder; convert new JSON and re-check only the affected A/Z pairs"
+    )
+    p.add_argument("input_dir", type=Path, help="Folder to watch for Exchange JSON files")
+    p.add_argument("-o", "--output", type=Path, required=True, help="Output folder for .opm files")
+    p.add_argument(
+        "--threshold", type=_threshold, default=DEFAULT_LENGTH_THRESHOLD,
+        help=f"Length Δ threshold in raw units (default: {DEFAULT_LENGTH_THRESHOLD})",
+    )
+    p.add_argument("--merge", action="store_true", help="Merge eligible A/Z pairs into *_MergeMF.opm")
+    p.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="pretty",
+        help="Layout of written .opm files: indented (pretty, default) or single-line (compact)",
+    )
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker count (default: CPU count)")
+    p.add_argument("--interval", type=float, default=2.0, help="Seconds between folder scans (default: 2)")
+    p.add_argument(
+        "--debounce", type=float, default=2.0,
+        help="Seconds a file must stay unchanged before it is converted (default: 2)",
+    )
+    p.add_argument(
+        "--summary", type=Path, default=None,
+        help=f"Live summary JSON path (default: <output>/{SUMMARY_FILENAME})",
+    )
+    p.add_argument(
+        "--no-index", action="store_true",
+        help="Don't read or update the folder's feature index (.json2opm_index.sqlite)",
+    )
+    _add_pair_key_arguments(p)
+    _add_rules_argument(p)
+    p.set_defaults(func=cmd_watch)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if hasattr(args, "pair_key"):
+        try:
+            make_pair_key(args.pair_key, args.pair_pattern)
+        except ValueError as e:
+            parser.error(str(e))
+    args.rule_set = None
+    if getattr(args, "rules", None) is not None:
+        try:
+            args.rule_set = load_rules(args.rules)
+        except RuleError as e:
+            parser.error(str(e))
+    if args.command == "convert" and args.bundle and (args.incremental or args.zip is not None):
+        parser.error("--bundle can't be combined with --incremental or --zip")
+    return args.func(args)
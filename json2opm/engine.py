@@ -0,0 +1,488 @@
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from json2opm.archive import ArchiveMember, close_archives, is_archive, list_json_members
+from json2opm.export import reading_rows
+from json2opm.features import OpmFeatures, extract_features
+from json2opm.jsonl import JsonlRecord, OpmBundleWriter, close_bundles, is_jsonl, list_jsonl_records
+from json2opm.index import content_hash
+from json2opm.instrument import RunMetrics, StageClock
+from json2opm.loader import load_json_bytes
+from json2opm.manifest import ConvertManifest
+from json2opm.mapper import map_pxm_json_to_opm
+from json2opm.rules import RuleSet
+from json2opm.writer import OUTPUT_FORMATS, serialize_opm, write_opm_data
+
+
+# "process" for CPU-bound local disks, "thread" for slow network shares
+EXECUTOR_KINDS = ("process", "thread")
+
+# ConvertResult.action values
+CONVERTED = "converted"   # new output written
+UPDATED = "updated"       # existing output replaced (incremental mode)
+SKIPPED = "skipped"       # output already up to date (incremental mode)
+
+
+@dataclass
+class ConvertResult:
+    """Outcome of converting one Exchange JSON file."""
+
+    src_path: Path
+    out_path: Optional[Path]
+    ok: bool
+    error: Optional[str] = None
+    action: str = CONVERTED
+    # Input content hash; only computed in incremental mode
+    src_hash: Optional[str] = None
+    # Size of the written .opm (0 if nothing was written) and its content_hash
+    bytes_written: int = 0
+    out_hash: Optional[str] = None
+    # Compact analysis record, extracted in the worker while the document is hot
+    features: Optional[OpmFeatures] = None
+    # The mapped OPM document, only when requested with keep_docs=True
+    doc: Optional[Dict[str, Any]] = None
+    # Readings table columns (export.reading_rows), only with keep_readings=True
+    readings: Optional[Dict[str, list]] = None
+    # The compact .opm bytes, when writing a bundle instead of files (see convert_batch)
+    data: Optional[bytes] = None
+    # Seconds per stage (instrument.StageClock), the input's size, and the
+    # stage that raised if the conversion failed; see record_timings
+    timings: Optional[Dict[str, float]] = None
+    bytes_read: int = 0
+    failed_stage: Optional[str] = None
+
+
+def explain_duplicate_output(out_path: Path, src_path: Path) -> str:
+    return (
+        f"Output file already exists and overwrite is disabled:\n"
+        f"  Output: {out_path}\n"
+        f"  Input : {src_path}\n\n"
+        f"Fix: choose an empty output folder, delete/rename the existing .opm file, or rename the input JSON(s) "
+        f"so they produce unique output names."
+    )
+
+
+def explain_duplicate_record(name: str, src_path: Path) -> str:
+    return (
+        f"Bundle already has a record with this name:\n"
+        f"  Record: {name}\n"
+        f"  Input : {src_path}\n\n"
+        f"Fix: rename the input JSON(s) so they produce unique output names."
+    )
+
+
+def find_json_inputs(inputs: Iterable[Path]) -> List[Path]:
+    """
+    Expand folders to their *.json files, .zip / .tar.gz bundles to the
+    ArchiveMembers inside them (see archive.py) and .jsonl bundles to their
+    JsonlRecords (see jsonl.py); other explicit files are kept as-is. Loose
+    files come first, sorted, so runs are reproducible regardless of pool
+    scheduling; each bundle's entries follow in bundle order. A bundle that
+    can't be listed is kept as a single input, which then fails with the reason.
+    """
+    loose: set[Path] = set()
+    bundles: set[Path] = set()
+    for p in inputs:
+        p = Path(p)
+        if p.is_dir():
+            loose.update(p.glob("*.json"))
+            bundles.update(a for a in p.iterdir() if a.is_file() and (is_archive(a) or is_jsonl(a)))
+        elif is_archive(p) or is_jsonl(p):
+            bundles.add(p)
+        else:
+            loose.add(p)
+
+    found: List[Path] = sorted(loose)
+    for b in sorted(bundles):
+        try:
+            found.extend(list_jsonl_records(b) if is_jsonl(b) else list_json_members(b))
+        except (OSError, ValueError):
+            found.append(b)
+    return found
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def opm_output_path(src_path: Path, out_dir: Path) -> Path:
+    return out_dir / (src_path.stem + ".opm")
+
+
+def convert_file(
+    src_path: Path,
+    out_dir: Path,
+    overwrite: bool = False,
+    keep_doc: bool = False,
+    incremental: bool = False,
+    known_hash: Optional[str] = None,
+    output_format: str = "pretty",
+    keep_readings: bool = False,
+    bundle_output: bool = False,
+    rules: Optional[RuleSet] = None,
+) -> ConvertResult:
+    """
+    parse -> map -> write for a single file. Never raises; errors go into the result.
+
+    In incremental mode existing outputs are replaced atomically, and if the
+    input's bytes still hash to `known_hash` nothing is parsed or written.
+    With bundle_output=True nothing is written; the compact document comes
+    back in `data` for the caller's OpmBundleWriter.
+    """
+    out_path = opm_output_path(src_path, out_dir)
+    clock = StageClock()
+    data = b""
+    try:
+        if is_archive(src_path) and not isinstance(src_path, ArchiveMember):
+            # Only left in by find_json_inputs when it couldn't be listed
+            list_json_members(src_path)
+            raise ValueError(f"Could not read archive {src_path.name}")
+        if is_jsonl(src_path) and not isinstance(src_path, JsonlRecord):
+            list_jsonl_records(src_path)
+            raise ValueError(f"Could not read bundle {src_path.name}")
+        clock.enter("read")
+        data = src_path.read_bytes()
+        src_hash = content_hash(data) if incremental else None
+        if known_hash is not None and src_hash == known_hash:
+            return ConvertResult(
+                src_path=src_path, out_path=out_path, ok=True, action=SKIPPED, src_hash=src_hash,
+                timings=clock.stop(), bytes_read=len(data),
+            )
+
+        clock.enter("parse")
+        src_doc = load_json_bytes(data)
+        clock.enter("map")
+        opm_json = map_pxm_json_to_opm(src_doc)
+        clock.enter("serialize")
+        if bundle_output:
+            compact = serialize_opm(opm_json, "compact")
+        else:
+            serialized = serialize_opm(opm_json, output_format)
+            clock.enter("write")
+            existed = incremental and out_path.exists()
+            try:
+                size = write_opm_data(out_path, serialized, overwrite=overwrite or incremental)
+            except FileExistsError:
+                raise FileExistsError(explain_duplicate_output(out_path, src_path)) from None
+            # For the folder's FeatureIndex (see hashes_by_output_path)
+            out_hash = content_hash(serialized)
+            del serialized
+        clock.enter("features")
+        features = extract_features(opm_json, src_doc, rules)
+        readings = None
+        if keep_readings:
+            clock.enter("readings")
+            readings = reading_rows(opm_json)
+        timings = clock.stop()
+        if bundle_output:
+            return ConvertResult(
+                src_path=src_path,
+                out_path=out_path,
+                ok=True,
+                bytes_written=len(compact),
+                features=features,
+                doc=opm_json if keep_doc else None,
+                readings=readings,
+                data=compact,
+                timings=timings,
+                bytes_read=len(data),
+            )
+        return ConvertResult(
+            src_path=src_path,
+            out_path=out_path,
+            ok=True,
+            action=UPDATED if existed else CONVERTED,
+            src_hash=src_hash,
+            bytes_written=size,
+            out_hash=out_hash,
+            features=features,
+            doc=opm_json if keep_doc else None,
+            readings=readings,
+            timings=timings,
+            bytes_read=len(data),
+        )
+    except Exception as e:
+        return ConvertResult(
+            src_path=src_path, out_path=None, ok=False, error=str(e),
+            timings=clock.stop(), bytes_read=len(data), failed_stage=clock.current or "read",
+        )
+
+
+def _convert_chunk(
+    src_paths: Sequence[Path],
+    known_hashes: Sequence[Optional[str]],
+    out_dir: Path,
+    overwrite: bool,
+    keep_docs: bool,
+    incremental: bool,
+    output_format: str,
+    keep_readings: bool,
+    bundle_output: bool,
+    rules: Optional[RuleSet],
+) -> List[ConvertResult]:
+    # Module-level so it pickles into worker processes.
+    return [
+        convert_file(p, out_dir, overwrite, keep_docs, incremental, h, output_format, keep_readings, bundle_output, rules)
+        for p, h in zip(src_paths, known_hashes)
+    ]
+
+
+def _chunk_size(total: int, jobs: int) -> int:
+    # ~4 chunks per worker keeps the pool balanced without paying IPC per file
+    return max(1, min(64, total // (jobs * 4) or 1))
+
+
+def _make_executor(kind: str, jobs: int) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=jobs)
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=jobs)
+    raise ValueError(f"Unknown executor kind: {kind!r} (expected one of {EXECUTOR_KINDS})")
+
+
+def convert_batch(
+    src_paths: Sequence[Path],
+    out_dir: Path,
+    jobs: Optional[int] = None,
+    executor: str = "process",
+    overwrite: bool = False,
+    keep_docs: bool = False,
+    incremental: bool = False,
+    output_format: str = "pretty",
+    on_result: Optional[Callable[[ConvertResult], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    keep_readings: bool = False,
+    bundle: Optional[OpmBundleWriter] = None,
+    rules: Optional[RuleSet] = None,
+    metrics: Optional[RunMetrics] = None,
+    order: Optional[Callable[[Path], Any]] = None,
+) -> List[ConvertResult]:
+    """
+    Convert many files, optionally across a worker pool.
+
+    Returns one ConvertResult per input, in input order. `on_result` is called
+    from the calling thread as each result arrives (completion order), which is
+    what progress bars want.
+
+    If `cancel` is set mid-run, queued work is dropped, chunks already running
+    are allowed to finish, and only the completed results are returned.
+
+    Each successful result carries its OpmFeatures, so A/Z analysis never has
+    to re-read the .opm files (see features_by_output_path). With keep_docs=True
+    it also carries the mapped document, which merging needs (see
+    analysis.PairStream, or docs_by_output_path for a small batch). keep_readings=True adds the rows for the
+    readings table (see export.ReadingsWriter), which are much smaller than
+    the document. With `rules`, the features also carry the rule file's
+    values, so an analysis with the same rules doesn't re-read the outputs.
+    With `metrics`, each result's stage timings are added to it as it arrives.
+
+    `order` is a sort key for the order inputs are converted in (results
+    still come back in input order), e.g. PairKeyStrategy.order_key, so the
+    two sides of a pair finish close together and a caller pairing results
+    as they arrive holds few documents. Tar members keep their archive order,
+    which their reads depend on.
+
+    With `bundle`, no .opm files are written: every converted document is
+    appended to the OpmBundleWriter instead (in completion order; the caller
+    closes it). `out_path` then names the record, not a file on disk. An
+    input whose record name is already in the bundle fails (see
+    explain_duplicate_record). Not combinable with incremental, which
+    compares against the files.
+
+    incremental=True consults the output folder's ConvertManifest: inputs whose
+    output is up to date come back as SKIPPED without being opened (no features
+    or doc), changed inputs overwrite their output atomically (UPDATED), and the
+    manifest is rewritten at the end. Outputs written in a different
+    `output_format` than requested count as changed.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format!r} (expected one of {OUTPUT_FORMATS})")
+    if bundle is not None and incremental:
+        raise ValueError("A bundle output can't be combined with incremental conversion")
+    src_paths = list(src_paths)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    bundle_output = bundle is not None
+
+    jobs = max(1, jobs or default_jobs())
+    total = len(src_paths)
+    results: List[Optional[ConvertResult]] = [None] * total
+
+    def collect(indices: Sequence[int], chunk: List[ConvertResult]) -> None:
+        for i, r in zip(indices, chunk):
+            if metrics is not None:
+                record_timings(metrics, r)
+            if bundle is not None and r.data is not None:
+                name = r.out_path.stem
+                if name in bundle:
+                    # Caught here, not when split_bundle meets the second record
+                    r = ConvertResult(src_path=r.src_path, out_path=None, ok=False,
+                                      error=explain_duplicate_record(name, r.src_path))
+                else:
+                    bundle.add(name, r.data)
+                    r.data = None
+            results[i] = r
+            if on_result:
+                on_result(r)
+
+    manifest = ConvertManifest.load(out_dir) if incremental else None
+    todo: List[int] = []
+    known_hashes: List[Optional[str]] = []
+    seen_outputs: set[Path] = set()
+    for i, p in enumerate(src_paths):
+        if manifest is None:
+            todo.append(i)
+            known_hashes.append(None)
+            continue
+
+        out_path = opm_output_path(p, out_dir)
+        if out_path in seen_outputs:
+            # Overwriting would silently let the last input win
+            collect([i], [ConvertResult(src_path=p, out_path=None, ok=False,
+                                        error=explain_duplicate_output(out_path, p))])
+            continue
+        seen_outputs.add(out_path)
+
+        up_to_date, known_hash = manifest.check(p, out_path, output_format)
+        if up_to_date:
+            collect([i], [ConvertResult(src_path=p, out_path=out_path, ok=True, action=SKIPPED)])
+        else:
+            todo.append(i)
+            known_hashes.append(known_hash)
+
+    if order is not None:
+        scheduled = sorted(zip(todo, known_hashes), key=lambda ih: _schedule_key(src_paths[ih[0]], ih[0], order))
+        todo = [i for i, _ in scheduled]
+        known_hashes = [h for _, h in scheduled]
+
+    if jobs == 1 or len(todo) <= 1:
+        for i, h in zip(todo, known_hashes):
+            if cancel is not None and cancel.is_set():
+                break
+            collect([i], [convert_file(
+                src_paths[i], out_dir, overwrite, keep_docs, incremental, h, output_format, keep_readings,
+                bundle_output, rules,
+            )])
+        close_archives()
+        close_bundles()
+    else:
+        size = _chunk_size(len(todo), jobs)
+        with _make_executor(executor, jobs) as pool:
+            futures = {}
+            for start in range(0, len(todo), size):
+                idx = todo[start:start + size]
+                fut = pool.submit(
+                    _convert_chunk,
+                    [src_paths[i] for i in idx],
+                    known_hashes[start:start + size],
+                    out_dir,
+                    overwrite,
+                    keep_docs,
+                    incremental,
+                    output_format,
+                    keep_readings,
+                    bundle_output,
+                    rules,
+                )
+                futures[fut] = idx
+
+            pending = set(futures)
+            for fut in as_completed(futures):
+                pending.discard(fut)
+                collect(futures[fut], fut.result())
+                if cancel is not None and cancel.is_set():
+                    break
+
+            # Cancelled: drop queued chunks, but report the ones already running,
+            # since their outputs are (or are about to be) on disk.
+            for fut in pending:
+                fut.cancel()
+            for fut in pending:
+                if not fut.cancelled():
+                    collect(futures[fut], fut.result())
+
+    if manifest is not None:
+        _update_manifest(manifest, results, output_format)
+
+    return [r for r in results if r is not None]
+
+
+def _schedule_key(p: Path, i: int, order: Callable[[Path], Any]) -> tuple:
+    # Tar members are read by seeking forward through one stream (see archive.py)
+    if isinstance(p, ArchiveMember) and p.offset >= 0:
+        return (1, i)
+    return (0, order(p))
+
+
+def _update_manifest(
+    manifest: ConvertManifest,
+    results: Iterable[Optional[ConvertResult]],
+    output_format: str,
+) -> None:
+    for r in results:
+        if r is None:
+            continue
+        if not r.ok:
+            manifest.forget(r.src_path)
+        elif r.src_hash is not None:
+            # Converted, updated, or skipped after a hash check: refresh stats
+            manifest.update(r.src_path, r.out_path, r.src_hash, output_format)
+    try:
+        manifest.save()
+    except OSError:
+        # Next run just does more work; the outputs themselves are fine
+        pass
+
+
+def record_timings(metrics: RunMetrics, r: ConvertResult) -> None:
+    """Add one ConvertResult's stage times and sizes to `metrics`."""
+    written = r.bytes_written if r.ok else 0
+    metrics.add_times(
+        r.timings,
+        {"read": r.bytes_read, "parse": r.bytes_read, "serialize": written, "write": written},
+        r.failed_stage,
+    )
+
+
+def count_actions(results: Iterable[ConvertResult]) -> Dict[str, int]:
+    counts = {CONVERTED: 0, UPDATED: 0, SKIPPED: 0, "failed": 0}
+    for r in results:
+        counts[r.action if r.ok else "failed"] += 1
+    return counts
+
+
+def total_bytes_written(results: Iterable[ConvertResult]) -> int:
+    return sum(r.bytes_written for r in results if r.ok)
+
+
+def mb_per_s(nbytes: int, seconds: float) -> float:
+    return round(nbytes / 1e6 / seconds, 2) if seconds > 0 else 0.0
+
+
+def docs_by_output_path(results: Iterable[ConvertResult]) -> Dict[Path, Dict[str, Any]]:
+    """
+    Move the documents out of `results` into a path-keyed cache for
+    analyze_pairs_from_opm_paths(docs=...). The results no longer hold them,
+    so the cache is the only reference and drains as pairs are analyzed.
+    Every document is alive until then, so this is for small batches; a
+    whole convert run feeds them to an analysis.PairStream from on_result.
+    """
+    docs: Dict[Path, Dict[str, Any]] = {}
+    for r in results:
+        if r.ok and r.doc is not None:
+            docs[r.out_path] = r.doc
+            r.doc = None
+    return docs
+
+
+def features_by_output_path(results: Iterable[ConvertResult]) -> Dict[Path, OpmFeatures]:
+    """Path-keyed OpmFeatures cache for analyze_pairs_from_opm_paths(features=...)."""
+    return {r.out_path: r.features for r in results if r.ok and r.features is not None}
+
+
+def hashes_by_output_path(results: Iterable[ConvertResult]) -> Dict[Path, str]:
+    """Content hashes of the written outputs, for record_features(hashes=...)."""
+    return {r.out_path: r.out_hash for r in results if r.ok and r.out_hash is not None}
@@ -0,0 +1,259 @@
+"""
+Readings export: every reading of a batch as one flat, columnar table.
+
+One row per Readings[] entry, with the file, pair key and side it belongs to.
+Written as Apache Parquet when pyarrow is installed, otherwise as CSV. Rows
+are buffered into row groups of ROW_GROUP_SIZE and flushed as they fill, so
+memory stays flat however many files are exported.
+"""
+import csv
+import functools
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from json2opm.features import (
+    OpmFeatures,
+    extract_features,
+    get_measurements,
+    measurement_length,
+    numeric_value,
+    wavelength_nm,
+)
+from json2opm.loader import load_json
+from json2opm.pairing import DEFAULT_PAIR_KEY, MERGED_SUFFIX, PairKeyStrategy
+
+
+EXPORT_FORMATS = ("parquet", "csv")
+
+ROW_GROUP_SIZE = 65536
+
+# Column name -> Arrow type name (also the CSV header order)
+READING_COLUMNS = {
+    "file": "string",
+    "pair_key": "string",
+    "side": "string",
+    "measurement": "string",      # Measurements[].Name (fiber)
+    "type": "string",             # Measurements[].Type, e.g. "Loss"
+    "wavelength_nm": "int32",
+    "reading": "int32",           # index within Readings[]
+    "value": "float64",
+    "unit": "string",
+    "status": "string",
+    "validity": "string",
+    "reference_dbm": "float64",
+    "length": "float64",
+}
+
+# The columns that come from the document itself
+_DOC_COLUMNS = [c for c in READING_COLUMNS if c not in ("file", "pair_key", "side")]
+
+
+@functools.cache
+def _pyarrow():
+    # Imported on first use: pyarrow takes ~0.1 s to load, and this module is
+    # imported (by the converter) on every run, exporting or not
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # pragma: no cover - depends on the install
+        return None, None
+    return pa, pq
+
+
+def parquet_available() -> bool:
+    return _pyarrow()[1] is not None
+
+
+def default_readings_path(out_dir: Path, export_format: str = "parquet") -> Path:
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return out_dir / f"Readings - {ts}.{export_format}"
+
+
+class _ParquetSink:
+    def __init__(self, path: Path):
+        pa, pq = _pyarrow()
+        self._table = pa.table
+        self.schema = pa.schema([(name, getattr(pa, t)()) for name, t in READING_COLUMNS.items()])
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+
+    def write(self, columns: dict[str, list]) -> None:
+        self.writer.write_table(self._table(columns, schema=self.schema), row_group_size=ROW_GROUP_SIZE)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _CsvSink:
+    def __init__(self, path: Path):
+        self.f = path.open("w", newline="", encoding="utf-8")
+        self.w = csv.writer(self.f)
+        self.w.writerow(READING_COLUMNS)
+
+    def write(self, columns: dict[str, list]) -> None:
+        self.w.writerows(zip(*columns.values()))
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def reading_rows(doc: dict) -> dict[str, list]:
+    """
+    Columns for one document's readings, without the file / pair_key / side
+    columns (ReadingsWriter.add fills those in). Small enough to send back
+    from a convert worker instead of the document.
+    """
+    cols: dict[str, list] = {name: [] for name in _DOC_COLUMNS}
+    for m in get_measurements(doc):
+        readings = m.get("Readings")
+        if not isinstance(readings, list):
+            continue
+        meas_name = m.get("Name")
+        meas_type = m.get("Type")
+        wl = wavelength_nm(m.get("Wavelength"))
+        ref = numeric_value(m.get("Reference"))
+        length = measurement_length(m)
+        for i, r in enumerate(readings):
+            if not isinstance(r, dict):
+                continue
+            cols["measurement"].append(None if meas_name is None else str(meas_name))
+            cols["type"].append(None if meas_type is None else str(meas_type))
+            cols["wavelength_nm"].append(wl)
+            cols["reading"].append(i)
+            cols["value"].append(numeric_value(r.get("Value")))
+            cols["unit"].append(r.get("Unit"))
+            cols["status"].append(r.get("Status"))
+            cols["validity"].append(r.get("Validity"))
+            cols["reference_dbm"].append(ref)
+            cols["length"].append(length)
+    return cols
+
+
+class ReadingsWriter:
+    """
+    Streams reading rows into a Parquet (or CSV) file, one row group at a time.
+
+    The format follows the suffix: .parquet needs pyarrow, and without it the
+    table is written as CSV next to the requested path instead (`path` says
+    where). Rows are buffered until a full row group of ROW_GROUP_SIZE is
+    ready, so memory stays flat.
+    """
+
+    def __init__(self, out_path: Path):
+        self.format = "parquet" if out_path.suffix.lower() == ".parquet" else "csv"
+        if self.format == "parquet" and not parquet_available():
+            self.format = "csv"
+            out_path = out_path.with_suffix(".csv")
+        self.path = out_path
+        self._sink = _ParquetSink(out_path) if self.format == "parquet" else _CsvSink(out_path)
+        self._cols: dict[str, list] = {name: [] for name in READING_COLUMNS}
+        self.files = 0
+        self.rows = 0
+        self.errors: list[tuple[Path, str]] = []
+
+    def __enter__(self) -> "ReadingsWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, path: Path, rows: dict[str, list], key: str | None, side: str | None) -> None:
+        """Append one file's reading_rows()."""
+        n = len(rows["value"])
+        self._cols["file"].extend([path.name] * n)
+        self._cols["pair_key"].extend([key] * n)
+        self._cols["side"].extend([side] * n)
+        for name in _DOC_COLUMNS:
+            self._cols[name].extend(rows[name])
+        self.files += 1
+        while len(self._cols["file"]) >= ROW_GROUP_SIZE:
+            self._flush(ROW_GROUP_SIZE)
+
+    def add_doc(
+        self,
+        path: Path,
+        doc: dict,
+        pair_key: PairKeyStrategy | None = None,
+        features: OpmFeatures | None = None,
+    ) -> None:
+        pair_key = pair_key or DEFAULT_PAIR_KEY
+        if pair_key.uses_features and features is None:
+            features = extract_features(doc)
+        key, side, _ = pair_key.key(path, features)
+        self.add(path, reading_rows(doc), key, side)
+
+    def add_file(
+        self,
+        path: Path,
+        pair_key: PairKeyStrategy | None = None,
+        features: OpmFeatures | None = None,
+    ) -> bool:
+        """Read and append one .opm; unreadable files are recorded in `errors`."""
+        try:
+            self.add_doc(path, load_json(path), pair_key, features)
+            return True
+        except Exception as e:
+            self.errors.append((path, str(e)))
+            return False
+
+    def _flush(self, n: int) -> None:
+        if n:
+            self._sink.write({name: col[:n] for name, col in self._cols.items()})
+            for col in self._cols.values():
+                del col[:n]
+            self.rows += n
+
+    def close(self) -> None:
+        if self._sink is None:
+            return
+        try:
+            self._flush(len(self._cols["file"]))
+        finally:
+            self._sink.close()
+            self._sink = None
+
+    def discard(self) -> None:
+        """Close without flushing and delete the partial table (a run that failed or was interrupted)."""
+        if self._sink is None:
+            return
+        try:
+            self._sink.close()
+        except Exception:
+            pass
+        self._sink = None
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def result(self) -> dict[str, Any]:
+        return {"path": self.path, "format": self.format, "files": self.files, "rows": self.rows, "errors": self.errors}
+
+
+def export_readings(
+    out_path: Path,
+    opm_paths: Iterable[Path],
+    pair_key: PairKeyStrategy | None = None,
+    features: dict[Path, OpmFeatures] | None = None,
+    cancel: threading.Event | None = None,
+    on_progress: Callable[[int], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Write every reading of `opm_paths` (minus *_MergeMF outputs) to `out_path`.
+    `features` supply feature-based pair keys. Unreadable files are skipped
+    and listed. Returns ReadingsWriter.result().
+    """
+    features = features if features is not None else {}
+    done = 0
+    with ReadingsWriter(out_path) as writer:
+        for path in opm_paths:
+            if cancel is not None and cancel.is_set():
+                break
+            if path.stem.endswith(MERGED_SUFFIX):
+                continue
+            writer.add_file(path, pair_key, features.get(path))
+            done += 1
+            if on_progress:
+                on_progress(done)
+    return writer.result()
@@ -0,0 +1,382 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from json2opm.rules import RuleSet
+
+
+@dataclass(slots=True)
+class OpmFeatures:
+    """
+    Everything A/Z analysis and the punch list need from one .opm document.
+
+    Extracted once per file so the (large) parsed document can be dropped
+    straight away; analysis only ever compares these records.
+    """
+
+    expected_polarity: str | None
+    actual_polarity: str | None
+    polarity_status: str | None
+    wavelengths_nm: list[int]
+    length: float | None
+    length_missing: bool
+    high_loss: bool
+
+    # Punch row metadata
+    cable_id: str | None
+    ose: str | None
+    test_date: str | None
+    tester: str | None
+
+    # Pairing metadata (see json2opm.pairing)
+    job_id: str | None = None
+    test_point_name: str | None = None
+
+    # Measurements[].Name -> FiberLength (first per fiber), for the per-fiber
+    # length check (see json2opm.lengths)
+    fiber_lengths: dict[str, float | None] = field(default_factory=dict)
+
+    # Per-file values of a rule file's rules (json2opm.rules), and the
+    # fingerprint of the rule set they were taken with (None: no rules)
+    rule_values: dict[str, Any] = field(default_factory=dict)
+    rules_id: str | None = None
+
+
+def extract_features(doc: dict, source_doc: dict | None = None, rules: RuleSet | None = None) -> OpmFeatures:
+    """
+    `source_doc` is the Exchange JSON the OPM was converted from, if at hand;
+    it supplies metadata the OPM format doesn't carry (metadata.testPointName).
+    With `rules`, the values their paths select are taken as well.
+
+    The document's layout is detected once and its Measurements are walked
+    once; every A/Z field comes out of that pass.
+    """
+    schema = detect_schema(doc)
+    root = _opm_root(doc, schema)
+    rows, rows_in_root = _measurement_rows(doc, root)
+    # High loss (any FAIL indication; reported, never a merge blocker).
+    # Per-measurement Fail statuses only count in native documents, and only
+    # need looking for if the document-level verdicts haven't settled it
+    verdict_failed = doc.get("GlobalVerdict") == "Fail" or (schema == OPM_NATIVE and root.get("Status") == "Fail")
+    scan = _scan_measurements(rows, statuses=schema == OPM_NATIVE and rows_in_root and not verdict_failed)
+    connectors = root.get("Connectors")
+    if not isinstance(connectors, dict):
+        connectors = {}
+    length, length_missing = _get_length_numeric_or_missing(doc, schema, root, scan, rows_in_root)
+    return OpmFeatures(
+        expected_polarity=_get_polarity(connectors, "ExpectedConnectors"),
+        actual_polarity=_get_polarity(connectors, "ActualConnectors"),
+        polarity_status=_get_polarity_status(connectors),
+        wavelengths_nm=sorted(scan.wavelengths_nm),
+        length=length,
+        length_missing=length_missing,
+        high_loss=verdict_failed or scan.failed,
+        cable_id=_get_job_cable_id(doc),
+        ose=_get_ose_from_job_id(doc),
+        test_date=_get_test_datetime(doc),
+        tester=_get_tester_string(doc),
+        job_id=_get_identification_job_id(doc) or _get_identification_job_id(source_doc),
+        test_point_name=_get_test_point_name(doc) or _get_test_point_name(source_doc),
+        fiber_lengths=scan.fiber_lengths,
+        rule_values=rules.extract(doc) if rules is not None else {},
+        rules_id=rules.fingerprint if rules is not None else None,
+    )
+
+
+# ---- Punch metadata ----
+
+def _get_job_cable_id(doc: dict) -> str | None:
+    # Your note: Cable ID is populated from JobId
+    job = doc.get("JobId")
+    if not job:
+        return None
+    # Example: "PATH_1_LCO1-NS3-LCO2-DHB-00001.A03"
+    # We want the middle “cable id chunk”
+    m = re.search(r"PATH_\d+_(.+)", str(job))
+    if not m:
+        return str(job)
+    return m.group(1)
+
+
+def _get_ose_from_job_id(doc: dict) -> str | None:
+    job = doc.get("JobId")
+    if not job:
+        return None
+    # Try to find something like "...A03" (path / segment)
+    m = re.search(r"\.(A\d+|Z\d+)$", str(job))
+    if m:
+        return m.group(1)
+    return None
+
+
+def _get_identification_job_id(doc: dict | None) -> str | None:
+    # OPM: Identification.JobId; Exchange JSON: brief.Identification.JobId
+    if not isinstance(doc, dict):
+        return None
+    for root in (doc, doc.get("brief")):
+        if not isinstance(root, dict):
+            continue
+        ident = root.get("Identification")
+        if isinstance(ident, dict) and ident.get("JobId"):
+            return str(ident["JobId"])
+        if root.get("JobId"):
+            return str(root["JobId"])
+    return None
+
+
+def _get_test_point_name(doc: dict | None) -> str | None:
+    if not isinstance(doc, dict):
+        return None
+    meta = doc.get("metadata")
+    if isinstance(meta, dict) and meta.get("testPointName"):
+        return str(meta["testPointName"])
+    return None
+
+
+def _get_test_datetime(doc: dict) -> str | None:
+    # We’ll try a few common spots
+    for k in ("DateTime", "TestDateTime", "Timestamp", "CreatedAt", "TestDate"):
+        v = doc.get(k)
+        if v:
+            return str(v)
+    # Sometimes under OpticalData
+    od = doc.get("OpticalData")
+    if isinstance(od, dict):
+        for k in ("DateTime", "TestDateTime", "Timestamp", "TestDate"):
+            v = od.get(k)
+            if v:
+                return str(v)
+    return None
+
+
+def _get_tester_string(doc: dict) -> str | None:
+    # Try a bunch of likely keys without being brittle
+    candidates = []
+    for k in ("TestSet", "TestSetName", "TestSetModel", "Instrument", "InstrumentName", "Tester", "Operator"):
+        v = doc.get(k)
+        if v:
+            candidates.append(str(v))
+    od = doc.get("OpticalData")
+    if isinstance(od, dict):
+        for k in ("TestSet", "Instrument", "InstrumentName", "Tester", "Operator"):
+            v = od.get(k)
+            if v:
+                candidates.append(str(v))
+    if candidates:
+        return " | ".join(dict.fromkeys(candidates))  # de-dupe while keeping order
+    return None
+
+
+# ---- Document layout ----
+
+# Where a document keeps its results; detect_schema() classifies each
+# document once and extract_features() reads it according to that.
+OPM_NATIVE = "opm"              # doc["Measurement"]["OpmResultData"] (native test-set exports)
+OPM_ROOTED = "rooted"           # Connectors / Measurements at the top level (some generated outputs)
+OPTICAL_DATA = "optical_data"   # older/alternate: Measurements under OpticalData
+
+
+def _optical_measurements(doc: dict) -> list | None:
+    od = doc.get("OpticalData")
+    meas = od.get("Measurements") if isinstance(od, dict) else None
+    return meas if isinstance(meas, list) else None
+
+
+def detect_schema(doc: dict) -> str:
+    """OPM_NATIVE, OPM_ROOTED or OPTICAL_DATA."""
+    m = doc.get("Measurement")
+    if isinstance(m, dict) and isinstance(m.get("OpmResultData"), dict):
+        return OPM_NATIVE
+    if not isinstance(doc.get("Measurements"), list) and _optical_measurements(doc) is not None:
+        return OPTICAL_DATA
+    return OPM_ROOTED
+
+
+def _opm_root(doc: dict, schema: str) -> dict:
+    """The dict holding Connectors (and usually Measurements)."""
+    return doc["Measurement"]["OpmResultData"] if schema == OPM_NATIVE else doc
+
+
+def _measurement_rows(doc: dict, root: dict) -> tuple[list, bool]:
+    """The Measurements list and whether it is the root's (else OpticalData's, or [])."""
+    meas = root.get("Measurements")
+    if isinstance(meas, list):
+        return meas, True
+    return _optical_measurements(doc) or [], False
+
+
+# ---- Single pass over Measurements ----
+
+@dataclass(slots=True)
+class _MeasurementScan:
+    wavelengths_nm: set[int]
+    fiber_lengths: dict[str, float | None]
+    length_info: dict | None    # the first FiberLength.LengthInfo that has a Length key
+    failed: bool                # a measurement or reading with a Fail status (if asked for)
+
+
+def _length_info(fl) -> dict | None:
+    li = fl.get("LengthInfo") if isinstance(fl, dict) else None
+    return li if isinstance(li, dict) and "Length" in li else None
+
+
+def _scan_measurements(rows: list, statuses: bool) -> _MeasurementScan:
+    """
+    Everything extract_features() needs from the Measurements, in one
+    iteration. `statuses`: also look for Fail statuses (stops looking at
+    the first one).
+    """
+    wavelengths: set[int] = set()
+    fibers: dict[str, float | None] = {}
+    first_li = None
+    failed = False
+    for m in rows:
+        if not isinstance(m, dict):
+            continue
+        get = m.get
+        w = get("Wavelength")
+        if isinstance(w, (int, float)):
+            wavelengths.add(int(w))
+
+        # A fiber measured at several wavelengths keeps its first length, so
+        # FiberLength is only looked at until every fiber (and the file) has one
+        name = get("Name")
+        if name is not None:
+            name = str(name)
+            if fibers.get(name) is not None:
+                name = None
+        if name is not None or first_li is None:
+            fl = get("FiberLength")
+            li = fl.get("LengthInfo") if isinstance(fl, dict) else None
+            if not isinstance(li, dict):
+                li = None
+            elif first_li is None and "Length" in li:
+                first_li = li
+            if name is not None:
+                fibers[name] = numeric_value(li.get("Length")) if li is not None else None
+
+        if statuses:
+            # Sometimes individual measurement may have a Status/Verdict
+            if get("Status") == "Fail" or get("Verdict") == "Fail":
+                failed, statuses = True, False
+                continue
+            readings = get("Readings")
+            if isinstance(readings, list):
+                for r in readings:
+                    if isinstance(r, dict) and r.get("Status") == "Fail":
+                        failed, statuses = True, False
+                        break
+    return _MeasurementScan(wavelengths, fibers, first_li, failed)
+
+
+def _first_length_info(rows: list) -> dict | None:
+    for m in rows:
+        if isinstance(m, dict):
+            li = _length_info(m.get("FiberLength"))
+            if li is not None:
+                return li
+    return None
+
+
+# ---- Polarity ----
+
+def _get_polarity(connectors: dict, key: str) -> str | None:
+    # key: ExpectedConnectors / ActualConnectors
+    side = connectors.get(key)
+    if not isinstance(side, dict):
+        return None
+    pol = side.get("PolarityType")
+    return _normalize_polarity(pol) if pol else None
+
+
+def _get_polarity_status(connectors: dict) -> str | None:
+    ps = connectors.get("PolarityStatus")
+    return str(ps) if ps is not None else None
+
+
+def _normalize_polarity(pol) -> str:
+    s = str(pol).strip()
+    # unify separators: "MPO B" -> "MPO_B"
+    s = s.replace(" ", "_")
+    # collapse double underscores just in case
+    while "__" in s:
+        s = s.replace("__", "_")
+    return s
+
+
+# ---- Measurements / readings (fleet statistics, readings export) ----
+
+def get_measurements(doc: dict) -> list[dict]:
+    """The Measurements list (one entry per fiber and wavelength), or []."""
+    if not isinstance(doc, dict):
+        return []
+    rows, _ = _measurement_rows(doc, _opm_root(doc, detect_schema(doc)))
+    return [m for m in rows if isinstance(m, dict)]
+
+
+def numeric_value(v) -> float | None:
+    """A number, or the "Value" of a {"Value": ..., "Unit": ...} dict; None otherwise."""
+    if isinstance(v, dict):
+        v = v.get("Value")
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return None
+    return float(v)
+
+
+def wavelength_nm(v) -> int | None:
+    w = numeric_value(v)
+    if w is None:
+        return None
+    # Exported in metres (1.31e-06); some variants already use nm
+    return int(round(w * 1e9)) if w < 1e-3 else int(round(w))
+
+
+def measurement_length(m: dict) -> float | None:
+    fl = m.get("FiberLength")
+    li = fl.get("LengthInfo") if isinstance(fl, dict) else None
+    return numeric_value(li.get("Length")) if isinstance(li, dict) else None
+
+
+# ---- Length ----
+
+def _get_length_numeric_or_missing(
+    doc: dict,
+    schema: str,
+    root: dict,
+    scan: _MeasurementScan,
+    rows_in_root: bool,
+) -> tuple[float | None, bool]:
+    """
+    ONLY care about FiberLength.LengthInfo.Length numeric vs null (anything
+    numeric_value() doesn't take, e.g. a string, counts as missing).
+    Ignore FiberLength.Status entirely.
+
+    The first LengthInfo with a Length key decides, looked up in order:
+      Measurement.OpmResultData.Measurements[i].FiberLength.LengthInfo (primary)
+      Measurement.OpmResultData.FiberLength.LengthInfo
+      OpticalData.Measurements[i].FiberLength.LengthInfo (older/alternate)
+      FiberLength.LengthInfo (doc level)
+    The Measurements found by the scan are not looked at again.
+    """
+    native = schema == OPM_NATIVE
+    li = scan.length_info if native and rows_in_root else None
+    if li is None and native:
+        # Some variants store FiberLength at OpmResultData level
+        li = _length_info(root.get("FiberLength"))
+    if li is None:
+        if not rows_in_root:
+            # The scan already went through OpticalData's Measurements (or there are none)
+            li = scan.length_info
+        else:
+            optical = _optical_measurements(doc)
+            li = _first_length_info(optical) if optical is not None else None
+    if li is None:
+        li = _length_info(doc.get("FiberLength"))
+    if li is None:
+        return None, True
+
+    # Read like the per-fiber lengths, so the two never disagree on what counts as a number
+    val = numeric_value(li.get("Length"))
+    if val is None:
+        return None, True
+    return val, False
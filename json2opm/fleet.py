@@ -0,0 +1,412 @@
+"""
+Fleet-wide loss statistics over every reading in a results folder.
+
+Each .opm holds Measurements (one per fiber and wavelength), each with
+Readings[].Value (dB), Reference.Value (dBm), Wavelength and
+FiberLength.LengthInfo.Length. load_reading_table() flattens a folder into a
+columnar ReadingTable (one row per reading, with pair / side / fiber /
+wavelength index columns); fleet_stats() then computes per-wavelength loss
+distributions, outliers and A-vs-Z loss deltas with whole-array NumPy
+operations, so 1M+ readings take well under a second once loaded.
+
+NumPy is optional for the rest of the tool; only this module needs it.
+"""
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from json2opm.features import (
+    OpmFeatures,
+    extract_features,
+    get_measurements,
+    measurement_length,
+    numeric_value,
+    wavelength_nm,
+)
+from json2opm.loader import load_json
+from json2opm.pairing import DEFAULT_PAIR_KEY, MERGED_SUFFIX, PairKeyStrategy
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the install
+    np = None
+
+
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+
+# Tukey fences: a reading is an outlier when it is more than this many IQRs
+# outside the middle 50% of its wavelength's readings
+OUTLIER_IQR_FACTOR = 1.5
+
+SIDE_CODES = {"A": 0, "Z": 1}
+
+# Files per worker task when loading across a process pool
+_FILE_CHUNK_SIZE = 64
+
+# Column name -> array typecode, as collected per file chunk
+_COLUMNS = {
+    "file": "l",            # index into ReadingTable.files
+    "fiber": "l",           # Measurements[].Name as a number, -1 if it isn't one
+    "wavelength_nm": "l",
+    "loss_db": "d",
+    "reference_dbm": "d",   # NaN if missing
+    "length": "d",          # NaN if missing
+    "fail": "b",
+}
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Fleet statistics need NumPy (pip install numpy)")
+
+
+@dataclass
+class ReadingTable:
+    """
+    One row per reading, as parallel NumPy arrays (see _COLUMNS).
+
+    `pair` and `side` are per row too (looked up via the row's file): `pair`
+    indexes `pair_keys` and is -1 for files without a pair key, `side` is
+    0 (A), 1 (Z) or -1.
+    """
+
+    files: list[Path]
+    pair_keys: list[str]
+    file: Any
+    fiber: Any
+    wavelength_nm: Any
+    loss_db: Any
+    reference_dbm: Any
+    length: Any
+    fail: Any
+    pair: Any
+    side: Any
+    errors: list[tuple[Path, str]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.loss_db)
+
+
+# ---------------- Loading ----------------
+
+def _fiber_number(name: Any) -> int:
+    try:
+        return int(str(name).strip())
+    except ValueError:
+        return -1
+
+
+def _append_readings(cols: dict[str, array], file_idx: int, doc: dict) -> None:
+    for m in get_measurements(doc):
+        wl = wavelength_nm(m.get("Wavelength"))
+        readings = m.get("Readings")
+        if wl is None or not isinstance(readings, list):
+            continue
+        fiber = _fiber_number(m.get("Name"))
+        ref = numeric_value(m.get("Reference"))
+        length = measurement_length(m)
+        for r in readings:
+            if not isinstance(r, dict):
+                continue
+            loss = numeric_value(r.get("Value"))
+            if loss is None:
+                continue
+            cols["file"].append(file_idx)
+            cols["fiber"].append(fiber)
+            cols["wavelength_nm"].append(wl)
+            cols["loss_db"].append(loss)
+            cols["reference_dbm"].append(float("nan") if ref is None else ref)
+            cols["length"].append(float("nan") if length is None else length)
+            cols["fail"].append(r.get("Status") == "Fail")
+
+
+def _read_chunk(
+    paths: list[Path],
+    pair_key: PairKeyStrategy,
+    known: dict[Path, OpmFeatures],
+) -> tuple[list[tuple[Path, str | None, str | None]], list[tuple[Path, str]], dict[str, array]]:
+    """
+    Read a chunk of files into compact columns (file = index within the chunk).
+    `known` features are used for feature-based pair keys when available.
+    Module-level so it pickles into worker processes.
+    """
+    files: list[tuple[Path, str | None, str | None]] = []
+    errors: list[tuple[Path, str]] = []
+    cols = {name: array(code) for name, code in _COLUMNS.items()}
+    for path in paths:
+        try:
+            doc = load_json(path)
+            features = None
+            if pair_key.uses_features:
+                features = known.get(path) or extract_features(doc)
+            key, side, _ = pair_key.key(path, features)
+            _append_readings(cols, len(files), doc)
+        except Exception as e:
+            errors.append((path, str(e)))
+            continue
+        files.append((path, key, side))
+    return files, errors, cols
+
+
+def load_reading_table(
+    paths: Iterable[Path],
+    pair_key: PairKeyStrategy | None = None,
+    jobs: int = 1,
+    cancel: threading.Event | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+    features: dict[Path, OpmFeatures] | None = None,
+) -> ReadingTable:
+    """
+    Parse .opm files (skipping *_MergeMF outputs) into a ReadingTable.
+
+    Files are read in chunks, across a process pool when jobs > 1; each chunk
+    comes back as flat typed arrays, which are concatenated once at the end.
+    Unreadable files are listed in `errors`. `on_progress(done, total)` counts files.
+
+    `features` (e.g. from the folder's index) supplies what feature-based pair
+    keys need; testPointName in particular is only known from there.
+    """
+    require_numpy()
+    pair_key = pair_key or DEFAULT_PAIR_KEY
+    features = features if pair_key.uses_features and features else {}
+    paths = [p for p in paths if not p.stem.endswith(MERGED_SUFFIX)]
+    total = len(paths)
+    chunks = [paths[i:i + _FILE_CHUNK_SIZE] for i in range(0, total, _FILE_CHUNK_SIZE)]
+    known = [{p: features[p] for p in chunk if p in features} for chunk in chunks]
+
+    files: list[Path] = []
+    file_pair: list[int] = []
+    file_side: list[int] = []
+    pair_index: dict[str, int] = {}
+    errors: list[tuple[Path, str]] = []
+    parts: dict[str, list] = {name: [] for name in _COLUMNS}
+    done = 0
+
+    def collect(chunk_files, chunk_errors, cols, chunk_len) -> None:
+        nonlocal done
+        offset = len(files)
+        for path, key, side in chunk_files:
+            files.append(path)
+            file_pair.append(pair_index.setdefault(key, len(pair_index)) if key is not None else -1)
+            file_side.append(SIDE_CODES.get(side, -1))
+        errors.extend(chunk_errors)
+        for name in _COLUMNS:
+            part = np.frombuffer(cols[name], dtype=cols[name].typecode) if len(cols[name]) else None
+            if part is not None:
+                parts[name].append(part + offset if name == "file" else part)
+        done += chunk_len
+        if on_progress:
+            on_progress(done, total)
+
+    if jobs <= 1 or len(chunks) <= 1:
+        for chunk, chunk_known in zip(chunks, known):
+            if cancel is not None and cancel.is_set():
+                break
+            collect(*_read_chunk(chunk, pair_key, chunk_known), len(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # map() keeps chunk order, so file indices stay in input order
+            for chunk, out in zip(chunks, pool.map(_read_chunk, chunks, [pair_key] * len(chunks), known)):
+                if cancel is not None and cancel.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+                collect(*out, len(chunk))
+
+    columns: dict[str, Any] = {}
+    for name, code in _COLUMNS.items():
+        dtype = bool if name == "fail" else np.dtype(code)
+        columns[name] = np.concatenate(parts[name]).astype(dtype) if parts[name] else np.empty(0, dtype=dtype)
+
+    pairs_arr = np.asarray(file_pair, dtype=np.int64)
+    sides_arr = np.asarray(file_side, dtype=np.int8)
+    return ReadingTable(
+        files=files,
+        pair_keys=list(pair_index),
+        **columns,
+        pair=pairs_arr[columns["file"]] if len(files) else np.empty(0, dtype=np.int64),
+        side=sides_arr[columns["file"]] if len(files) else np.empty(0, dtype=np.int8),
+        errors=errors,
+    )
+
+
+# ---------------- Statistics ----------------
+
+def _group_percentiles(values, group, n_groups: int, qs) -> Any:
+    """
+    Percentiles of `values` within each group (linear interpolation, like
+    np.percentile), for all groups at once: one sort, then index arithmetic.
+    Returns an (n_groups, len(qs)) array, NaN for empty groups.
+    """
+    # Sort by value, then stably by group: same order as lexsort, but the
+    # second pass is a cheap integer sort
+    by_value = np.argsort(values)
+    v = values[by_value][np.argsort(group[by_value], kind="stable")]
+    counts = np.bincount(group, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    pos = starts[:, None] + (np.maximum(counts, 1)[:, None] - 1) * (np.asarray(qs, dtype=float) / 100.0)[None, :]
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    frac = pos - lo
+    if len(v):
+        lo = np.clip(lo, 0, len(v) - 1)
+        hi = np.clip(hi, 0, len(v) - 1)
+        out = v[lo] * (1 - frac) + v[hi] * frac
+    else:
+        out = np.full(pos.shape, np.nan)
+    out[counts == 0] = np.nan
+    return out
+
+
+def _r(x: Any) -> float | None:
+    x = float(x)
+    return None if x != x else round(x, 3)
+
+
+def _top(mask, score, limit: int):
+    """Row indices where mask holds, largest score first, at most `limit`."""
+    idx = np.flatnonzero(mask)
+    if limit <= 0:
+        return idx[:0]
+    if len(idx) > limit:
+        idx = idx[np.argpartition(-score[idx], limit - 1)[:limit]]
+    return idx[np.argsort(-score[idx], kind="stable")]
+
+
+def _row_ref(t: ReadingTable, i: int) -> dict:
+    p = int(t.pair[i])
+    side = int(t.side[i])
+    return {
+        "file": t.files[int(t.file[i])].name,
+        "pair_key": t.pair_keys[p] if p >= 0 else None,
+        "side": "AZ"[side] if side >= 0 else None,
+        "fiber": int(t.fiber[i]),
+        "wavelength_nm": int(t.wavelength_nm[i]),
+    }
+
+
+def fleet_stats(t: ReadingTable, top: int = 50, iqr_factor: float = OUTLIER_IQR_FACTOR) -> dict:
+    """
+    Per-wavelength loss distributions, Tukey outliers and A-vs-Z loss deltas.
+    JSON-ready; lists of individual readings are capped at `top` entries.
+    """
+    require_numpy()
+    loss = t.loss_db
+    wls, wl_idx = np.unique(t.wavelength_nm, return_inverse=True)
+    n_wl = len(wls)
+
+    # -------- Distributions --------
+    counts = np.bincount(wl_idx, minlength=n_wl)
+    sums = np.bincount(wl_idx, weights=loss, minlength=n_wl)
+    sq = np.bincount(wl_idx, weights=loss * loss, minlength=n_wl)
+    fails = np.bincount(wl_idx, weights=t.fail, minlength=n_wl)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        stds = np.sqrt(np.maximum(sq / counts - means * means, 0.0))
+    # p0 / p100 are min / max; one sort serves them all
+    qs = (0, 25, 75, 100) + PERCENTILES
+    pcts = _group_percentiles(loss, wl_idx, n_wl, qs)
+    mins, q1, q3, maxs = pcts[:, 0], pcts[:, 1], pcts[:, 2], pcts[:, 3]
+    pcts = pcts[:, 4:]
+
+    # -------- Outliers (Tukey fences per wavelength) --------
+    iqr = q3 - q1
+    lo_fence = q1 - iqr_factor * iqr
+    hi_fence = q3 + iqr_factor * iqr
+    beyond = np.maximum(loss - hi_fence[wl_idx], lo_fence[wl_idx] - loss)
+    outlier = beyond > 0
+    outlier_counts = np.bincount(wl_idx, weights=outlier, minlength=n_wl)
+
+    per_wavelength = []
+    for g in range(n_wl):
+        per_wavelength.append({
+            "wavelength_nm": int(wls[g]),
+            "readings": int(counts[g]),
+            "fail": int(fails[g]),
+            "mean_db": _r(means[g]),
+            "std_db": _r(stds[g]),
+            "min_db": _r(mins[g]),
+            "max_db": _r(maxs[g]),
+            "percentiles_db": {f"p{q}": _r(pcts[g, k]) for k, q in enumerate(PERCENTILES)},
+            "outlier_fences_db": [_r(lo_fence[g]), _r(hi_fence[g])],
+            "outliers": int(outlier_counts[g]),
+        })
+
+    outliers = []
+    for i in _top(outlier, beyond, top):
+        outliers.append({**_row_ref(t, i), "loss_db": _r(loss[i]), "beyond_fence_db": _r(beyond[i])})
+
+    return {
+        "files": len(t.files),
+        "readings": len(t),
+        "pairs": len(t.pair_keys),
+        "fail_readings": int(t.fail.sum()),
+        "unreadable_files": len(t.errors),
+        "per_wavelength": per_wavelength,
+        "outliers": outliers,
+        "az_delta": _az_deltas(t, wls, wl_idx, top),
+    }
+
+
+def _az_deltas(t: ReadingTable, wls, wl_idx, top: int) -> dict:
+    """
+    loss(A) - loss(Z) for every (pair, fiber, wavelength) measured on both
+    sides. Rows are matched by a single integer key per side, so the join is
+    two np.unique calls and one np.intersect1d. The first reading wins if a
+    side has several for the same key.
+    """
+    n_wl = len(wls)
+    usable = (t.pair >= 0) & (t.side >= 0) & (t.fiber >= 0)
+    if not usable.any():
+        return {"matched": 0, "per_wavelength": [], "largest": []}
+
+    n_fiber = int(t.fiber[usable].max()) + 1
+    key = (t.pair.astype(np.int64) * n_fiber + t.fiber) * n_wl + wl_idx
+
+    a_rows = np.flatnonzero(usable & (t.side == 0))
+    z_rows = np.flatnonzero(usable & (t.side == 1))
+    a_keys, a_first = np.unique(key[a_rows], return_index=True)
+    z_keys, z_first = np.unique(key[z_rows], return_index=True)
+    _, ia, iz = np.intersect1d(a_keys, z_keys, assume_unique=True, return_indices=True)
+    a_idx = a_rows[a_first[ia]]
+    z_idx = z_rows[z_first[iz]]
+
+    delta = t.loss_db[a_idx] - t.loss_db[z_idx]
+    abs_delta = np.abs(delta)
+    g = wl_idx[a_idx]
+    counts = np.bincount(g, minlength=n_wl)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(g, weights=delta, minlength=n_wl) / counts
+        mean_abs = np.bincount(g, weights=abs_delta, minlength=n_wl) / counts
+    pcts = _group_percentiles(abs_delta, g, n_wl, (50, 95, 100))
+
+    per_wavelength = [
+        {
+            "wavelength_nm": int(wls[w]),
+            "matched": int(counts[w]),
+            "mean_db": _r(mean[w]),
+            "mean_abs_db": _r(mean_abs[w]),
+            "p50_abs_db": _r(pcts[w, 0]),
+            "p95_abs_db": _r(pcts[w, 1]),
+            "max_abs_db": _r(pcts[w, 2]),
+        }
+        for w in range(n_wl)
+    ]
+
+    largest = []
+    for k in _top(np.ones(len(delta), dtype=bool), abs_delta, top):
+        i = a_idx[k]
+        ref = _row_ref(t, i)
+        largest.append({
+            "pair_key": ref["pair_key"],
+            "fiber": ref["fiber"],
+            "wavelength_nm": ref["wavelength_nm"],
+            "a_db": _r(t.loss_db[i]),
+            "z_db": _r(t.loss_db[z_idx[k]]),
+            "delta_db": _r(delta[k]),
+        })
+
+    return {"matched": int(len(delta)), "per_wavelength": per_wavelength, "largest": largest}
@@ -0,0 +1,344 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from json2opm.features import OpmFeatures
+from json2opm.lazy import features_from_bytes
+from json2opm.rules import RuleSet
+
+
+# Lives next to the .opm files it describes, so moving/copying the folder keeps it valid
+INDEX_FILENAME = ".json2opm_index.sqlite"
+
+# Bump whenever OpmFeatures or extract_features() changes meaning; older
+# indexes are then discarded and rebuilt instead of returning stale values.
+SCHEMA_VERSION = 6
+
+_COLUMNS = [
+    "expected_polarity",
+    "actual_polarity",
+    "polarity_status",
+    "wavelengths_nm",
+    "length",
+    "length_missing",
+    "high_loss",
+    "cable_id",
+    "ose",
+    "test_date",
+    "tester",
+    "job_id",
+    "test_point_name",
+    "fiber_lengths",
+    "rule_values",
+    "rules_id",
+]
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _row_to_features(row: sqlite3.Row) -> OpmFeatures:
+    return OpmFeatures(
+        expected_polarity=row["expected_polarity"],
+        actual_polarity=row["actual_polarity"],
+        polarity_status=row["polarity_status"],
+        wavelengths_nm=json.loads(row["wavelengths_nm"]),
+        length=row["length"],
+        length_missing=bool(row["length_missing"]),
+        high_loss=bool(row["high_loss"]),
+        cable_id=row["cable_id"],
+        ose=row["ose"],
+        test_date=row["test_date"],
+        tester=row["tester"],
+        job_id=row["job_id"],
+        test_point_name=row["test_point_name"],
+        fiber_lengths=json.loads(row["fiber_lengths"]),
+        rule_values=json.loads(row["rule_values"]),
+        rules_id=row["rules_id"],
+    )
+
+
+def _features_to_values(f: OpmFeatures) -> list:
+    return [
+        f.expected_polarity,
+        f.actual_polarity,
+        f.polarity_status,
+        json.dumps(f.wavelengths_nm),
+        f.length,
+        int(f.length_missing),
+        int(f.high_loss),
+        f.cable_id,
+        f.ose,
+        f.test_date,
+        f.tester,
+        f.job_id,
+        f.test_point_name,
+        json.dumps(f.fiber_lengths),
+        json.dumps(f.rule_values),
+        f.rules_id,
+    ]
+
+
+class FeatureIndex:
+    """
+    Persistent OpmFeatures cache for one results folder (SQLite).
+
+    A row is reused when the file's size and mtime are unchanged and its
+    ctime is older than the row, i.e. nothing has been done to the file since
+    it was indexed. Otherwise the file is read: if its content hash still
+    matches (file touched, copied, or rewritten with its old size and mtime),
+    only the stat columns are refreshed; if not, it is parsed again. Rows
+    stored without a hash (see record()) are re-parsed in that case.
+    (On Windows st_ctime is the creation time, so there a rewrite that keeps
+    size and mtime goes unnoticed.)
+    Files that fail to parse are never cached, so the analysis reports them
+    exactly as it would without an index.
+
+    With `rules`, a row only counts if its features were extracted with that
+    rule set (OpmFeatures.rules_id); rows taken with any rule set serve
+    lookups without one.
+    """
+
+    def __init__(self, folder: Path, rules: Optional[RuleSet] = None):
+        self.folder = folder
+        self.rules = rules
+        self.path = folder / INDEX_FILENAME
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self._ensure_schema()
+
+        # Counters over all lookup() calls since the index was opened, for logging
+        self.hits = 0
+        self.parsed = 0
+
+    def __enter__(self) -> "FeatureIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _ensure_schema(self) -> None:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS features")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS features ("
+            "name TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, indexed_ns INTEGER NOT NULL, "
+            "hash TEXT, "
+            f"{', '.join(_COLUMNS)})"
+        )
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def _usable(self, row: sqlite3.Row) -> bool:
+        return self.rules is None or row["rules_id"] == self.rules.fingerprint
+
+    @staticmethod
+    def _fresh(row: sqlite3.Row, st: os.stat_result) -> bool:
+        # Same size and mtime, and the inode unchanged since the row was written
+        return (
+            row["size"] == st.st_size
+            and row["mtime_ns"] == st.st_mtime_ns
+            and st.st_ctime_ns < row["indexed_ns"]
+        )
+
+    def _key(self, path: Path) -> str:
+        # Relative to the indexed folder when possible, so the folder can move
+        try:
+            return str(path.relative_to(self.folder))
+        except ValueError:
+            return str(path.resolve())
+
+    def _upsert(self, key: str, st: os.stat_result, digest: Optional[str], f: OpmFeatures) -> None:
+        placeholders = ", ".join("?" for _ in range(5 + len(_COLUMNS)))
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO features (name, size, mtime_ns, indexed_ns, hash, {', '.join(_COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            [key, st.st_size, st.st_mtime_ns, time.time_ns(), digest] + _features_to_values(f),
+        )
+
+    def record(
+        self,
+        features: Dict[Path, OpmFeatures],
+        parsed: bool = False,
+        hashes: Optional[Dict[Path, str]] = None,
+    ) -> None:
+        """
+        Store features that were computed elsewhere (e.g. by the converter).
+        `hashes` are the files' content_hash()es where the caller has them
+        (the converter hashes what it writes); a path without one is parsed
+        again whenever its stat no longer vouches for the row.
+        parsed=True counts them as parsed (extracted from the .opm by a worker).
+        """
+        hashes = hashes or {}
+        with self.conn:
+            for path, f in features.items():
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                self._upsert(self._key(path), st, hashes.get(path), f)
+                self.parsed += parsed
+
+    def _rows_for(self, keys: list[str]) -> Dict[str, sqlite3.Row]:
+        rows: Dict[str, sqlite3.Row] = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            q = f"SELECT * FROM features WHERE name IN ({', '.join('?' for _ in chunk)})"
+            rows.update((r["name"], r) for r in self.conn.execute(q, chunk))
+        return rows
+
+    def lookup(self, paths: Iterable[Path], prune: bool = False) -> Dict[Path, OpmFeatures]:
+        """
+        Return features for every path that is cached or parses cleanly.
+
+        With prune=True, rows for files not in `paths` are deleted, which keeps
+        the index in step with the folder when `paths` is a full listing.
+        Without it only the requested rows are read, so calling this once per
+        A/Z pair while a folder is being streamed stays cheap.
+        """
+        paths = list(paths)
+        if prune:
+            rows = {r["name"]: r for r in self.conn.execute("SELECT * FROM features")}
+        else:
+            rows = self._rows_for([self._key(p) for p in paths])
+
+        out: Dict[Path, OpmFeatures] = {}
+        seen: set[str] = set()
+        with self.conn:
+            for path in paths:
+                key = self._key(path)
+                seen.add(key)
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+
+                row = rows.get(key)
+                if row is not None and not self._usable(row):
+                    row = None
+                if row is not None and self._fresh(row, st):
+                    out[path] = _row_to_features(row)
+                    self.hits += 1
+                    continue
+
+                try:
+                    data = path.read_bytes()
+                except OSError:
+                    continue
+                digest = content_hash(data)
+
+                if row is not None and row["hash"] == digest:
+                    self.conn.execute(
+                        "UPDATE features SET size = ?, mtime_ns = ?, indexed_ns = ? WHERE name = ?",
+                        (st.st_size, st.st_mtime_ns, time.time_ns(), key),
+                    )
+                    out[path] = _row_to_features(row)
+                    self.hits += 1
+                    continue
+
+                try:
+                    f = features_from_bytes(data, self.rules)
+                except Exception:
+                    # Leave it to the analysis to load and report this file
+                    continue
+                self._upsert(key, st, digest, f)
+                out[path] = f
+                self.parsed += 1
+
+            if prune:
+                stale = [(k,) for k in rows if k not in seen]
+                self.conn.executemany("DELETE FROM features WHERE name = ?", stale)
+
+        return out
+
+    def cached(self, paths: Iterable[Path]) -> Dict[Path, OpmFeatures]:
+        """
+        Features for the paths whose row is still valid by its stat (see the
+        class docstring), without reading any file; the rest, including rows
+        that would need a hash check, are left to the caller (e.g. worker
+        processes).
+        """
+        paths = list(paths)
+        rows = self._rows_for([self._key(p) for p in paths])
+        out: Dict[Path, OpmFeatures] = {}
+        for path in paths:
+            row = rows.get(self._key(path))
+            if row is None or not self._usable(row):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if self._fresh(row, st):
+                out[path] = _row_to_features(row)
+                self.hits += 1
+        return out
+
+    def prune(self, paths: Iterable[Path]) -> None:
+        """Delete rows for files not in `paths` (a full listing of the folder)."""
+        keep = {self._key(p) for p in paths}
+        with self.conn:
+            stale = [(k,) for (k,) in self.conn.execute("SELECT name FROM features") if k not in keep]
+            self.conn.executemany("DELETE FROM features WHERE name = ?", stale)
+
+
+def open_feature_index(folder: Path, rules: Optional[RuleSet] = None) -> Optional[FeatureIndex]:
+    """FeatureIndex for `folder`, or None if it can't be opened (read-only share, locked file, ...)."""
+    try:
+        return FeatureIndex(folder, rules)
+    except (sqlite3.Error, OSError):
+        return None
+
+
+def load_cached_features(
+    folder: Path,
+    paths: Iterable[Path],
+    prune: bool = True,
+    rules: Optional[RuleSet] = None,
+) -> tuple[Dict[Path, OpmFeatures], int, int]:
+    """
+    Features for `paths` via the folder's index (taken with `rules`, see
+    FeatureIndex). With prune=True (for full folder listings) rows for files
+    not in `paths` are dropped.
+    Returns (features, cache_hits, parsed). Any index problem degrades to an
+    empty result, and the analysis then simply reads the files itself.
+    """
+    index = open_feature_index(folder, rules)
+    if index is None:
+        return {}, 0, 0
+    try:
+        with index:
+            features = index.lookup(paths, prune=prune)
+            return features, index.hits, index.parsed
+    except (sqlite3.Error, OSError):
+        return {}, 0, 0
+
+
+def record_features(
+    folder: Path,
+    features: Dict[Path, OpmFeatures],
+    hashes: Optional[Dict[Path, str]] = None,
+) -> bool:
+    """
+    Seed the folder's index with features (and the outputs' content hashes,
+    see FeatureIndex.record) computed during conversion. Best effort.
+    """
+    index = open_feature_index(folder)
+    if index is None:
+        return False
+    try:
+        with index:
+            index.record(features, hashes=hashes)
+        return True
+    except (sqlite3.Error, OSError):
+        return False
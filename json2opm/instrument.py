@@ -0,0 +1,230 @@
+"""
+Where a run's time goes: per-stage timers and counters, an optional
+cProfile / tracemalloc capture, and the JSON run report.
+
+Stages are named after what the code does to a file: list (finding the
+inputs), read, parse (load_json), map (map_pxm_json_to_opm), serialize
+(the .opm JSON), write, features, readings, then analyze (pairing and A/Z
+checks), merge and punch (the CSV). Each keeps seconds, files, bytes and
+errors.
+
+Conversion and merging run in worker processes, which time their own
+stages with a StageClock and send the times back with their results;
+RunMetrics adds them up in the calling process. Stage seconds are therefore
+summed over workers and can exceed the run's wall time with jobs > 1.
+
+With profile=True the calling thread runs under cProfile (written next to
+the report as a .prof file; workers aren't profiled, so use one job to see
+conversion in it) and tracemalloc records the peak and the top allocation
+sites. Both slow a run down noticeably; the timers alone don't.
+"""
+import cProfile
+import io
+import os
+import platform
+import pstats
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from json2opm.writer import write_json
+
+
+# Report order; stages that never ran are left out
+STAGES = ("list", "read", "parse", "map", "serialize", "write", "features", "readings", "analyze", "merge", "punch")
+
+PROFILE_TOP = 25
+ALLOCATIONS_TOP = 10
+
+
+@dataclass(slots=True)
+class StageStats:
+    seconds: float = 0.0
+    files: int = 0
+    bytes: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        d = {"seconds": round(self.seconds, 4), "files": self.files, "bytes": self.bytes, "errors": self.errors}
+        if self.bytes and self.seconds > 0:
+            d["mb_per_s"] = round(self.bytes / 1e6 / self.seconds, 2)
+        return d
+
+
+class StageClock:
+    """
+    Times the consecutive stages of one file: enter("read"), enter("parse"),
+    ..., stop(). `current` is the stage that was running if it raised.
+    """
+
+    __slots__ = ("times", "current", "_t")
+
+    def __init__(self):
+        self.times: dict[str, float] = {}
+        self.current: str | None = None
+        self._t = time.perf_counter()
+
+    def enter(self, stage: str | None) -> None:
+        now = time.perf_counter()
+        if self.current is not None:
+            self.times[self.current] = self.times.get(self.current, 0.0) + now - self._t
+        self.current, self._t = stage, now
+
+    def stop(self) -> dict[str, float]:
+        """The stage times; `current` keeps the stage that was running."""
+        current = self.current
+        self.enter(None)
+        self.current = current
+        return self.times
+
+
+class RunMetrics:
+    """Stage timers and counters for one run. Thread-safe."""
+
+    def __init__(self, command: str, profile: bool = False):
+        self.command = command
+        self.profile = profile
+        self.stages: dict[str, StageStats] = {}
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+        self._t0: float | None = None
+        self._profiler: cProfile.Profile | None = None
+        self._tracing = False
+        self._memory: dict[str, Any] | None = None
+
+    # ---- Run ----
+
+    def start(self) -> "RunMetrics":
+        """Start the wall clock (and the profilers), on the thread doing the run."""
+        self._t0 = time.perf_counter()
+        if self.profile:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self) -> None:
+        if self._t0 is None:
+            return
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:ALLOCATIONS_TOP]
+            tracemalloc.stop()
+            self._tracing = False
+            self._memory = {
+                "tracemalloc_peak_bytes": peak,
+                "top_allocations": [
+                    {"where": str(s.traceback[0]), "bytes": s.size, "blocks": s.count} for s in top
+                ],
+            }
+        self.wall_seconds = time.perf_counter() - self._t0
+        self._t0 = None
+
+    # ---- Counters ----
+
+    def add(self, stage: str, seconds: float, files: int = 1, nbytes: int = 0, errors: int = 0) -> None:
+        with self._lock:
+            s = self.stages.get(stage)
+            if s is None:
+                s = self.stages[stage] = StageStats()
+            s.seconds += seconds
+            s.files += files
+            s.bytes += nbytes
+            s.errors += errors
+
+    def add_times(
+        self,
+        times: dict[str, float] | None,
+        nbytes: dict[str, int] | None = None,
+        failed_stage: str | None = None,
+    ) -> None:
+        """One file's StageClock times; `failed_stage` (if it failed) gets the error."""
+        for stage, seconds in (times or {}).items():
+            self.add(stage, seconds, 1, (nbytes or {}).get(stage, 0), int(stage == failed_stage))
+        if failed_stage is not None and failed_stage not in (times or {}):
+            self.add(failed_stage, 0.0, 1, 0, 1)
+
+    def timed(self, stage: str, files: int = 0) -> "_Timed":
+        """`with metrics.timed("punch") as t: ...; t.nbytes = size` adds one timing; an exception counts as an error."""
+        return _Timed(self, stage, files)
+
+    # ---- Report ----
+
+    def stage_summary(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            order = [s for s in STAGES if s in self.stages] + sorted(set(self.stages) - set(STAGES))
+            return {s: self.stages[s].as_dict() for s in order}
+
+    def summary_line(self) -> str:
+        """"parse 1.2s · map 0.3s · ... (wall 3.4s)", for the log and the GUI."""
+        parts = [f"{name} {s['seconds']:.2f}s" for name, s in self.stage_summary().items()]
+        return " · ".join(parts) + f"  (wall {self.wall_seconds:.2f}s)"
+
+    def report(self, **extra: Any) -> dict[str, Any]:
+        report: dict[str, Any] = {
+            "command": self.command,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "wall_seconds": round(self.wall_seconds, 4),
+            "stages": self.stage_summary(),
+            **extra,
+        }
+        if self._memory is not None:
+            report["memory"] = self._memory
+        return report
+
+    def write_report(self, path: Path, **extra: Any) -> Path:
+        """Write the JSON report (and the .prof next to it when profiling). Returns `path`."""
+        report = self.report(**extra)
+        if self._profiler is not None:
+            prof_path = path.with_suffix(".prof")
+            self._profiler.dump_stats(str(prof_path))
+            report["profile"] = {"file": prof_path.name, "top": _profile_top(self._profiler)}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_json(path, report)
+        return path
+
+
+class _Timed:
+    __slots__ = ("metrics", "stage", "files", "nbytes", "_t")
+
+    def __init__(self, metrics: RunMetrics, stage: str, files: int):
+        self.metrics, self.stage, self.files, self.nbytes = metrics, stage, files, 0
+
+    def __enter__(self) -> "_Timed":
+        self._t = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        self.metrics.add(self.stage, time.perf_counter() - self._t, self.files, self.nbytes, int(exc_type is not None))
+
+
+def _profile_top(profiler: cProfile.Profile) -> list[dict[str, Any]]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats("cumulative")
+    top = []
+    for func in stats.fcn_list[:PROFILE_TOP]:
+        _, ncalls, tottime, cumtime, _ = stats.stats[func]
+        filename, line, name = func
+        top.append({
+            "function": f"{Path(filename).name}:{line}({name})" if line else name,
+            "calls": ncalls,
+            "own_seconds": round(tottime, 4),
+            "cumulative_seconds": round(cumtime, 4),
+        })
+    return top
+
+
+def default_run_report_path(out_dir: Path, command: str) -> Path:
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return out_dir / f"Run Report - {command} - {ts}.json"
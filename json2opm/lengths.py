@@ -0,0 +1,48 @@
+"""
+Per-fiber A/Z length comparison.
+
+OpmFeatures.length is the first FiberLength in a file, so comparing it only
+catches a trunk whose first fiber differs. compare_fiber_lengths() lines up
+every fiber both sides measured (by Measurements[].Name) and checks all the
+deltas against the threshold at once, reporting how many are over and which
+fiber is worst. Plain Python: a trunk has at most a few hundred fibers, too
+few for NumPy's per-call overhead to pay off.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class FiberLengthDelta:
+    compared: int           # fibers with a length on both sides
+    over: int               # of those, how many differ by more than the threshold
+    worst_fiber: str
+    a_length: float
+    z_length: float
+    delta: float
+
+
+def compare_fiber_lengths(
+    a: dict[str, float | None],
+    z: dict[str, float | None],
+    length_threshold: float,
+) -> FiberLengthDelta | None:
+    """
+    Compare OpmFeatures.fiber_lengths of the two sides. Fibers missing a
+    length on either side are skipped (OpmFeatures.length_missing covers
+    those). None if no fiber has a length on both sides.
+    """
+    names = [n for n, v in a.items() if v is not None and z.get(n) is not None]
+    if not names:
+        return None
+    deltas = [abs(a[n] - z[n]) for n in names]
+    worst = max(range(len(deltas)), key=deltas.__getitem__)
+    over = sum(d > length_threshold for d in deltas)
+    name = names[worst]
+    return FiberLengthDelta(
+        compared=len(names),
+        over=over,
+        worst_fiber=name,
+        a_length=a[name],
+        z_length=z[name],
+        delta=float(deltas[worst]),
+    )
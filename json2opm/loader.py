@@ -1,8 +1,12 @@
-import json
 from pathlib import Path
 from typing import Any, Dict
 
+from json2opm import jsonio
+
 
 def load_json(path: Path) -> Dict[str, Any]:
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return jsonio.loads(path.read_bytes())
+
+
+def load_json_bytes(data: bytes) -> Dict[str, Any]:
+    return jsonio.loads(data)
@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+# Kept in the output folder; records which input produced which .opm and when
+MANIFEST_FILENAME = ".json2opm_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _stat_key(st: os.stat_result) -> list:
+    return [st.st_size, st.st_mtime_ns]
+
+
+class ConvertManifest:
+    """
+    Input -> output bookkeeping for incremental conversion.
+
+    Each entry is keyed by the resolved input path and holds the input's
+    size/mtime/content hash and the output's name, format and size/mtime at
+    the time it was written. An output is "current" only if it still has exactly the
+    recorded size/mtime, so hand-edited or deleted outputs are rebuilt.
+    """
+
+    def __init__(self, out_dir: Path):
+        self.path = out_dir / MANIFEST_FILENAME
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, out_dir: Path) -> "ConvertManifest":
+        m = cls(out_dir)
+        try:
+            with m.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                m.entries = data.get("entries", {})
+        except Exception:
+            # Missing or unreadable manifest: everything is treated as new
+            pass
+        return m
+
+    def save(self) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f"{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def key(src_path: Path) -> str:
+        return str(src_path.resolve())
+
+    def _output_is_current(self, entry: Dict[str, Any], out_path: Path, output_format: str) -> bool:
+        if entry.get("output") != out_path.name or entry.get("format", "pretty") != output_format:
+            return False
+        try:
+            return _stat_key(out_path.stat()) == entry.get("out_stat")
+        except OSError:
+            return False
+
+    def check(self, src_path: Path, out_path: Path, output_format: str = "pretty") -> tuple[bool, Optional[str]]:
+        """
+        (up_to_date, known_hash) for one input, using stat calls only.
+
+        up_to_date=True: input and output are unchanged since the last run.
+        Otherwise known_hash is the input hash recorded last time, if the
+        output is still intact; the converter can then skip the input if its
+        bytes hash the same (touched or copied but not edited).
+        """
+        entry = self.entries.get(self.key(src_path))
+        if entry is None or not self._output_is_current(entry, out_path, output_format):
+            return False, None
+        try:
+            src_stat = _stat_key(src_path.stat())
+        except OSError:
+            return False, None
+        if src_stat == entry.get("src_stat"):
+            return True, None
+        return False, entry.get("hash")
+
+    def update(self, src_path: Path, out_path: Path, src_hash: Optional[str], output_format: str = "pretty") -> None:
+        try:
+            src_stat = _stat_key(src_path.stat())
+            out_stat = _stat_key(out_path.stat())
+        except OSError:
+            self.forget(src_path)
+            return
+        self.entries[self.key(src_path)] = {
+            "src_stat": src_stat,
+            "hash": src_hash,
+            "output": out_path.name,
+            "format": output_format,
+            "out_stat": out_stat,
+        }
+
+    def forget(self, src_path: Path) -> None:
+        self.entries.pop(self.key(src_path), None)
@@ -0,0 +1,306 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from json2opm.jsonl import OpmBundleWriter
+from json2opm.loader import load_json
+from json2opm.pairing import MERGED_SUFFIX
+from json2opm.writer import serialize_opm, write_opm
+
+
+# Pairs per worker task when merging with jobs > 1
+MERGE_CHUNK_SIZE = 16
+
+
+def _worst_verdict(a: str | None, z: str | None) -> str:
+    # conservative: Fail beats Pass; Unknown beats Pass
+    order = {"Fail": 3, "Unknown": 2, "Pass": 1, None: 0}
+    return a if order.get(a, 0) >= order.get(z, 0) else z
+
+
+def _merged_measurement(m):
+    """
+    The measurement with the merge defaults filled in. Copies only what it
+    changes (the measurement dict, and FiberLength when it gains an Origin);
+    everything else is shared with the input.
+    """
+    if not isinstance(m, dict):
+        return m
+    fl = m.get("FiberLength")
+    needs_state = "ResultState" not in m
+    needs_origin = isinstance(fl, dict) and "Origin" not in fl
+    if not (needs_state or needs_origin):
+        return m
+    m2 = dict(m)
+    if needs_state:
+        m2["ResultState"] = "Active"
+    if needs_origin:
+        m2["FiberLength"] = {**fl, "Origin": "Unknown"}
+    return m2
+
+
+def merge_opm_docs(a_doc: dict, z_doc: dict) -> dict:
+    """
+    Simple merge: keep A doc as base, append Z Measurements to A Measurements,
+    and update verdict fields conservatively.
+
+    Built structurally: only the containers that change (the top level,
+    OpticalData, the Measurements list, and measurements / FiberLength that
+    gain defaults) are copied; untouched subtrees such as Readings are shared
+    with `a_doc` / `z_doc`. Neither input is modified, but the result must be
+    treated as read-only while they are still in use.
+    """
+    merged = dict(a_doc)
+
+    a_od = dict(a_doc.get("OpticalData", {}))
+    z_od = z_doc.get("OpticalData", {})
+
+    a_meas = a_od.get("Measurements", [])
+    z_meas = z_od.get("Measurements", [])
+
+    combined = [_merged_measurement(m) for m in (a_meas or [])]
+    combined.extend(_merged_measurement(m) for m in (z_meas or []))
+
+    a_od["Measurements"] = combined
+    if "AutoWavelength" not in a_od:
+        a_od["AutoWavelength"] = False
+
+    worst = _worst_verdict(a_doc.get("GlobalVerdict"), z_doc.get("GlobalVerdict"))
+    merged["GlobalVerdict"] = worst
+    a_od["Status"] = worst
+    merged["OpticalData"] = a_od
+
+    return merged
+
+
+def _is_newer_than(out_path: Path, *inputs: Path) -> bool:
+    try:
+        out_mtime = out_path.stat().st_mtime_ns
+        return all(out_mtime >= p.stat().st_mtime_ns for p in inputs)
+    except OSError:
+        return False
+
+
+def _write_merged(
+    a_path: Path,
+    z_path: Path,
+    out_path: Path,
+    overwrite: bool,
+    output_format: str,
+    a_doc: dict | None = None,
+    z_doc: dict | None = None,
+) -> int:
+    if a_doc is None:
+        a_doc = load_json(a_path)
+    if z_doc is None:
+        z_doc = load_json(z_path)
+    try:
+        return write_opm(out_path, merge_opm_docs(a_doc, z_doc), overwrite=overwrite, output_format=output_format)
+    except FileExistsError:
+        raise FileExistsError(f"Output already exists: {out_path.name}") from None
+
+
+def _merge_chunk(
+    tasks: list[tuple[Path, Path, Path]],
+    overwrite: bool,
+    output_format: str,
+) -> list[tuple[int, str | None, float]]:
+    # Module-level so it pickles into worker processes. Never raises.
+    # (bytes written, error, seconds) per task.
+    out: list[tuple[int, str | None, float]] = []
+    for a_path, z_path, out_path in tasks:
+        t = time.perf_counter()
+        try:
+            size, error = _write_merged(a_path, z_path, out_path, overwrite, output_format), None
+        except Exception as e:
+            size, error = 0, str(e)
+        out.append((size, error, time.perf_counter() - t))
+    return out
+
+
+class MergeCollector:
+    """
+    Merges eligible pairs one at a time and tallies the outcome.
+
+    Pass an instance as `on_eligible` to analyze_pairs_from_opm_paths (or
+    PairStream) so each pair is merged in the same pass. A pair that comes
+    with both documents is always merged right here, from memory, and the
+    documents are released afterwards; they are never re-read or pickled.
+
+    Pairs without documents are read from disk: here with one job, or with
+    jobs > 1 queued in chunks of MERGE_CHUNK_SIZE to a process pool whose
+    workers read, merge and write their pairs themselves. At most
+    `jobs * 2` chunks are in flight, so a long analysis can't queue up
+    unbounded work. result() waits for the pool. `wants_docs` tells a
+    caller whether keeping documents for it is worthwhile.
+
+    Every output goes through write_opm, so a crash never leaves a partial
+    *_MergeMF.opm. Without incremental an existing output is never replaced
+    (exclusive create, safe when several workers race for one name).
+    With incremental=True an existing *_MergeMF.opm that is newer than both of
+    its inputs is left alone (counted as up to date); an older one is rebuilt
+    and replaced atomically.
+
+    With `bundle` (convert --bundle), merged documents are added to that
+    OpmBundleWriter as `<A name>_MergeMF` records instead of being written
+    to `out_dir`. Everything then runs on the calling thread, which owns the
+    writer, and pairs need their documents: the inputs aren't on disk.
+
+    `seconds` is the time spent merging, summed over the workers;
+    `inline_seconds` is the part spent on the calling thread.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        cancel: threading.Event | None = None,
+        incremental: bool = False,
+        output_format: str = "pretty",
+        jobs: int = 1,
+        bundle: OpmBundleWriter | None = None,
+    ):
+        if bundle is not None and incremental:
+            raise ValueError("A bundle output can't be combined with incremental merging")
+        self.out_dir = out_dir
+        self.cancel = cancel
+        self.incremental = incremental
+        self.output_format = output_format
+        self.bundle = bundle
+        self.jobs = 1 if bundle is not None else max(1, jobs)
+        self.merged = 0
+        self.bytes_written = 0
+        self.up_to_date = 0
+        self.write_errors = 0
+        self.seconds = 0.0
+        self.inline_seconds = 0.0
+        self.merged_msgs: list[str] = []
+        self.merge_write_errors: list[str] = []
+
+        self._pool: ProcessPoolExecutor | None = None
+        # (pair_key, a_path, z_path, out_path) not yet submitted
+        self._chunk: list[tuple[str, Path, Path, Path]] = []
+        self._window: deque[tuple[list[tuple[str, Path, Path, Path]], Future]] = deque()
+
+    @property
+    def wants_docs(self) -> bool:
+        """
+        True with one job, where documents kept in memory spare a re-read.
+        With a pool, the workers re-reading the files in parallel scale better
+        than merging every pair on the calling thread, so callers shouldn't
+        keep documents (e.g. convert_batch's keep_docs) for it.
+        """
+        return self.jobs == 1
+
+    def _cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def __call__(
+        self,
+        pair_key: str,
+        a_path: Path,
+        z_path: Path,
+        a_doc: dict | None = None,
+        z_doc: dict | None = None,
+    ) -> None:
+        if self._cancelled():
+            return
+        out_path = self.out_dir / f"{a_path.stem}{MERGED_SUFFIX}.opm"
+        if self.incremental and _is_newer_than(out_path, a_path, z_path):
+            self.up_to_date += 1
+            return
+
+        if self.jobs > 1 and (a_doc is None or z_doc is None):
+            self._chunk.append((pair_key, a_path, z_path, out_path))
+            if len(self._chunk) >= MERGE_CHUNK_SIZE:
+                self._submit()
+            return
+
+        t = time.perf_counter()
+        try:
+            if self.bundle is not None:
+                size = self._add_to_bundle(out_path, a_doc, z_doc)
+            else:
+                size = _write_merged(a_path, z_path, out_path, self.incremental, self.output_format, a_doc, z_doc)
+        except Exception as e:
+            size, error = 0, str(e)
+        else:
+            error = None
+        elapsed = time.perf_counter() - t
+        self.seconds += elapsed
+        self.inline_seconds += elapsed
+        self._tally(pair_key, out_path, size, error)
+
+    def _add_to_bundle(self, out_path: Path, a_doc: dict | None, z_doc: dict | None) -> int:
+        if a_doc is None or z_doc is None:
+            raise ValueError("Bundled outputs can only be merged from their documents")
+        return self.bundle.add(out_path.stem, serialize_opm(merge_opm_docs(a_doc, z_doc), "compact"))
+
+    def _tally(self, pair_key: str, out_path: Path, size: int, error: str | None) -> None:
+        if error is not None:
+            self.write_errors += 1
+            self.merge_write_errors.append(f"❌ MERGE ERR  {pair_key}  ->  {error}")
+            return
+        self.bytes_written += size
+        self.merged += 1
+        self.merged_msgs.append(f"✅ MERGED     {pair_key}  ->  {out_path.name}")
+
+    def _submit(self) -> None:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+        chunk, self._chunk = self._chunk, []
+        tasks = [(a_path, z_path, out_path) for _, a_path, z_path, out_path in chunk]
+        self._window.append((chunk, self._pool.submit(_merge_chunk, tasks, self.incremental, self.output_format)))
+        while len(self._window) > self.jobs * 2:
+            self._collect(*self._window.popleft())
+
+    def _collect(self, chunk: list[tuple[str, Path, Path, Path]], fut: Future) -> None:
+        try:
+            outcomes = fut.result()
+        except Exception as e:
+            # The pool itself failed (e.g. a worker was killed)
+            outcomes = [(0, str(e) or type(e).__name__, 0.0)] * len(chunk)
+        for (pair_key, _, _, out_path), (size, error, seconds) in zip(chunk, outcomes):
+            self.seconds += seconds
+            self._tally(pair_key, out_path, size, error)
+
+    def _drain(self) -> None:
+        if self._chunk and not self._cancelled():
+            self._submit()
+        self._chunk = []
+        while self._window:
+            chunk, fut = self._window.popleft()
+            # Cancelled: drop queued chunks, but count the ones already running
+            if self._cancelled() and fut.cancel():
+                continue
+            self._collect(chunk, fut)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def result(self) -> dict:
+        self._drain()
+        return {
+            "merged": self.merged,
+            "up_to_date": self.up_to_date,
+            "write_errors": self.write_errors,
+            "bytes_written": self.bytes_written,
+            "seconds": self.seconds,
+            "merged_msgs": self.merged_msgs,
+            "merge_write_errors": self.merge_write_errors,
+        }
+
+
+def merge_eligible_pairs(
+    eligible_pairs: list[tuple[str, Path, Path]],
+    out_dir: Path,
+    cancel: threading.Event | None = None,
+    jobs: int = 1,
+) -> dict:
+    collector = MergeCollector(out_dir, cancel, jobs=jobs)
+    for pair_key, a_path, z_path in eligible_pairs:
+        if cancel is not None and cancel.is_set():
+            break
+        collector(pair_key, a_path, z_path)
+    return collector.result()
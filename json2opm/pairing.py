@@ -0,0 +1,284 @@
+"""
+A/Z pair keys.
+
+A strategy turns one .opm file into (pair_key, side); the A and Z results of a
+fiber share a pair_key. Three sources are supported:
+
+  filename   the file name stem        P1_A03_C06_... -> P1_03_C06_... / A
+  testpoint  metadata.testPointName    (Exchange JSON only, kept by the converter)
+  jobid      Identification.JobId      CABLE-0001.A02 -> CABLE-0001.02 / A
+
+Each takes a regex with a named `side` group matching the A/Z letter. The
+pair key is the matched text with that letter cut out, so the defaults give
+the keys this tool has always used. Patterns are compiled once per strategy.
+
+Files that can't be paired are not dropped silently: PairIndex collects them
+as Orphans (no key, no partner, or a duplicate side) for the caller to report.
+"""
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+from json2opm.features import OpmFeatures
+from json2opm.lazy import read_features
+from json2opm.rules import RuleSet
+
+
+DEFAULT_FILENAME_PATTERN = r"^(P\d+)_(?P<side>[AZ])(\d{2})_(.+)$"
+DEFAULT_JOB_ID_PATTERN = r"^(.+)\.(?P<side>[AZ])(\d+)$"
+
+PAIR_KEY_STRATEGIES = ("filename", "testpoint", "jobid")
+
+# Outputs of the merge step; never inputs to pairing
+MERGED_SUFFIX = "_MergeMF"
+
+# Orphan reasons
+ORPHAN_NO_KEY = "no pair key"
+ORPHAN_NO_PARTNER = "no partner"
+ORPHAN_DUPLICATE = "duplicate"
+
+
+class PairKeyStrategy:
+    """
+    Base / filename strategy: the key comes from the file name stem.
+
+    Strategies with `uses_features` read their text from the file's
+    OpmFeatures instead, so they need the document (or the feature index).
+    """
+
+    name = "filename"
+    default_pattern = DEFAULT_FILENAME_PATTERN
+    uses_features = False
+
+    def __init__(self, pattern: str | None = None):
+        self.pattern = pattern or self.default_pattern
+        try:
+            self._regex = re.compile(self.pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Invalid pair pattern {self.pattern!r}: {e}") from None
+        if "side" not in self._regex.groupindex:
+            raise ValueError(f"Pair pattern {self.pattern!r} needs a named group (?P<side>...) for the A/Z letter")
+
+    def text(self, path: Path, features: OpmFeatures | None) -> str | None:
+        return path.stem
+
+    def split(self, text: str) -> tuple[str | None, str | None]:
+        """(pair_key, side) for one string, or (None, None) if it doesn't match."""
+        m = self._regex.match(text)
+        if not m:
+            return None, None
+        side = (m.group("side") or "").upper()
+        if side not in ("A", "Z"):
+            return None, None
+        start, end = m.span("side")
+        return text[:start] + text[end:], side
+
+    def key(self, path: Path, features: OpmFeatures | None = None) -> tuple[str | None, str | None, str | None]:
+        """(pair_key, side, None), or (None, None, reason) when the file has no key."""
+        text = self.text(path, features)
+        if not text:
+            return None, None, self.missing_reason(features)
+        key, side = self.split(text)
+        if key is None:
+            return None, None, f"{self.name} {text!r} doesn't match {self.pattern}"
+        return key, side, None
+
+    def missing_reason(self, features: OpmFeatures | None) -> str:
+        return "unreadable file" if features is None else "empty name"
+
+    def order_key(self, path: Path) -> tuple[str, str]:
+        """
+        Sort key that puts the two sides of a pair next to each other, from
+        the file name alone (e.g. for convert_batch's `order`). Strategies
+        that read the key from the document guess with the filename pattern.
+        """
+        strategy = DEFAULT_PAIR_KEY if self.uses_features else self
+        key, side = strategy.split(path.stem)
+        return (key, side) if key is not None else (path.stem, "")
+
+    def describe(self) -> str:
+        return f"{self.name}: {self.pattern}"
+
+
+class TestPointPairKey(PairKeyStrategy):
+    """Key from metadata.testPointName, parsed with the filename pattern."""
+
+    name = "testpoint"
+    uses_features = True
+
+    def text(self, path: Path, features: OpmFeatures | None) -> str | None:
+        return features.test_point_name if features is not None else None
+
+    def missing_reason(self, features: OpmFeatures | None) -> str:
+        if features is None:
+            return "unreadable file"
+        # .opm files don't carry it; only the converter sees the source JSON
+        return "no metadata.testPointName (known only for files converted by this tool)"
+
+
+class JobIdPairKey(PairKeyStrategy):
+    """Key from the Identification.JobId suffix (.A02 / .Z02)."""
+
+    name = "jobid"
+    default_pattern = DEFAULT_JOB_ID_PATTERN
+    uses_features = True
+
+    def text(self, path: Path, features: OpmFeatures | None) -> str | None:
+        return features.job_id if features is not None else None
+
+    def missing_reason(self, features: OpmFeatures | None) -> str:
+        return "unreadable file" if features is None else "no Identification.JobId"
+
+
+_STRATEGY_CLASSES: dict[str, type[PairKeyStrategy]] = {
+    "filename": PairKeyStrategy,
+    "testpoint": TestPointPairKey,
+    "jobid": JobIdPairKey,
+}
+
+
+def make_pair_key(name: str = "filename", pattern: str | None = None) -> PairKeyStrategy:
+    """Strategy by name; raises ValueError for an unknown name or a bad pattern."""
+    try:
+        cls = _STRATEGY_CLASSES[name]
+    except KeyError:
+        raise ValueError(f"Unknown pair key strategy {name!r} (expected one of {', '.join(PAIR_KEY_STRATEGIES)})")
+    return cls(pattern)
+
+
+DEFAULT_PAIR_KEY = PairKeyStrategy()
+
+
+@dataclass(slots=True)
+class Orphan:
+    """A file that didn't end up in a complete A/Z pair, and why."""
+
+    path: Path
+    reason: str                 # one of the ORPHAN_* values
+    detail: str = ""
+    key: str | None = None
+    side: str | None = None
+
+    def message(self) -> str:
+        return f"{self.path.name}: {self.reason}" + (f" ({self.detail})" if self.detail else "")
+
+    def as_dict(self) -> dict:
+        return {"file": str(self.path), "reason": self.reason, "detail": self.detail, "key": self.key, "side": self.side}
+
+
+class PairIndex:
+    """
+    One-pass grouping of .opm files into A/Z pairs under a PairKeyStrategy.
+
+    add() is the streaming form: it returns a pair as soon as its second side
+    arrives. group() is the batch form: a later file for the same key/side
+    replaces the earlier one and pairs come back sorted by key. Both record
+    every unpairable file in `orphans`.
+
+    Feature-based strategies get each file's OpmFeatures from `features`, then
+    `lookup` (e.g. FeatureIndex.lookup), then by reading the file. Whatever is
+    resolved stays in `features`, so the pair check that follows can use it
+    instead of parsing the file a second time; files it reads itself are
+    read with `rules`, for the same reason.
+
+    `on_orphan` is called with each unpairable file as it is recorded (not
+    for the sides still waiting, which only become orphans in `orphans`).
+    """
+
+    def __init__(
+        self,
+        strategy: PairKeyStrategy | None = None,
+        features: dict[Path, OpmFeatures] | None = None,
+        lookup: Callable[[list[Path]], dict[Path, OpmFeatures]] | None = None,
+        rules: RuleSet | None = None,
+        on_orphan: Callable[[Orphan], None] | None = None,
+    ):
+        self.strategy = strategy or DEFAULT_PAIR_KEY
+        self.features = features if features is not None else {}
+        self.lookup = lookup
+        self.rules = rules
+        self.on_orphan = on_orphan
+
+        self._waiting: dict[str, dict[str, Path]] = {}
+        self._paired: set[str] = set()
+        self._orphans: list[Orphan] = []
+
+    def _features_for(self, path: Path) -> OpmFeatures | None:
+        f = self.features.get(path)
+        if f is None and self.lookup is not None:
+            try:
+                f = self.lookup([path]).get(path)
+            except Exception:
+                f = None
+        if f is None:
+            try:
+                f = read_features(path, self.rules)
+            except Exception:
+                return None
+        self.features[path] = f
+        return f
+
+    def _orphan(self, orphan: Orphan) -> None:
+        self._orphans.append(orphan)
+        if self.on_orphan is not None:
+            self.on_orphan(orphan)
+
+    def _resolve(self, path: Path) -> tuple[str | None, str | None]:
+        features = self._features_for(path) if self.strategy.uses_features else None
+        key, side, reason = self.strategy.key(path, features)
+        if key is None:
+            self._orphan(Orphan(path, ORPHAN_NO_KEY, reason or ""))
+        return key, side
+
+    def _replace(self, sides: dict[str, Path], key: str, side: str, path: Path) -> None:
+        old = sides.get(side)
+        if old is not None and old != path:
+            self._orphan(Orphan(old, ORPHAN_DUPLICATE, f"replaced by {path.name}", key, side))
+        sides[side] = path
+
+    def add(self, path: Path) -> tuple[str, Path, Path] | None:
+        if path.stem.endswith(MERGED_SUFFIX):
+            return None
+        key, side = self._resolve(path)
+        if key is None or side is None:
+            return None
+        if key in self._paired:
+            self._orphan(Orphan(path, ORPHAN_DUPLICATE, "pair already complete", key, side))
+            return None
+        sides = self._waiting.setdefault(key, {})
+        self._replace(sides, key, side, path)
+        if "A" in sides and "Z" in sides:
+            del self._waiting[key]
+            self._paired.add(key)
+            return key, sides["A"], sides["Z"]
+        return None
+
+    def group(self, paths: Iterable[Path]) -> list[tuple[str, Path, Path]]:
+        groups: dict[str, dict[str, Path]] = {}
+        for path in paths:
+            if path.stem.endswith(MERGED_SUFFIX):
+                continue
+            key, side = self._resolve(path)
+            if key is None or side is None:
+                continue
+            self._replace(groups.setdefault(key, {}), key, side, path)
+
+        pairs = []
+        for key, sides in sorted(groups.items()):
+            if "A" in sides and "Z" in sides:
+                self._paired.add(key)
+                pairs.append((key, sides["A"], sides["Z"]))
+            else:
+                self._waiting[key] = sides
+        return pairs
+
+    @property
+    def orphans(self) -> list[Orphan]:
+        """Unpairable files so far, plus every side still waiting for its partner; sorted by name."""
+        out = list(self._orphans)
+        for key, sides in self._waiting.items():
+            for side, path in sides.items():
+                missing = "Z" if side == "A" else "A"
+                out.append(Orphan(path, ORPHAN_NO_PARTNER, f"no {missing} side for {key}", key, side))
+        return sorted(out, key=lambda o: (o.path.name, o.reason))
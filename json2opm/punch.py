@@ -0,0 +1,118 @@
+import csv
+from datetime import datetime
+from pathlib import Path
+
+from json2opm.features import OpmFeatures
+
+
+def guess_ose_from_any(rows: list[dict]) -> str | None:
+    for r in rows:
+        v = r.get("OSE")
+        if v:
+            return str(v)
+    return None
+
+
+def default_punch_list_path(out_dir: Path, rows: list[dict]) -> Path:
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    ose = guess_ose_from_any(rows) or "OSE"
+    return out_dir / f"Punch List - {ose} - {ts}.csv"
+
+
+def write_punch_list_csv(out_path: Path, rows: list[dict]) -> None:
+    headers = [
+        "OSE",
+        "Cable ID",
+        "Location A",
+        "Location B",
+        "Test Date",
+        "Tester",
+        "Pair Key",
+        "Issue Type",
+        "Details",
+    ]
+    with out_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=headers)
+        w.writeheader()
+        for r in rows:
+            w.writerow({h: r.get(h, "") for h in headers})
+
+
+def build_punch_row(
+    pair_key: str,
+    a: OpmFeatures | None,
+    z: OpmFeatures | None,
+    mismatch: bool,
+    failure_high_loss: bool,
+    a_fail: bool,
+    z_fail: bool,
+    polarity_issue: bool,
+    wavelength_issue: bool,
+    length_issue: bool,
+    note: str | None = None,
+    length_detail: str | None = None,
+    rules: list[str] | None = None,
+) -> dict:
+    # Use A side as primary for metadata, fallback to Z
+    meta = a if a is not None else z
+    cable_id = (meta.cable_id if meta else None) or ""
+    loc_a, loc_b = _split_locations_from_cable_id(cable_id)
+
+    test_date = (meta.test_date if meta else None) or ""
+    tester = (meta.tester if meta else None) or ""
+
+    # OSE = “option A for Short label” in your terms; we’ll derive from JobId if possible
+    ose = (meta.ose if meta else None) or ""
+
+    issue_parts = []
+    if mismatch:
+        issue_parts.append("MISMATCH")
+    if failure_high_loss:
+        issue_parts.append("FAILURE")
+    issue_type = "+".join(issue_parts) if issue_parts else "ISSUE"
+
+    details = []
+    if note:
+        details.append(note)
+    if failure_high_loss:
+        sides = []
+        if a_fail:
+            sides.append("A")
+        if z_fail:
+            sides.append("Z")
+        details.append(f"High Loss (Status=Fail) side={('/'.join(sides) if sides else '?')}")
+    if polarity_issue:
+        details.append("Polarity issue")
+    if wavelength_issue:
+        details.append("Wavelength mismatch")
+    if length_issue:
+        details.append(f"Length missing/mismatch ({length_detail})" if length_detail else "Length missing/mismatch")
+    for name in rules or []:
+        details.append(f"Rule {name} failed")
+
+    return {
+        "OSE": ose,
+        "Cable ID": cable_id,
+        "Location A": loc_a,
+        "Location B": loc_b,
+        "Test Date": test_date,
+        "Tester": tester,
+        "Pair Key": pair_key,
+        "Issue Type": issue_type,
+        "Details": "; ".join(details),
+    }
+
+
+def _split_locations_from_cable_id(cable_id: str) -> tuple[str, str]:
+    # Example: LCO1-NS3-LCO2-DHB-00001.A03
+    # You said: LCO1-NS3 is Location A and LCO2-DHB is Location B.
+    # So we take first two hyphen chunks for A and next two for B.
+    if not cable_id:
+        return "", ""
+    base = cable_id.split(".")[0]
+    parts = base.split("-")
+    if len(parts) >= 4:
+        loc_a = "-".join(parts[0:2])
+        loc_b = "-".join(parts[2:4])
+        return loc_a, loc_b
+    return "", ""
@@ -0,0 +1,357 @@
+"""
+Declarative A/Z rules, on top of the built-in checks in analysis.check_pair.
+
+A rule file is JSON:
+
+    {"rules": [
+        {"name": "loss_1310",
+         "path": "Measurement.OpmResultData.Measurements[Wavelength.Value=1.31e-06].Readings[*].Value",
+         "reduce": "max", "op": "<=", "value": 1.5,
+         "severity": "error", "blocks_merge": false},
+        {"name": "connectors",
+         "path": "Measurement.OpmResultData.LinkDefinition.ConnectorCount",
+         "compare": "delta", "op": "==", "value": 0}
+    ]}
+
+Rule fields:
+
+  name          unique, shown in the log and the punch list
+  path          dotted keys into the .opm document; [*] expands a list,
+                [n] picks one entry, [Key.Path=literal] keeps the list
+                entries whose Key.Path equals the literal (JSON; "7" and 7
+                both match a Name of "7")
+  reduce        what is kept per file: all (every value is checked; the
+                default), any (one passing value is enough), max, min,
+                sum, count, first (the default with compare=delta)
+  age_from      optional path to a timestamp (e.g. "TestDateTime"); the
+                values, also ISO timestamps, become their age in hours
+                relative to it
+  compare       each (default: both files must pass on their own) or delta
+                (|A - Z| of the reduced values must pass; needs a
+                reduce that gives one number)
+  op, value     <, <=, >, >=, ==, !=, in, not in (value is a list), or
+                exists (no value: the path must match something)
+  required      a file where the path matches nothing fails the rule
+                (default false: such files are skipped)
+  severity      error (default; the pair gets a punch row) or warning
+                (log only)
+  blocks_merge  default true; false reports the pair like a high-loss
+                failure and still merges it
+
+Rules are compiled once: each path becomes a chain of closures, so checking
+a pair is a few calls per rule. Values are taken from each document when its
+OpmFeatures are extracted (OpmFeatures.rule_values, tagged with the rule
+set's fingerprint), so the feature index and the converter's features carry
+them and a pair check never reopens the files.
+"""
+import hashlib
+import json
+import operator
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+
+REDUCERS = ("all", "any", "max", "min", "sum", "count", "first")
+COMPARES = ("each", "delta")
+SEVERITIES = ("error", "warning")
+
+_OPS: dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda v, t: v in t,
+    "not in": lambda v, t: v not in t,
+}
+OPS = tuple(_OPS) + ("exists",)
+
+_SCALAR_REDUCERS = {
+    "max": max,
+    "min": min,
+    "sum": sum,
+    "count": len,
+    "first": lambda vs: vs[0],
+}
+
+_SEGMENT = re.compile(r"([^.\[\]]+)|\[([^\]]*)\]|(\.)")
+
+
+class RuleError(ValueError):
+    """A rule file that can't be loaded or compiled."""
+
+
+# ---- Paths ----
+
+def _key_step(key: str) -> Callable[[list], list]:
+    return lambda items: [x[key] for x in items if isinstance(x, dict) and key in x]
+
+
+def _expand_step(items: list) -> list:
+    return [y for x in items if isinstance(x, list) for y in x]
+
+
+def _index_step(i: int) -> Callable[[list], list]:
+    return lambda items: [x[i] for x in items if isinstance(x, list) and -len(x) <= i < len(x)]
+
+
+def _filter_step(sub: Callable[[Any], list], literal: Any) -> Callable[[list], list]:
+    wanted = {json.dumps(literal), str(literal)}
+
+    def matches(y: Any) -> bool:
+        return any(v == literal or str(v) in wanted for v in sub(y))
+
+    return lambda items: [y for x in items if isinstance(x, list) for y in x if matches(y)]
+
+
+def _literal(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def compile_path(expr: str) -> Callable[[Any], list]:
+    """A function returning every value `expr` matches in a document (possibly none)."""
+    steps: list[Callable[[list], list]] = []
+    pos = 0
+    expr = expr.strip()
+    while pos < len(expr):
+        m = _SEGMENT.match(expr, pos)
+        if m is None:
+            raise RuleError(f"Bad path {expr!r} at position {pos}")
+        pos = m.end()
+        key, bracket = m.group(1), m.group(2)
+        if key is not None:
+            steps.append(_key_step(key))
+        elif bracket is not None:
+            bracket = bracket.strip()
+            if bracket == "*":
+                steps.append(_expand_step)
+            elif re.fullmatch(r"-?\d+", bracket):
+                steps.append(_index_step(int(bracket)))
+            elif "=" in bracket:
+                sub_expr, _, lit = bracket.partition("=")
+                steps.append(_filter_step(compile_path(sub_expr), _literal(lit.strip())))
+            else:
+                raise RuleError(f"Bad path {expr!r}: unknown selector [{bracket}]")
+    if not steps:
+        raise RuleError("Empty path")
+
+    def get(doc: Any) -> list:
+        items = [doc]
+        for step in steps:
+            items = step(items)
+            if not items:
+                break
+        return items
+
+    return get
+
+
+def _parse_time(v: Any) -> datetime | None:
+    if not isinstance(v, str):
+        return None
+    try:
+        t = datetime.fromisoformat(v.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return t if t.tzinfo is not None else None
+
+
+def _number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+# ---- Rules ----
+
+@dataclass(slots=True)
+class RuleFailure:
+    name: str
+    severity: str
+    blocks_merge: bool
+    requirement: str        # e.g. "<= 1.5", "delta == 0"
+    a: Any                  # the value(s) checked, per side (for delta: the two reduced values)
+    z: Any
+    a_failed: bool
+    z_failed: bool
+    delta: float | None = None
+
+
+class Rule:
+    """One compiled rule; `spec` is its entry from the rule file."""
+
+    def __init__(self, spec: dict):
+        if not isinstance(spec, dict):
+            raise RuleError("Each rule must be an object")
+        self.spec = spec
+        self.name = spec.get("name")
+        if not isinstance(self.name, str) or not self.name:
+            raise RuleError("Each rule needs a name")
+        unknown = set(spec) - {
+            "name", "path", "reduce", "age_from", "compare", "op", "value", "required", "severity", "blocks_merge",
+        }
+        if unknown:
+            raise RuleError(f"Rule {self.name!r}: unknown field(s) {', '.join(sorted(unknown))}")
+        if not isinstance(spec.get("path"), str):
+            raise RuleError(f"Rule {self.name!r} needs a path")
+
+        self.compare = spec.get("compare", "each")
+        self.reduce = spec.get("reduce", "first" if self.compare == "delta" else "all")
+        self.op = spec.get("op")
+        self.value = spec.get("value")
+        self.required = bool(spec.get("required", False))
+        self.severity = spec.get("severity", "error")
+        self.blocks_merge = bool(spec.get("blocks_merge", True))
+        for field, value, allowed in (
+            ("reduce", self.reduce, REDUCERS),
+            ("compare", self.compare, COMPARES),
+            ("op", self.op, OPS),
+            ("severity", self.severity, SEVERITIES),
+        ):
+            if value not in allowed:
+                raise RuleError(f"Rule {self.name!r}: {field} must be one of {', '.join(allowed)}, not {value!r}")
+        if self.op in ("in", "not in") and not isinstance(self.value, list):
+            raise RuleError(f"Rule {self.name!r}: op {self.op!r} needs a list value")
+        if self.op != "exists" and "value" not in spec:
+            raise RuleError(f"Rule {self.name!r} needs a value to compare with")
+        if self.compare == "delta" and (self.reduce not in _SCALAR_REDUCERS or self.op in ("in", "not in", "exists")):
+            raise RuleError(f"Rule {self.name!r}: compare=delta needs a numeric reduce and a comparison op")
+
+        try:
+            self._get = compile_path(spec["path"])
+            self._age_from = compile_path(spec["age_from"]) if spec.get("age_from") else None
+        except RuleError as e:
+            raise RuleError(f"Rule {self.name!r}: {e}") from None
+        self._test = _OPS.get(self.op)
+        self.requirement = ("delta " if self.compare == "delta" else "") + (
+            "exists" if self.op == "exists" else f"{self.op} {json.dumps(self.value)}"
+        )
+
+    def extract(self, doc: Any) -> Any:
+        """This rule's per-file value: a list (reduce all/any), a scalar, or None. JSON-serialisable."""
+        values = self._get(doc)
+        if self._age_from is not None:
+            ref = next((t for t in map(_parse_time, self._age_from(doc)) if t is not None), None)
+            ages = []
+            for v in values:
+                t = _parse_time(v)
+                if ref is not None and t is not None:
+                    ages.append(round((ref - t).total_seconds() / 3600.0, 6))
+            values = ages
+        if self.op == "exists":
+            return len(values)
+        if self.reduce in ("all", "any"):
+            return values
+        if self.reduce != "count":
+            values = [v for v in values if _number(v)] if self.reduce in ("sum", "max", "min") else values
+            if not values:
+                return None
+        return _SCALAR_REDUCERS[self.reduce](values)
+
+    def _passes(self, v: Any) -> bool:
+        try:
+            return bool(self._test(v, self.value))
+        except TypeError:
+            return False
+
+    def _side_fails(self, value: Any) -> bool:
+        if self.op == "exists":
+            return not value
+        if self.reduce in ("all", "any"):
+            if not value:
+                return self.required
+            results = [self._passes(v) for v in value]
+            return not (all(results) if self.reduce == "all" else any(results))
+        if value is None:
+            return self.required
+        return not self._passes(value)
+
+    def check(self, a: Any, z: Any) -> RuleFailure | None:
+        """Apply the rule to the two sides' extract() values."""
+        if self.compare == "delta":
+            if not (_number(a) and _number(z)):
+                if not self.required:
+                    return None
+                a_failed, z_failed, delta = not _number(a), not _number(z), None
+            else:
+                delta = abs(float(a) - float(z))
+                if self._passes(delta):
+                    return None
+                a_failed = z_failed = True
+        else:
+            a_failed, z_failed, delta = self._side_fails(a), self._side_fails(z), None
+            if not (a_failed or z_failed):
+                return None
+        return RuleFailure(
+            name=self.name,
+            severity=self.severity,
+            blocks_merge=self.blocks_merge,
+            requirement=self.requirement,
+            a=a,
+            z=z,
+            a_failed=a_failed,
+            z_failed=z_failed,
+            delta=delta,
+        )
+
+
+class RuleSet:
+    """
+    The compiled rules of one rule file. Picklable (it is rebuilt from the
+    specs on the other side), so it can go to worker processes.
+    """
+
+    def __init__(self, specs: list[dict], source: str = "<rules>"):
+        self.specs = specs
+        self.source = source
+        self.rules = [Rule(spec) for spec in specs]
+        names = [r.name for r in self.rules]
+        dupes = sorted({n for n in names if names.count(n) > 1})
+        if dupes:
+            raise RuleError(f"Duplicate rule name(s): {', '.join(dupes)}")
+        canonical = json.dumps(specs, sort_keys=True, separators=(",", ":"))
+        self.fingerprint = hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+    def __reduce__(self):
+        return RuleSet, (self.specs, self.source)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def extract(self, doc: Any) -> dict[str, Any]:
+        """Rule name -> per-file value, for OpmFeatures.rule_values."""
+        return {r.name: r.extract(doc) for r in self.rules}
+
+    def covers(self, features) -> bool:
+        """True if `features` (an OpmFeatures) were extracted with this rule set."""
+        return features.rules_id == self.fingerprint
+
+    def check(self, a_values: dict[str, Any], z_values: dict[str, Any]) -> list[RuleFailure]:
+        failures = []
+        for r in self.rules:
+            failure = r.check(a_values.get(r.name), z_values.get(r.name))
+            if failure is not None:
+                failures.append(failure)
+        return failures
+
+
+def load_rules(path: Path) -> RuleSet:
+    """Read and compile a rule file. Raises RuleError (with the file name) if it is invalid."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except OSError as e:
+        raise RuleError(f"{path.name}: {e.strerror or e}") from None
+    except ValueError as e:
+        raise RuleError(f"{path.name}: not valid JSON ({e})") from None
+    specs = data.get("rules") if isinstance(data, dict) else None
+    if not isinstance(specs, list):
+        raise RuleError(f'{path.name}: expected {{"rules": [...]}}')
+    try:
+        return RuleSet(specs, source=path.name)
+    except RuleError as e:
+        raise RuleError(f"{path.name}: {e}") from None
@@ -0,0 +1,336 @@
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from json2opm.analysis import PairCheck, iter_pair_checks
+from json2opm.engine import (
+    SKIPPED,
+    convert_batch,
+    default_jobs,
+    docs_by_output_path,
+    features_by_output_path,
+    hashes_by_output_path,
+)
+from json2opm.features import OpmFeatures
+from json2opm.index import load_cached_features, record_features
+from json2opm.lazy import read_features
+from json2opm.merge import MergeCollector
+from json2opm.pairing import DEFAULT_PAIR_KEY, MERGED_SUFFIX, PairKeyStrategy
+from json2opm.rules import RuleSet
+from json2opm.writer import write_json
+
+
+SUMMARY_FILENAME = "json2opm_watch_summary.json"
+
+# Pair status values in the live summary
+PAIR_OK = "ok"
+PAIR_FAILURE = "failure"      # eligible, but with high-loss readings or a failed non-blocking rule
+PAIR_MISMATCH = "mismatch"    # merge-blocking issue
+PAIR_WAITING = "waiting"      # only one side has arrived so far
+
+PAIR_STATUSES = (PAIR_OK, PAIR_FAILURE, PAIR_MISMATCH, PAIR_WAITING)
+
+
+def _stat_key(st: os.stat_result) -> tuple[int, int]:
+    return st.st_size, st.st_mtime_ns
+
+
+class PairWatcher:
+    """
+    Long-running convert + analyze loop over one drop folder.
+
+    The input folder is polled with os.scandir (stat only, no reads). A JSON
+    file is picked up once its size/mtime have been stable for `debounce`
+    seconds, so half-copied files are never parsed. Each batch of ready files
+    is converted incrementally, and only the A/Z pairs those files belong to
+    are analyzed again; every other pair keeps its last verdict.
+
+    After every change the live summary (per-pair status plus totals) is
+    rewritten atomically, so it can be polled by other tools at any time.
+    """
+
+    def __init__(
+        self,
+        in_dir: Path,
+        out_dir: Path,
+        length_threshold: float = 0.25,
+        merge: bool = False,
+        output_format: str = "pretty",
+        poll_interval: float = 2.0,
+        debounce: float = 2.0,
+        jobs: int | None = None,
+        use_index: bool = True,
+        summary_path: Path | None = None,
+        on_event: Callable[..., None] | None = None,
+        pair_key: PairKeyStrategy | None = None,
+        rules: RuleSet | None = None,
+    ):
+        self.in_dir = in_dir
+        self.out_dir = out_dir
+        self.length_threshold = length_threshold
+        self.merge = merge
+        self.output_format = output_format
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.jobs = jobs
+        self.use_index = use_index
+        self.summary_path = summary_path or (out_dir / SUMMARY_FILENAME)
+        self.on_event = on_event
+        self.pair_key = pair_key or DEFAULT_PAIR_KEY
+        self.rules = rules
+
+        # input path -> stat at the time it was handed to the converter
+        self._done: dict[Path, tuple[int, int]] = {}
+        # input path -> (stat, monotonic time that stat was first seen)
+        self._pending: dict[Path, tuple[tuple[int, int], float]] = {}
+
+        # pair key -> {"A": opm path, "Z": opm path}
+        self.pairs: dict[str, dict[str, Path]] = {}
+        # pair key -> last verdict (see _record_verdict)
+        self.verdicts: dict[str, dict[str, Any]] = {}
+        # input path -> last conversion error
+        self.convert_errors: dict[str, str] = {}
+        # .opm name -> why it has no pair key
+        self.orphans: dict[str, str] = {}
+
+        self.totals = {"converted": 0, "updated": 0, "skipped": 0, "failed": 0, "merged": 0}
+
+    def _emit(self, event: str, **fields: Any) -> None:
+        if self.on_event is not None:
+            self.on_event(event, **fields)
+
+    # ---------------- Scanning ----------------
+
+    def _scan_inputs(self) -> dict[Path, tuple[int, int]]:
+        found: dict[Path, tuple[int, int]] = {}
+        try:
+            it = os.scandir(self.in_dir)
+        except OSError:
+            return found
+        with it:
+            for entry in it:
+                name = entry.name
+                # Skip our own bookkeeping (.json2opm_manifest.json) and the summary
+                if name.startswith(".") or not name.lower().endswith(".json"):
+                    continue
+                path = Path(entry.path)
+                if path == self.summary_path:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    found[path] = _stat_key(entry.stat())
+                except OSError:
+                    continue
+        return found
+
+    def poll(self, now: float | None = None) -> list[Path]:
+        """One scan of the input folder; returns inputs that are ready to convert."""
+        now = time.monotonic() if now is None else now
+        current = self._scan_inputs()
+
+        for gone in [p for p in self._pending if p not in current]:
+            del self._pending[gone]
+        for gone in [p for p in self._done if p not in current]:
+            del self._done[gone]
+
+        ready: list[Path] = []
+        for path, st in current.items():
+            if self._done.get(path) == st:
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != st:
+                # New or still being written: (re)start the debounce clock
+                self._pending[path] = (st, now)
+                continue
+            if now - pending[1] >= self.debounce:
+                ready.append(path)
+
+        for path in ready:
+            self._done[path] = self._pending.pop(path)[0]
+        return sorted(ready)
+
+    # ---------------- Pair analysis ----------------
+
+    def _features_for(self, opm_path: Path, features: dict[Path, OpmFeatures]) -> OpmFeatures | None:
+        f = features.get(opm_path)
+        if f is None and self.use_index:
+            f = load_cached_features(self.out_dir, [opm_path], prune=False, rules=self.rules)[0].get(opm_path)
+        if f is None:
+            try:
+                f = read_features(opm_path, self.rules)
+            except Exception:
+                return None
+        # Kept for the pair check, so the file isn't read twice
+        features[opm_path] = f
+        return f
+
+    def _add_opm(self, opm_path: Path, features: dict[Path, OpmFeatures]) -> str | None:
+        if opm_path.stem.endswith(MERGED_SUFFIX):
+            return None
+        f = self._features_for(opm_path, features) if self.pair_key.uses_features else None
+        key, side, reason = self.pair_key.key(opm_path, f)
+        if key is None or side is None:
+            self.orphans[opm_path.name] = reason or ""
+            self._emit("orphan", file=str(opm_path), reason=reason)
+            return None
+        self.orphans.pop(opm_path.name, None)
+        self.pairs.setdefault(key, {})[side] = opm_path
+        return key
+
+    def _record_verdict(self, key: str, check: PairCheck | None) -> str:
+        sides = self.pairs.get(key, {})
+        verdict: dict[str, Any] = {
+            "A": sides["A"].name if "A" in sides else None,
+            "Z": sides["Z"].name if "Z" in sides else None,
+            "issue": None,
+            "details": [],
+            "checked": datetime.now().isoformat(timespec="seconds"),
+        }
+        if check is None:
+            verdict["status"] = PAIR_WAITING
+        else:
+            verdict["issue"] = check.punch_row
+            verdict["details"] = [line for line in check.error_block or [] if line]
+            if check.eligible:
+                verdict["status"] = PAIR_FAILURE if check.punch_row else PAIR_OK
+            else:
+                verdict["status"] = PAIR_MISMATCH
+        self.verdicts[key] = verdict
+        return verdict["status"]
+
+    def _new_merger(self) -> MergeCollector | None:
+        if not self.merge:
+            return None
+        return MergeCollector(
+            self.out_dir, incremental=True, output_format=self.output_format, jobs=self.jobs or default_jobs()
+        )
+
+    def _analyze_keys(
+        self,
+        keys: set[str],
+        docs: dict[Path, dict] | None = None,
+        features: dict[Path, OpmFeatures] | None = None,
+        merger: MergeCollector | None = None,
+    ) -> None:
+        merger = merger if merger is not None else self._new_merger()
+        complete = []
+        for key in sorted(keys):
+            sides = self.pairs.get(key, {})
+            if "A" in sides and "Z" in sides:
+                complete.append((key, sides["A"], sides["Z"]))
+            else:
+                self._emit("pair", key=key, status=self._record_verdict(key, None))
+
+        for check in iter_pair_checks(
+            complete, self.length_threshold, docs=docs, on_eligible=merger, features=features, rules=self.rules
+        ):
+            self._emit("pair", key=check.key, status=self._record_verdict(check.key, check))
+
+        if merger is not None:
+            merge_out = merger.result()
+            self.totals["merged"] += merge_out["merged"]
+            for msg in merge_out["merged_msgs"]:
+                self._emit("merged", message=msg)
+            for msg in merge_out["merge_write_errors"]:
+                self._emit("merge_error", message=msg)
+
+    def load_existing(self) -> None:
+        """Baseline: analyze every pair already in the output folder once."""
+        opm_files = sorted(self.out_dir.glob("*.opm"))
+        features = load_cached_features(self.out_dir, opm_files, rules=self.rules)[0] if self.use_index else {}
+        keys = {k for k in (self._add_opm(p, features) for p in opm_files) if k}
+        self._analyze_keys(keys, features=features)
+
+    def process(self, ready: list[Path]) -> None:
+        """Convert ready inputs and re-check only the pairs they belong to."""
+        merger = self._new_merger()
+        results = convert_batch(
+            ready,
+            self.out_dir,
+            jobs=self.jobs,
+            keep_docs=merger is not None and merger.wants_docs,
+            incremental=True,
+            output_format=self.output_format,
+            rules=self.rules,
+        )
+
+        docs = docs_by_output_path(results)
+        features = features_by_output_path(results)
+        if self.use_index:
+            record_features(self.out_dir, features, hashes_by_output_path(results))
+
+        touched: set[str] = set()
+        for r in results:
+            src = str(r.src_path)
+            if not r.ok:
+                self.totals["failed"] += 1
+                self.convert_errors[src] = r.error or "unknown error"
+                self._emit("convert_error", src=src, error=r.error)
+                continue
+            self.convert_errors.pop(src, None)
+            self.totals[r.action] += 1
+            if r.action == SKIPPED:
+                continue
+            self._emit("converted", action=r.action, src=src, out=str(r.out_path))
+            key = self._add_opm(r.out_path, features)
+            if key:
+                touched.add(key)
+
+        # The partner side of a touched pair is usually not in this batch
+        if self.use_index:
+            partners = [
+                p for k in touched for p in self.pairs[k].values() if p not in features
+            ]
+            if partners:
+                features.update(load_cached_features(self.out_dir, partners, prune=False, rules=self.rules)[0])
+
+        self._analyze_keys(touched, docs=docs, features=features, merger=merger)
+
+    # ---------------- Summary ----------------
+
+    def summary(self) -> dict:
+        counts = {s: 0 for s in PAIR_STATUSES}
+        for v in self.verdicts.values():
+            counts[v["status"]] += 1
+        return {
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "input_dir": str(self.in_dir),
+            "output_dir": str(self.out_dir),
+            "length_threshold": self.length_threshold,
+            "files": dict(self.totals),
+            "pairs": counts,
+            "convert_errors": dict(sorted(self.convert_errors.items())),
+            "orphans": dict(sorted(self.orphans.items())),
+            "pair_details": dict(sorted(self.verdicts.items())),
+        }
+
+    def write_summary(self) -> None:
+        try:
+            write_json(self.summary_path, self.summary())
+        except OSError as e:
+            self._emit("summary_error", error=str(e))
+
+    # ---------------- Main loop ----------------
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """Poll until `stop` is set (or forever)."""
+        stop = stop or threading.Event()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        self.load_existing()
+        self.write_summary()
+        self._emit("watching", input_dir=str(self.in_dir), output_dir=str(self.out_dir), pairs=len(self.pairs))
+
+        while not stop.is_set():
+            ready = self.poll()
+            if ready:
+                self.process(ready)
+                self.write_summary()
+                summary = self.summary()
+                self._emit("summary", **{k: v for k, v in summary.items() if k not in ("pair_details", "orphans")})
+            stop.wait(self.poll_interval)
+
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+
+from json2opm.jsonio import dumps_compact, dumps_pretty
+
+
+# "pretty": indent=2, the historical layout. "compact": one line, roughly half the size.
+OUTPUT_FORMATS = ("pretty", "compact")
+
+
+def serialize_opm(doc: Dict[str, Any], output_format: str = "pretty") -> bytes:
+    if output_format == "pretty":
+        return dumps_pretty(doc)
+    if output_format == "compact":
+        return dumps_compact(doc)
+    raise ValueError(f"Unknown output format: {output_format!r} (expected one of {OUTPUT_FORMATS})")
+
+
+def _write_temp(path: Path, data: bytes) -> str:
+    # Same folder as `path`, so the final rename/link never crosses filesystems
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+    except BaseException:
+        _unlink_quietly(tmp)
+        raise
+    return tmp
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _publish_exclusive(tmp: str, path: Path) -> None:
+    """
+    Move the finished temp file to `path`, failing with FileExistsError if
+    `path` exists. os.link is atomic and refuses to replace, so of several
+    writers racing for one name exactly one wins. Filesystems without hard
+    links get an exclusive-create claim followed by os.replace instead.
+    """
+    try:
+        os.link(tmp, path)
+    except FileExistsError:
+        raise
+    except OSError:
+        with path.open("xb"):
+            pass
+        os.replace(tmp, path)
+        return
+    _unlink_quietly(tmp)
+
+
+def write_opm(path: Path, doc: Dict[str, Any], overwrite: bool = False, output_format: str = "pretty") -> int:
+    """
+    Write an OPM document, serialized up front and written in one call.
+    "pretty" output is byte-identical to json.dump(doc, f, indent=2) (see jsonio).
+    Returns the number of bytes written.
+
+    The document always goes to a temp file in the same folder first, so a
+    crash never leaves a half-written .opm behind; readers only ever see the
+    old file or the complete new one.
+
+    With overwrite=False the temp file is published exclusively: if `path`
+    already exists (or another worker gets there first) FileExistsError is
+    raised and the existing file is left alone. With overwrite=True it is
+    swapped in with os.replace.
+    """
+    return write_opm_data(path, serialize_opm(doc, output_format), overwrite=overwrite)
+
+
+def write_opm_data(path: Path, data: bytes, overwrite: bool = False) -> int:
+    """write_opm for a document already serialized with serialize_opm."""
+    tmp = _write_temp(path, data)
+    try:
+        if overwrite:
+            os.replace(tmp, path)
+        else:
+            _publish_exclusive(tmp, path)
+    except BaseException:
+        _unlink_quietly(tmp)
+        raise
+    return len(data)
+
+
+def write_json(path: Path, obj: Any) -> int:
+    """
+    Write a JSON report (indent=2, UTF-8), replacing `path` atomically: the
+    data goes to a temp file in the same folder and is swapped in with
+    os.replace, so a tool polling the file never reads a torn write.
+    Returns the number of bytes written. .opm documents go through write_opm.
+    """
+    data = json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    tmp = _write_temp(path, data)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        _unlink_quietly(tmp)
+        raise
+    return len(data)
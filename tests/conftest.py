@@ -0,0 +1,65 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# The tool runs from a checkout (python main.py / gui.py), it isn't installed
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.corpus import FaultRates, write_corpus  # noqa: E402
+from json2opm.engine import convert_batch  # noqa: E402
+from json2opm.mapper import map_pxm_json_to_opm  # noqa: E402
+
+SAMPLES_DIR = ROOT / "input_json"
+SAMPLE_A = SAMPLES_DIR / "P1_A02_C01_LC01_NS1_ROW_06_RACK_30_RU_45.json"
+SAMPLE_Z = SAMPLES_DIR / "P1_Z02_C01_LC01_NS1_ROW_06_RACK_30_RU_45.json"
+
+# Every fault in most pairs, so the checks see all of them on a small corpus
+FAULTY_RATES = FaultRates(polarity=0.3, wavelength=0.2, length=0.3, high_loss=0.3)
+
+
+def baseline_opm_bytes(src: Path) -> bytes:
+    """What the original converter wrote for `src`: json.load, map, json.dump(indent=2)."""
+    with src.open("r", encoding="utf-8") as f:
+        doc = json.load(f)
+    return json.dumps(map_pxm_json_to_opm(doc), indent=2).encode("utf-8")
+
+
+@pytest.fixture(scope="session")
+def samples_opm(tmp_path_factory) -> Path:
+    """input_json converted to .opm (read-only: copy before changing anything)."""
+    out = tmp_path_factory.mktemp("samples_opm")
+    results = convert_batch(sorted(SAMPLES_DIR.glob("*.json")), out, jobs=1)
+    assert all(r.ok for r in results)
+    return out
+
+
+@pytest.fixture(scope="session")
+def faulty_json(tmp_path_factory) -> Path:
+    """A synthetic Exchange corpus with polarity, wavelength, length and loss faults."""
+    out = tmp_path_factory.mktemp("faulty_json")
+    write_corpus(out, pairs=24, seed=7, rates=FAULTY_RATES, jobs=1)
+    return out
+
+
+@pytest.fixture(scope="session")
+def faulty_opm(tmp_path_factory, faulty_json) -> Path:
+    """faulty_json converted to .opm (read-only)."""
+    out = tmp_path_factory.mktemp("faulty_opm")
+    results = convert_batch(sorted(faulty_json.glob("*.json")), out, jobs=1)
+    assert all(r.ok for r in results)
+    return out
+
+
+@pytest.fixture
+def copy_opm(tmp_path):
+    """Copy a fixture folder's .opm files into a fresh folder of this test."""
+    def copy(src: Path, name: str = "opm") -> Path:
+        dst = tmp_path / name
+        dst.mkdir()
+        for p in src.glob("*.opm"):
+            (dst / p.name).write_bytes(p.read_bytes())
+        return dst
+    return copy
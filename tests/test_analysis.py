@@ -0,0 +1,77 @@
+from conftest import FAULTY_RATES
+
+from benchmarks.corpus import generate_pair, pair_name
+from json2opm.analysis import PairStream, analyze_pairs_from_opm_paths, iter_opm_files
+from json2opm.engine import convert_batch
+from json2opm.pairing import DEFAULT_PAIR_KEY
+
+PAIRS = 24
+# Not "wavelength": like the original getters, the check only reads bare numeric
+# Wavelength values, and Exchange exports them as {"Value": ...}
+BLOCKING = {"polarity", "length"}
+
+
+def injected_faults() -> dict[str, set[str]]:
+    return {pair_name(i, "A"): generate_pair(i, 7, FAULTY_RATES)[2] for i in range(PAIRS)}
+
+
+def test_checks_find_the_injected_faults(faulty_opm):
+    result = analyze_pairs_from_opm_paths(sorted(iter_opm_files(faulty_opm)))
+    faults = injected_faults()
+
+    eligible = {a_path.stem for _, a_path, _ in result["eligible_pairs"]}
+    assert eligible == {name for name, f in faults.items() if not f & BLOCKING}
+    stats = result["stats"]
+    assert stats["pairs_checked"] == PAIRS
+    assert stats["high_loss_pairs"] == sum("high_loss" in f for f in faults.values())
+    assert stats["polarity_issue_pairs"] == sum("polarity" in f for f in faults.values())
+    assert result["orphans"] == []
+
+
+def test_process_pool_matches_serial(faulty_opm):
+    paths = sorted(iter_opm_files(faulty_opm))
+    serial = analyze_pairs_from_opm_paths(paths)
+    parallel = analyze_pairs_from_opm_paths(paths, jobs=2)
+
+    assert parallel["stats"] == serial["stats"]
+    assert parallel["eligible_pairs"] == serial["eligible_pairs"]
+    assert parallel["punch_rows"] == serial["punch_rows"]
+
+
+def test_stream_holds_only_unpartnered_documents(tmp_path, faulty_json, faulty_opm):
+    merged: list[tuple[str, dict, dict]] = []
+    held: list[int] = []
+
+    def on_eligible(key, a_path, z_path, a_doc, z_doc):
+        merged.append((key, a_doc, z_doc))
+
+    pairs = PairStream(on_eligible=on_eligible)
+
+    def on_result(r):
+        pairs.add(r.out_path, r.features, r.doc)
+        held.append(len(pairs.docs))
+
+    results = convert_batch(
+        sorted(faulty_json.glob("*.json")), tmp_path, jobs=1, keep_docs=True, on_result=on_result,
+        order=DEFAULT_PAIR_KEY.order_key,
+    )
+    streamed = pairs.result()
+    batch = analyze_pairs_from_opm_paths(sorted(iter_opm_files(faulty_opm)))
+
+    assert streamed["stats"] == batch["stats"]
+    assert [k for k, _, _ in streamed["eligible_pairs"]] == [k for k, _, _ in batch["eligible_pairs"]]
+    # Scheduled by pair, each A side is followed by its Z side: at most one document waits
+    assert max(held) == 1 and held[-1] == 0
+    assert len(merged) == len(batch["eligible_pairs"])
+    assert all(a_doc is not None and z_doc is not None for _, a_doc, z_doc in merged)
+    assert all(r.ok for r in results)
+
+
+def test_unpaired_files_are_reported_as_orphans(tmp_path, faulty_opm, copy_opm):
+    folder = copy_opm(faulty_opm)
+    (folder / f"{pair_name(3, 'Z')}.opm").unlink()
+
+    result = analyze_pairs_from_opm_paths(sorted(iter_opm_files(folder)))
+
+    assert result["stats"]["pairs_checked"] == PAIRS - 1
+    assert [(o.path.stem, o.reason) for o in result["orphans"]] == [(pair_name(3, "A"), "no partner")]
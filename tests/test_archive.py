@@ -0,0 +1,83 @@
+import tarfile
+import zipfile
+
+import pytest
+from conftest import SAMPLES_DIR
+
+from json2opm.archive import ArchiveMember, run_outputs, write_output_zip
+from json2opm.engine import convert_batch, find_json_inputs
+
+SAMPLES = sorted(SAMPLES_DIR.glob("*.json"))
+
+
+def make_zip(path):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for p in SAMPLES:
+            zf.write(p, arcname=f"export/{p.name}")
+        zf.writestr("export/readme.txt", "not a result")
+    return path
+
+
+def make_tar(path):
+    with tarfile.open(path, "w:gz") as tf:
+        for p in SAMPLES:
+            tf.add(p, arcname=f"export/{p.name}")
+    return path
+
+
+@pytest.mark.parametrize("make, name", [(make_zip, "bundle.zip"), (make_tar, "bundle.tar.gz")])
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_members_convert_like_loose_files(tmp_path, samples_opm, make, name, jobs):
+    archive = make(tmp_path / name)
+    inputs = find_json_inputs([archive])
+
+    assert all(isinstance(p, ArchiveMember) for p in inputs)
+    assert sorted(p.name for p in inputs) == [p.name for p in SAMPLES]
+
+    out = tmp_path / "opm"
+    results = convert_batch(inputs, out, jobs=jobs)
+
+    assert all(r.ok for r in results)
+    for p in SAMPLES:
+        assert (out / f"{p.stem}.opm").read_bytes() == (samples_opm / f"{p.stem}.opm").read_bytes()
+    # Nothing was extracted next to the archive
+    assert sorted(q.name for q in tmp_path.iterdir()) == sorted([name, "opm"])
+
+
+def test_folder_inputs_include_archives_after_loose_files(tmp_path):
+    (tmp_path / SAMPLES[0].name).write_bytes(SAMPLES[0].read_bytes())
+    make_zip(tmp_path / "more.zip")
+
+    inputs = find_json_inputs([tmp_path])
+
+    assert inputs[0] == tmp_path / SAMPLES[0].name
+    assert len(inputs) == 1 + len(SAMPLES)
+
+
+def test_damaged_archive_is_a_single_failed_input(tmp_path):
+    bad = tmp_path / "bad.zip"
+    bad.write_bytes(b"PK\x03\x04 not really a zip")
+
+    inputs = find_json_inputs([bad])
+    (r,) = convert_batch(inputs, tmp_path / "opm", jobs=1)
+
+    assert inputs == [bad]
+    assert not r.ok and "bad.zip" in r.error
+
+
+def test_output_zip_packs_outputs_and_their_merges(tmp_path, samples_opm):
+    opm = sorted(samples_opm.glob("*.opm"))[:2]
+    merged = tmp_path / f"{opm[0].stem}_MergeMF.opm"
+    merged.write_bytes(b"{}")
+    copies = []
+    for p in opm:
+        copies.append(tmp_path / p.name)
+        copies[-1].write_bytes(p.read_bytes())
+
+    zip_path = tmp_path / "out.zip"
+    size = write_output_zip(zip_path, run_outputs(tmp_path, copies))
+
+    assert size == zip_path.stat().st_size
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.namelist() == [copies[0].name, merged.name, copies[1].name]
+        assert zf.read(copies[1].name) == opm[1].read_bytes()
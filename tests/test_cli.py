@@ -0,0 +1,85 @@
+import json
+import subprocess
+import sys
+
+import pytest
+from conftest import ROOT, SAMPLES_DIR
+
+from json2opm import cli, export
+from json2opm.cli import main
+
+
+def run(capsys, *argv: str) -> tuple[int, list[dict]]:
+    code = main([str(a) for a in argv])
+    return code, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_convert_merge_then_analyze_agree(tmp_path, capsys, faulty_json):
+    out = tmp_path / "opm"
+    code, events = run(capsys, "convert", faulty_json, "-o", out, "--merge", "-j", "1")
+
+    assert code == 0
+    summary = events[-1]
+    assert summary["event"] == "summary" and summary["stage"] == "convert"
+    assert summary["converted"] == 48 and summary["failed"] == 0
+    stats = summary["stats"]
+    assert 0 < stats["eligible_pairs"] < stats["pairs_checked"] == 24
+    assert summary["merge"]["merged"] == stats["eligible_pairs"]
+    assert len(list(out.glob("*_MergeMF.opm"))) == stats["eligible_pairs"]
+    assert sum(e["event"] == "issue" for e in events) > 0
+
+    code, events = run(capsys, "analyze", out)
+    assert code == 0
+    assert events[-1]["stats"] == stats
+
+
+def test_failed_conversions_set_the_exit_code(tmp_path, capsys, faulty_json):
+    out = tmp_path / "opm"
+    assert run(capsys, "convert", faulty_json, "-o", out, "-j", "1")[0] == 0
+
+    code, events = run(capsys, "convert", faulty_json, "-o", out, "-j", "1")
+
+    assert code != 0
+    assert events[-1]["failed"] == 48
+    assert all(e["event"] == "convert_error" for e in events if e["event"].startswith("convert"))
+
+
+def test_unwritable_readings_table_is_reported_not_raised(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(export, "default_readings_path", lambda out_dir: tmp_path / "missing" / "readings.csv")
+    out = tmp_path / "opm"
+
+    code, events = run(capsys, "convert", SAMPLES_DIR, "-o", out, "-j", "1", "--readings")
+
+    assert code != 0
+    summary = events[-1]
+    assert summary["event"] == "summary" and summary["failed"] == 0
+    assert summary["readings"] is None and "readings.csv" in summary["readings_error"]
+    assert len(list(out.glob("*.opm"))) == len(list(SAMPLES_DIR.glob("*.json")))
+
+
+def test_interrupted_convert_leaves_no_partial_readings_table(tmp_path, capsys, monkeypatch):
+    convert_batch = cli.convert_batch
+
+    def interrupted(*args, on_result, **kwargs):
+        def on_result_then_stop(r):
+            on_result(r)
+            raise KeyboardInterrupt
+
+        return convert_batch(*args, on_result=on_result_then_stop, **kwargs)
+
+    monkeypatch.setattr(cli, "convert_batch", interrupted)
+    out = tmp_path / "opm"
+
+    with pytest.raises(KeyboardInterrupt):
+        main(["convert", str(SAMPLES_DIR), "-o", str(out), "-j", "1", "--readings"])
+
+    assert list(out.glob("Readings - *")) == []
+
+
+def test_cli_imports_no_gui_or_optional_libraries():
+    probe = (
+        "import sys, json2opm.cli; "
+        "print(sorted(m for m in ('tkinter', 'numpy', 'pyarrow') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
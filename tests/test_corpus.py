@@ -0,0 +1,62 @@
+import json
+
+from conftest import FAULTY_RATES, SAMPLE_A
+
+from benchmarks.corpus import MANIFEST_NAME, FaultRates, generate_pair, write_corpus
+from benchmarks.run import compare_to_baseline
+
+
+def contents(folder):
+    return {p.name: p.read_bytes() for p in sorted(folder.glob("*.json"))}
+
+
+def test_corpus_is_the_same_whatever_the_worker_count(tmp_path, faulty_json):
+    manifest = write_corpus(tmp_path / "pooled", pairs=24, seed=7, rates=FAULTY_RATES, jobs=3)
+
+    assert contents(tmp_path / "pooled") == contents(faulty_json)
+    assert manifest == json.loads((faulty_json / MANIFEST_NAME).read_text(encoding="utf-8"))
+    planned = [generate_pair(i, 7, FAULTY_RATES)[2] for i in range(24)]
+    assert manifest["faults"] == {f: sum(f in p for p in planned) for f in manifest["faults"]}
+    assert manifest["bytes"] == sum(map(len, contents(faulty_json).values()))
+
+
+def test_matching_manifest_reuses_the_folder(tmp_path):
+    out = tmp_path / "corpus"
+    write_corpus(out, pairs=3, seed=1, jobs=1)
+    victim = sorted(out.glob("*.json"))[0]
+    victim.unlink()
+
+    write_corpus(out, pairs=3, seed=1, jobs=1)
+    assert not victim.exists()
+
+    write_corpus(out, pairs=3, seed=2, jobs=1)
+    assert victim.exists() and len(list(out.glob("*.json"))) == 6
+
+
+def test_documents_have_the_shape_of_the_samples():
+    sample = json.loads(SAMPLE_A.read_bytes())
+    a, z, faults = generate_pair(0, 1, FaultRates(0, 0, 0, 0))
+
+    assert faults == set()
+    for doc in (a, z):
+        assert set(doc) == set(sample)
+        assert set(doc["brief"]) == set(sample["brief"])
+        result = doc["brief"]["Measurement"]["OpmResultData"]
+        assert set(result) == set(sample["brief"]["Measurement"]["OpmResultData"])
+    assert a["name"].replace("_A", "_Z", 1) == z["name"]
+
+
+def test_regressions_are_reported_past_the_tolerance():
+    baseline = [
+        {"pairs": 100, "stage": "convert", "items_per_s": 100.0, "peak_rss": 1_000_000},
+        {"pairs": 100, "stage": "analyze", "items_per_s": 100.0, "peak_rss": 1_000_000},
+    ]
+    results = [
+        {"pairs": 100, "stage": "convert", "items_per_s": 95.0, "peak_rss": 1_050_000, "unit": "files"},
+        {"pairs": 100, "stage": "analyze", "items_per_s": 80.0, "peak_rss": 1_200_000, "unit": "pairs"},
+        {"pairs": 1000, "stage": "convert", "items_per_s": 1.0, "peak_rss": 1, "unit": "files"},
+    ]
+
+    regressions = compare_to_baseline(results, baseline, tolerance=0.1)
+
+    assert len(regressions) == 2 and all(r.startswith("analyze @ 100 pairs") for r in regressions)
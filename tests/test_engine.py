@@ -0,0 +1,59 @@
+from conftest import SAMPLE_A, SAMPLES_DIR, baseline_opm_bytes
+
+from json2opm.engine import (
+    CONVERTED,
+    convert_batch,
+    count_actions,
+    docs_by_output_path,
+    features_by_output_path,
+    find_json_inputs,
+)
+from json2opm.features import extract_features
+from json2opm.loader import load_json
+
+
+def test_outputs_are_byte_identical_to_the_original_converter(samples_opm):
+    for src in sorted(SAMPLES_DIR.glob("*.json")):
+        out = samples_opm / f"{src.stem}.opm"
+        assert out.read_bytes() == baseline_opm_bytes(src), src.name
+
+
+def test_process_pool_matches_serial(tmp_path, samples_opm):
+    inputs = find_json_inputs([SAMPLES_DIR])
+    results = convert_batch(inputs, tmp_path, jobs=2)
+
+    assert [r.src_path for r in results] == inputs
+    assert count_actions(results)[CONVERTED] == len(inputs)
+    for r in results:
+        assert r.out_path.read_bytes() == (samples_opm / r.out_path.name).read_bytes()
+
+
+def test_results_carry_features_and_requested_docs(tmp_path):
+    results = convert_batch([SAMPLE_A], tmp_path, jobs=1, keep_docs=True)
+    out = tmp_path / f"{SAMPLE_A.stem}.opm"
+
+    assert docs_by_output_path(results)[out] == load_json(out)
+    assert features_by_output_path(results)[out] == extract_features(load_json(out), load_json(SAMPLE_A))
+
+
+def test_existing_output_is_an_error_not_an_overwrite(tmp_path):
+    out = tmp_path / f"{SAMPLE_A.stem}.opm"
+    out.write_bytes(b"keep me")
+
+    (r,) = convert_batch([SAMPLE_A], tmp_path, jobs=1)
+
+    assert not r.ok
+    assert "already exists" in r.error
+    assert out.read_bytes() == b"keep me"
+
+
+def test_unreadable_input_fails_alone(tmp_path):
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json", encoding="utf-8")
+    out = tmp_path / "out"
+
+    results = convert_batch([bad, SAMPLE_A], out, jobs=1)
+
+    assert [r.ok for r in results] == [False, True]
+    assert results[0].failed_stage == "parse"
+    assert not (out / "bad.opm").exists()
@@ -0,0 +1,78 @@
+import csv
+
+import pytest
+from conftest import SAMPLES_DIR
+
+from json2opm import export
+from json2opm.engine import convert_batch
+from json2opm.export import READING_COLUMNS, ReadingsWriter, export_readings
+from json2opm.features import get_measurements
+from json2opm.loader import load_json
+from json2opm.pairing import DEFAULT_PAIR_KEY, MERGED_SUFFIX
+
+
+def read_csv(path):
+    with path.open(newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def count_readings(paths):
+    return sum(
+        sum(isinstance(r, dict) for r in m.get("Readings") or [])
+        for p in paths for m in get_measurements(load_json(p))
+    )
+
+
+def test_csv_has_a_row_per_reading(tmp_path, copy_opm, samples_opm):
+    folder = copy_opm(samples_opm)
+    paths = sorted(folder.glob("*.opm"))
+    merged = folder / f"{paths[0].stem}{MERGED_SUFFIX}.opm"
+    merged.write_bytes(paths[0].read_bytes())
+    bad = folder / "P1_A99_BAD.opm"
+    bad.write_text("{ nope", encoding="utf-8")
+
+    result = export_readings(tmp_path / "readings.csv", sorted(folder.glob("*.opm")))
+
+    rows = read_csv(result["path"])
+    assert rows[0] == list(READING_COLUMNS)
+    assert (result["files"], result["rows"]) == (len(paths), count_readings(paths)) == (len(paths), len(rows) - 1)
+    assert [p.name for p, _ in result["errors"]] == [bad.name]
+    first = dict(zip(rows[0], rows[1]))
+    assert (first["file"], first["side"], first["wavelength_nm"]) == (paths[0].name, "A", "1310")
+    assert first["pair_key"] == paths[0].stem.replace("_A02_", "_02_")
+
+
+def test_rows_kept_by_the_converter_match_the_export(tmp_path):
+    results = convert_batch(sorted(SAMPLES_DIR.glob("*.json")), tmp_path / "opm", jobs=2, keep_readings=True)
+    with ReadingsWriter(tmp_path / "during.csv") as writer:
+        for r in results:
+            writer.add(r.out_path, r.readings, *DEFAULT_PAIR_KEY.key(r.out_path)[:2])
+
+    after = export_readings(tmp_path / "after.csv", [r.out_path for r in results])
+
+    assert (tmp_path / "during.csv").read_bytes() == after["path"].read_bytes()
+
+
+def test_parquet_row_groups_hold_the_same_rows(tmp_path, samples_opm, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(export, "ROW_GROUP_SIZE", 100)
+    paths = sorted(samples_opm.glob("*.opm"))
+
+    result = export_readings(tmp_path / "readings.parquet", paths)
+    csv_rows = read_csv(export_readings(tmp_path / "readings.csv", paths)["path"])
+
+    assert result["format"] == "parquet"
+    table = pq.read_table(result["path"])
+    assert table.column_names == list(READING_COLUMNS)
+    assert pq.ParquetFile(result["path"]).num_row_groups == -(-result["rows"] // 100)
+    parquet_rows = [["" if v is None else str(v) for v in row.values()] for row in table.to_pylist()]
+    assert parquet_rows == csv_rows[1:]
+
+
+def test_without_pyarrow_parquet_becomes_csv(tmp_path, samples_opm, monkeypatch):
+    monkeypatch.setattr(export, "parquet_available", lambda: False)
+
+    result = export_readings(tmp_path / "readings.parquet", sorted(samples_opm.glob("*.opm"))[:2])
+
+    assert (result["format"], result["path"]) == ("csv", tmp_path / "readings.csv")
+    assert read_csv(result["path"])[0] == list(READING_COLUMNS)
@@ -0,0 +1,122 @@
+"""
+extract_features() against what the per-field getters returned before the
+one-pass extraction (json2opm/features.py at eee527a^). data/features_golden.json
+holds their output for the converted samples, the synthetic corpus and CASES.
+"""
+import dataclasses
+import json
+from pathlib import Path
+
+import pytest
+
+from json2opm.features import extract_features
+from json2opm.loader import load_json
+
+GOLDEN = json.loads((Path(__file__).parent / "data" / "features_golden.json").read_text(encoding="utf-8"))
+
+
+def native(measurements=None, **od):
+    """A native OPM document with its results under Measurement.OpmResultData."""
+    return {"Measurement": {"OpmResultData": {"Measurements": measurements or [], **od}}}
+
+
+def fiber(name, length=399.1, wavelength=None, **extra):
+    m = {"Name": name, "Readings": [{"Value": 0.3, "Status": "Pass"}], "FiberLength": {"LengthInfo": {"Length": length}}}
+    if wavelength is not None:
+        m["Wavelength"] = wavelength
+    return {**m, **extra}
+
+
+CASES = {
+    "empty": {},
+    "clean": native([fiber("1"), fiber("2", 398.7)], Status="Pass"),
+    "global_fail": {**native([fiber("1")]), "GlobalVerdict": "Fail"},
+    "result_status_fail": native([fiber("1")], Status="Fail"),
+    "measurement_status_fail": native([fiber("1"), fiber("2", Status="Fail")]),
+    "measurement_verdict_fail": native([fiber("1", Verdict="Fail")]),
+    "reading_fail": native([fiber("1", Readings=[{"Status": "Pass"}, {"Status": "Fail"}])]),
+    "odd_rows": native(["x", fiber("1", Readings="n/a"), fiber("2", FiberLength="n/a"), fiber("3", 12.5)]),
+    "null_length_first": native([fiber("1", None), fiber("2", 40.0)]),
+    "length_without_info": native([fiber("1", FiberLength={"Status": "Unknown"}), fiber("2", 7)]),
+    "result_level_length": native([{"Name": "1"}], FiberLength={"LengthInfo": {"Length": 15}}),
+    "repeated_fibers": native([
+        fiber("1", None, 1.31e-06), fiber("1", 50.0, 1.55e-06), fiber(2, 60.0), fiber("2", 61.0), fiber(None, 1.0),
+    ]),
+    "bare_wavelengths": native([fiber("1", wavelength=1310), fiber("2", wavelength=1550.0), fiber("3", wavelength=True)]),
+    "polarity": native(Connectors={
+        "ExpectedConnectors": {"PolarityType": " MPO  B "},
+        "ActualConnectors": {"PolarityType": "MPO A"},
+        "PolarityStatus": "Unknown",
+    }),
+    "polarity_partial": native(Connectors={"ExpectedConnectors": "MPO_B", "ActualConnectors": {"PolarityType": ""}}),
+    "connectors_not_a_dict": native(Connectors=["MPO_B"]),
+    "rooted": {
+        "Connectors": {"ActualConnectors": {"PolarityType": "MPO_A"}, "PolarityStatus": 1},
+        "Measurements": [fiber("1", 30.0, 1310, Status="Fail")],
+    },
+    "optical_data": {
+        "GlobalVerdict": "Pass",
+        "TestSet": "OLTS-85",
+        "Operator": "kim",
+        "OpticalData": {
+            "TestDateTime": "2025-12-16T12:00:00Z",
+            "Instrument": "OLTS-85",
+            "Tester": "kim",
+            "Measurements": [fiber("1", 22.0, 850, Status="Fail"), "x", fiber("2", "23.5")],
+        },
+    },
+    "optical_data_fallback": {
+        "Measurement": {"OpmResultData": {"Measurements": {"1": fiber("1")}}},
+        "OpticalData": {"Measurements": [fiber("1", 8.0, 1300)]},
+    },
+    "doc_level_length": {"Measurement": "n/a", "FiberLength": {"LengthInfo": {"Length": 3}}},
+    "doc_level_null_length": {"Measurement": {"OpmResultData": "n/a"}, "FiberLength": {"LengthInfo": {"Length": None}}},
+    "metadata": {
+        "JobId": "PATH_12_LCO1-NS3-LCO2-DHB-00007.Z11",
+        "DateTime": "",
+        "Timestamp": "2025-12-16",
+        "Identification": {"JobId": "J-1"},
+        "metadata": {"testPointName": "P1_Z11_C01"},
+    },
+    "metadata_brief": {"JobId": "CABLE-9", "brief": {"Identification": {"JobId": "PATH_1_X.A01"}}},
+    "metadata_brief_jobid": {"brief": {"JobId": 42}, "metadata": {"testPointName": ""}},
+}
+
+
+def as_golden(f) -> dict:
+    # JSON has no tuples and only string keys, as in the golden file
+    return json.loads(json.dumps(dataclasses.asdict(f)))
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_edge_cases_match_the_old_getters(name):
+    assert as_golden(extract_features(CASES[name])) == GOLDEN["cases"][name]
+
+
+def test_samples_match_the_old_getters(samples_opm):
+    paths = sorted(samples_opm.glob("*.opm"))
+    assert sorted(p.name for p in paths) == sorted(GOLDEN["samples"])
+    for p in paths:
+        assert as_golden(extract_features(load_json(p))) == GOLDEN["samples"][p.name], p.name
+
+
+def test_corpus_matches_the_old_getters(faulty_opm):
+    paths = sorted(faulty_opm.glob("*.opm"))
+    assert sorted(p.name for p in paths) == sorted(GOLDEN["corpus"])
+    for p in paths:
+        assert as_golden(extract_features(load_json(p))) == GOLDEN["corpus"][p.name], p.name
+
+
+def test_source_document_supplies_pairing_metadata():
+    source = CASES["metadata"]
+    f = extract_features(CASES["clean"], source_doc=source)
+    assert (f.job_id, f.test_point_name) == ("J-1", "P1_Z11_C01")
+    # The OPM's own values come first
+    assert extract_features(source, source_doc=CASES["metadata_brief"]).job_id == "J-1"
+
+
+@pytest.mark.parametrize("length", ["399.1", True])
+def test_only_numbers_count_as_a_length(length):
+    # The old getters took float() of anything; a string or bool length now counts as missing
+    f = extract_features(native([fiber("1", length)]))
+    assert (f.length, f.length_missing) == (None, True)
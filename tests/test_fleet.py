@@ -0,0 +1,84 @@
+from collections import defaultdict
+
+import pytest
+
+from json2opm import fleet
+from json2opm.features import get_measurements, numeric_value, wavelength_nm
+from json2opm.loader import load_json
+from json2opm.pairing import DEFAULT_PAIR_KEY, MERGED_SUFFIX
+
+np = pytest.importorskip("numpy")
+
+
+def reference(paths):
+    """Per-wavelength (loss, fail) lists and the first loss per (pair, side, fiber, wavelength), in plain Python."""
+    by_wl = defaultdict(list)
+    first = {}
+    for p in paths:
+        key, side, _ = DEFAULT_PAIR_KEY.key(p)
+        for m in get_measurements(load_json(p)):
+            wl = wavelength_nm(m.get("Wavelength"))
+            for r in m.get("Readings") or []:
+                loss = numeric_value(r.get("Value"))
+                if wl is None or loss is None:
+                    continue
+                by_wl[wl].append((loss, r.get("Status") == "Fail"))
+                first.setdefault((key, side, int(m["Name"]), wl), loss)
+    return by_wl, first
+
+
+def test_stats_match_a_plain_python_computation(faulty_opm):
+    paths = sorted(faulty_opm.glob("*.opm"))
+    by_wl, first = reference(paths)
+
+    stats = fleet.fleet_stats(fleet.load_reading_table(paths))
+
+    assert stats["readings"] == sum(len(v) for v in by_wl.values())
+    assert stats["fail_readings"] == sum(f for v in by_wl.values() for _, f in v) > 0
+    assert [w["wavelength_nm"] for w in stats["per_wavelength"]] == sorted(by_wl)
+    for w in stats["per_wavelength"]:
+        loss = np.array([x for x, _ in by_wl[w["wavelength_nm"]]])
+        q1, q3 = np.percentile(loss, [25, 75])
+        fences = (q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))
+        assert w["readings"] == len(loss)
+        assert w["mean_db"] == pytest.approx(loss.mean(), abs=1e-3)
+        assert w["std_db"] == pytest.approx(loss.std(), abs=1e-3)
+        assert (w["min_db"], w["max_db"]) == pytest.approx((loss.min(), loss.max()), abs=1e-3)
+        for q in fleet.PERCENTILES:
+            assert w["percentiles_db"][f"p{q}"] == pytest.approx(np.percentile(loss, q), abs=1e-3)
+        assert w["outliers"] == int(((loss < fences[0]) | (loss > fences[1])).sum())
+
+    deltas = [
+        first[(key, "A", fiber, wl)] - z_loss
+        for (key, side, fiber, wl), z_loss in first.items()
+        if side == "Z" and (key, "A", fiber, wl) in first
+    ]
+    assert stats["az_delta"]["matched"] == len(deltas) > 0
+    assert abs(stats["az_delta"]["largest"][0]["delta_db"]) == pytest.approx(max(map(abs, deltas)), abs=1e-3)
+
+
+def test_process_pool_loads_the_same_table(faulty_opm, monkeypatch):
+    monkeypatch.setattr(fleet, "_FILE_CHUNK_SIZE", 8)
+    paths = sorted(faulty_opm.glob("*.opm"))
+
+    serial = fleet.load_reading_table(paths, jobs=1)
+    pooled = fleet.load_reading_table(paths, jobs=2)
+
+    assert pooled.files == serial.files and pooled.pair_keys == serial.pair_keys
+    for name in ("file", "fiber", "wavelength_nm", "loss_db", "reference_dbm", "length", "fail", "pair", "side"):
+        assert np.array_equal(getattr(pooled, name), getattr(serial, name), equal_nan=name in ("reference_dbm", "length"))
+
+
+def test_merged_outputs_are_skipped_and_bad_files_listed(copy_opm, samples_opm):
+    folder = copy_opm(samples_opm)
+    paths = sorted(folder.glob("*.opm"))
+    merged = folder / f"{paths[0].stem}{MERGED_SUFFIX}.opm"
+    merged.write_bytes(paths[0].read_bytes())
+    bad = folder / "P1_A99_BAD.opm"
+    bad.write_text("{ nope", encoding="utf-8")
+
+    t = fleet.load_reading_table(sorted(folder.glob("*.opm")))
+
+    assert t.files == paths
+    assert [p for p, _ in t.errors] == [bad]
+    assert fleet.fleet_stats(t)["unreadable_files"] == 1
@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from conftest import SAMPLES_DIR
+
+from json2opm.engine import convert_batch, features_by_output_path, hashes_by_output_path
+from json2opm.features import extract_features
+from json2opm.index import INDEX_FILENAME, FeatureIndex, load_cached_features, record_features
+from json2opm.loader import load_json
+from json2opm.rules import RuleSet
+
+
+def opm_files(folder):
+    return sorted(folder.glob("*.opm"))
+
+
+def test_second_lookup_is_served_from_the_index(copy_opm, samples_opm):
+    folder = copy_opm(samples_opm)
+    paths = opm_files(folder)
+
+    first, hits, parsed = load_cached_features(folder, paths)
+    again, hits_again, parsed_again = load_cached_features(folder, paths)
+
+    assert (hits, parsed) == (0, len(paths))
+    assert (hits_again, parsed_again) == (len(paths), 0)
+    assert again == first == {p: extract_features(load_json(p)) for p in paths}
+
+
+def test_converter_features_and_hashes_seed_the_index(tmp_path):
+    out = tmp_path / "opm"
+    results = convert_batch(sorted(SAMPLES_DIR.glob("*.json")), out, jobs=1)
+    assert record_features(out, features_by_output_path(results), hashes_by_output_path(results))
+
+    # Touched files are vouched for by their content hash, not parsed again
+    for p in opm_files(out):
+        os.utime(p, ns=(p.stat().st_atime_ns, p.stat().st_mtime_ns + 1_000_000_000))
+    _, hits, parsed = load_cached_features(out, opm_files(out))
+    assert (hits, parsed) == (len(results), 0)
+
+
+def test_rewrite_with_the_same_size_and_mtime_is_parsed_again(copy_opm, samples_opm):
+    folder = copy_opm(samples_opm)
+    a = opm_files(folder)[0]
+    with FeatureIndex(folder) as index:
+        before = index.lookup([a])[a]
+
+    # Give the rewrite a later ctime than the row, even on a coarse clock
+    time.sleep(0.05)
+    st = a.stat()
+    a.write_bytes(a.read_bytes().replace(b'"Length": 3', b'"Length": 4'))
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert (a.stat().st_size, a.stat().st_mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+    with FeatureIndex(folder) as index:
+        # cached() only trusts the stat, so it leaves the file to the caller
+        assert index.cached([a]) == {}
+        after = index.lookup([a])[a]
+        assert (index.hits, index.parsed) == (0, 1)
+    assert after.length == pytest.approx(before.length + 100)
+
+
+def test_rows_follow_the_rule_set_and_schema(copy_opm, samples_opm):
+    folder = copy_opm(samples_opm)
+    paths = opm_files(folder)[:4]
+    rules = RuleSet([{"name": "connectors", "path": "Measurement.OpmResultData.LinkDefinition.ConnectorCount",
+                      "reduce": "first", "op": "==", "value": 2}])
+
+    load_cached_features(folder, paths)
+    features, hits, parsed = load_cached_features(folder, paths, rules=rules)
+    assert (hits, parsed) == (0, len(paths))
+    assert all(f.rule_values == {"connectors": 2} for f in features.values())
+    # Rows taken with rules serve plain lookups too
+    assert load_cached_features(folder, paths)[1:] == (len(paths), 0)
+
+    with sqlite3.connect(folder / INDEX_FILENAME) as conn:
+        conn.execute("PRAGMA user_version = 1")
+    assert load_cached_features(folder, paths)[1:] == (0, len(paths))
+
+
+def test_full_listing_prunes_rows_and_bad_files_are_not_cached(copy_opm, samples_opm):
+    folder = copy_opm(samples_opm)
+    paths = opm_files(folder)
+    bad = folder / "P1_A99_BAD.opm"
+    bad.write_text("{ nope", encoding="utf-8")
+
+    features, _, _ = load_cached_features(folder, paths + [bad])
+    assert bad not in features
+
+    paths[0].unlink()
+    load_cached_features(folder, paths[1:])
+    with sqlite3.connect(folder / INDEX_FILENAME) as conn:
+        names = {name for (name,) in conn.execute("SELECT name FROM features")}
+    assert names == {p.name for p in paths[1:]}
@@ -0,0 +1,61 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from conftest import SAMPLES_DIR
+
+from json2opm.cli import main
+from json2opm.instrument import STAGES, RunMetrics, StageClock
+
+
+def test_stage_clock_keeps_the_stage_that_raised():
+    clock = StageClock()
+    clock.enter("read")
+    clock.enter("parse")
+    times = clock.stop()
+
+    assert list(times) == ["read", "parse"] and all(t >= 0 for t in times.values())
+    assert clock.current == "parse"
+
+
+def test_counters_add_up_across_threads_and_errors():
+    metrics = RunMetrics("convert")
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: metrics.add_times({"parse": 0.01, "map": 0.02}, {"parse": 1_000_000}), range(200)))
+    metrics.add_times({"read": 0.0, "parse": 0.0}, failed_stage="parse")
+    metrics.add_times({"read": 0.0}, failed_stage="map")
+    with pytest.raises(ValueError):
+        with metrics.timed("punch") as t:
+            t.nbytes = 10
+            raise ValueError("disk full")
+
+    summary = metrics.stage_summary()
+
+    assert list(summary) == [s for s in STAGES if s in summary]
+    assert summary["parse"]["files"] == 201 and summary["parse"]["errors"] == 1
+    assert summary["parse"]["mb_per_s"] == pytest.approx(100.0)
+    assert summary["map"] == {"seconds": 4.0, "files": 201, "bytes": 0, "errors": 1}
+    assert summary["punch"]["errors"] == 1 and summary["punch"]["bytes"] == 10
+
+
+@pytest.mark.parametrize("profile", [False, True])
+def test_convert_writes_a_run_report(tmp_path, capsys, profile):
+    out = tmp_path / "opm"
+    flag = "--profile" if profile else "--run-report"
+
+    assert main(["convert", str(SAMPLES_DIR), "-o", str(out), "-j", "1", flag]) == 0
+
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    timings = next(e for e in events if e["event"] == "timings")
+    report_path = out / events[-1]["run_report"]
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    files = len(list(SAMPLES_DIR.glob("*.json")))
+
+    assert report["command"] == "convert" and report["stages"] == timings["stages"]
+    for stage in ("read", "parse", "map", "serialize", "write"):
+        assert (report["stages"][stage]["files"], report["stages"][stage]["errors"]) == (files, 0)
+    assert report["stages"]["write"]["bytes"] == sum(p.stat().st_size for p in out.glob("*.opm"))
+    assert ("memory" in report, "profile" in report) == (profile, profile)
+    if profile:
+        assert report_path.with_suffix(".prof").exists()
+        assert report["profile"]["top"] and report["memory"]["tracemalloc_peak_bytes"] > 0
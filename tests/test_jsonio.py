@@ -0,0 +1,75 @@
+import json
+import random
+
+import pytest
+
+from json2opm import jsonio
+
+# Floats orjson spells differently from repr(), and their neighbours
+FLOATS = [
+    1.31e-06, 1.55e-06, 1e16, 1e-05, 1.234e-05, 0.0001, 0.00001234, 123456789012345680.0,
+    1e22, 5e-324, 1.7976931348623157e308, -0.0, 0.1, -2.5e-07, 3.0,
+]
+
+
+def reference(doc) -> bytes:
+    return json.dumps(doc, indent=2).encode("ascii")
+
+
+def test_backend_is_reported():
+    assert jsonio.LOADS_BACKEND in ("orjson", "msgspec", "stdlib")
+    assert jsonio.DUMPS_BACKEND in ("orjson", "stdlib")
+
+
+@pytest.mark.parametrize("value", FLOATS)
+def test_float_spelling_matches_the_stdlib(value):
+    doc = {"Value": value, "List": [value, -value], "Nested": {"x": [{"y": value}]}}
+    assert jsonio.dumps_pretty(doc) == reference(doc)
+
+
+def test_number_lookalikes_inside_strings_are_left_alone():
+    doc = {
+        "e-notation": "1.31e-6",
+        'quote "1e16" inside': ["1e16", 'a \\"1.234e-05\\" b', "\\\\", 1e16],
+        "1e-05": 1e-05,
+    }
+    assert jsonio.dumps_pretty(doc) == reference(doc)
+
+
+def test_values_only_the_stdlib_handles():
+    for doc in (
+        {"big": 2 ** 70, "neg": -(2 ** 64)},
+        {"name": "Lorenzo Müngia", "del": "\x7f"},
+        {"nan": float("nan"), "inf": [float("inf"), None]},
+    ):
+        assert jsonio.dumps_pretty(doc) == reference(doc)
+
+
+def test_random_documents_round_trip_identically():
+    rng = random.Random(5)
+    for _ in range(200):
+        doc = {
+            f"k{i}": rng.choice([
+                rng.uniform(-1e3, 1e3),
+                rng.uniform(0, 1) * 10 ** rng.randint(-12, 20),
+                rng.randint(-10 ** 20, 10 ** 20),
+                "s" * rng.randint(0, 3),
+                None, True, [],
+            ])
+            for i in range(8)
+        }
+        data = jsonio.dumps_pretty(doc)
+        assert data == reference(doc)
+        assert jsonio.loads(data) == json.loads(data)
+
+
+def test_loads_matches_the_stdlib():
+    data = b'{"long": 123456789012345678901234567890, "f": 1.31e-06, "nan": NaN, "s": "\\u00e9"}'
+    assert repr(jsonio.loads(data)) == repr(json.loads(data))
+    with pytest.raises(json.JSONDecodeError):
+        jsonio.loads(b'{"broken": ')
+
+
+def test_compact_keeps_field_order():
+    doc = {"b": 1, "a": [1.31e-06, {"z": None, "y": "x"}]}
+    assert jsonio.dumps_compact(doc) == json.dumps(doc, separators=(",", ":")).encode("ascii")
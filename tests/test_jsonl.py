@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from conftest import SAMPLES_DIR
+
+from json2opm.engine import convert_batch, find_json_inputs
+from json2opm.jsonl import JsonlRecord, OpmBundleWriter, iter_bundle, split_bundle
+
+SAMPLES = sorted(SAMPLES_DIR.glob("*.json"))
+
+
+def make_jsonl(path, docs=None):
+    docs = docs if docs is not None else [json.loads(p.read_bytes()) for p in SAMPLES]
+    path.write_text("".join(json.dumps(d) + "\n\n" for d in docs), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_lines_convert_like_loose_files(tmp_path, samples_opm, jobs):
+    inputs = find_json_inputs([make_jsonl(tmp_path / "results.jsonl")])
+
+    assert all(isinstance(p, JsonlRecord) for p in inputs)
+    assert [p.stem for p in inputs] == [p.stem for p in SAMPLES]
+
+    results = convert_batch(inputs, tmp_path / "opm", jobs=jobs)
+
+    assert all(r.ok for r in results)
+    for p in SAMPLES:
+        assert (tmp_path / "opm" / f"{p.stem}.opm").read_bytes() == (samples_opm / f"{p.stem}.opm").read_bytes()
+
+
+def test_bundle_output_splits_back_into_the_same_files(tmp_path, samples_opm):
+    with OpmBundleWriter(tmp_path / "all.opm.jsonl") as bundle:
+        results = convert_batch(SAMPLES, tmp_path / "unused", jobs=1, bundle=bundle)
+    assert all(r.ok for r in results)
+    assert bundle.records == len(SAMPLES)
+    assert list((tmp_path / "unused").iterdir()) == []
+
+    wanted = SAMPLES[3].stem
+    one = split_bundle(tmp_path / "all.opm.jsonl", tmp_path / "one", names=[wanted, "missing"])
+    assert [p.name for p in one["written"]] == [f"{wanted}.opm"]
+    assert one["missing"] == ["missing"]
+
+    split = split_bundle(tmp_path / "all.opm.jsonl", tmp_path / "split")
+    assert split["errors"] == []
+    for p in SAMPLES:
+        assert (tmp_path / "split" / f"{p.stem}.opm").read_bytes() == (samples_opm / f"{p.stem}.opm").read_bytes()
+
+
+def test_duplicate_record_names_fail_before_reaching_the_bundle(tmp_path):
+    doc = json.loads(SAMPLES[0].read_bytes())
+    inputs = find_json_inputs([make_jsonl(tmp_path / "twice.jsonl", [doc, doc])])
+
+    with OpmBundleWriter(tmp_path / "all.opm.jsonl") as bundle:
+        results = convert_batch(inputs, tmp_path / "opm", jobs=1, bundle=bundle)
+
+    assert [r.ok for r in results] == [True, False]
+    assert "already has a record" in results[1].error
+    assert [name for _, name, _, _ in iter_bundle(tmp_path / "all.opm.jsonl")] == [SAMPLES[0].stem]
+
+
+def test_interrupted_bundle_leaves_nothing(tmp_path):
+    with pytest.raises(RuntimeError):
+        with OpmBundleWriter(tmp_path / "all.opm.jsonl") as bundle:
+            bundle.add("x", b"{}")
+            raise RuntimeError("cancelled")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bad_lines_are_reported_by_line(tmp_path):
+    bundle = tmp_path / "all.opm.jsonl"
+    bundle.write_bytes(b'{"name": "ok", "opm": {}}\n{"name": "x"}\nnot json\n')
+
+    result = split_bundle(bundle, tmp_path / "out")
+
+    assert [p.name for p in result["written"]] == ["ok.opm"]
+    assert [e.split(":")[0] for e in result["errors"]] == ["line 2", "line 3"]
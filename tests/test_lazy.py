@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from json2opm import jsonio, lazy
+from json2opm.features import extract_features
+from json2opm.loader import load_json
+from json2opm.rules import RuleSet
+
+pytest.importorskip("msgspec")
+
+
+def big_opm(src, dst):
+    """`src` with its measurements repeated until the file passes LAZY_MIN_BYTES."""
+    doc = load_json(src)
+    od = doc["Measurement"]["OpmResultData"]
+    od["Measurements"] = od["Measurements"] * (lazy.LAZY_MIN_BYTES // len(json.dumps(od["Measurements"])) + 1)
+    dst.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+    assert dst.stat().st_size >= lazy.LAZY_MIN_BYTES
+    return dst
+
+
+def no_full_parse(monkeypatch):
+    def refuse(data):
+        raise AssertionError("took the full parse")
+    monkeypatch.setattr(jsonio, "loads", refuse)
+
+
+def test_large_files_are_projected_with_the_same_features(tmp_path, samples_opm, monkeypatch):
+    for src in sorted(samples_opm.glob("*.opm"))[:4]:
+        path = big_opm(src, tmp_path / src.name)
+        expected = extract_features(load_json(path))
+        with monkeypatch.context() as m:
+            no_full_parse(m)
+            assert lazy.read_features(path) == expected
+            assert lazy.features_from_bytes(path.read_bytes()) == expected
+
+
+def test_every_converted_file_projects_the_same(samples_opm, faulty_opm, monkeypatch):
+    monkeypatch.setattr(lazy, "LAZY_MIN_BYTES", 0)
+    for path in sorted(samples_opm.glob("*.opm")) + sorted(faulty_opm.glob("*.opm")):
+        assert lazy.read_features(path) == extract_features(load_json(path)), path.name
+
+
+@pytest.mark.parametrize("change", [
+    lambda od: od["Measurements"].append("not an object"),
+    lambda od: od["Measurements"][0].update(Readings={"Status": "Fail"}),
+    lambda od: od.update(Measurements={"1": {}}),
+])
+def test_unexpected_shapes_fall_back_to_the_full_parse(tmp_path, samples_opm, monkeypatch, change):
+    monkeypatch.setattr(lazy, "LAZY_MIN_BYTES", 0)
+    doc = load_json(next(samples_opm.glob("*.opm")))
+    change(doc["Measurement"]["OpmResultData"])
+    path = tmp_path / "odd.opm"
+    path.write_text(json.dumps(doc), encoding="utf-8")
+
+    assert lazy._project(path.read_bytes()) is None
+    assert lazy.read_features(path) == extract_features(doc)
+
+
+def test_rules_take_the_full_parse(tmp_path, samples_opm, monkeypatch):
+    src = sorted(samples_opm.glob("*.opm"))[0]
+    path = big_opm(src, tmp_path / src.name)
+    rules = RuleSet([{"name": "connectors", "path": "Measurement.OpmResultData.LinkDefinition.ConnectorCount",
+                      "reduce": "first", "op": "==", "value": 2}])
+
+    features = lazy.read_features(path, rules)
+
+    assert features == extract_features(load_json(path), rules=rules)
+    assert features.rule_values == {"connectors": 2}
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pytest
+
+from json2opm.analysis import check_pair
+from json2opm.features import OpmFeatures
+from json2opm.lengths import compare_fiber_lengths
+
+
+def features(fiber_lengths) -> OpmFeatures:
+    first = next(iter(fiber_lengths.values()), None)
+    return OpmFeatures(
+        expected_polarity="MPO_B", actual_polarity="MPO_B", polarity_status=None, wavelengths_nm=[],
+        length=first, length_missing=first is None, high_loss=False, cable_id=None, ose=None, test_date=None,
+        tester=None, fiber_lengths=fiber_lengths,
+    )
+
+
+def test_every_fiber_both_sides_measured_is_compared():
+    a = {"1": 100.0, "2": 100.0, "3": 100.0, "4": None, "5": 10.0}
+    z = {"1": 100.1, "2": 101.0, "3": 99.5, "4": 50.0, "6": 10.0}
+
+    d = compare_fiber_lengths(a, z, 0.25)
+
+    assert (d.compared, d.over, d.worst_fiber) == (3, 2, "2")
+    assert (d.a_length, d.z_length, d.delta) == (100.0, 101.0, pytest.approx(1.0))
+
+
+def test_nothing_to_compare():
+    assert compare_fiber_lengths({"1": None}, {"1": 5.0}, 0.25) is None
+    assert compare_fiber_lengths({}, {}, 0.25) is None
+
+
+def test_a_later_fiber_blocks_the_merge_when_the_first_agrees():
+    a = features({"1": 100.0, "2": 100.0, "3": 100.0})
+    z = features({"1": 100.0, "2": 100.0, "3": 103.0})
+
+    check = check_pair("K", Path("a.opm"), Path("z.opm"), a, z, 0.25)
+
+    assert check.length_issue and check.mismatch and not check.eligible
+    assert check.fiber_lengths.worst_fiber == "3"
+    assert "fiber 3" in check.punch_row["Details"]
+
+    same = check_pair("K", Path("a.opm"), Path("z.opm"), a, features(dict(a.fiber_lengths)), 0.25)
+    assert same.eligible and same.punch_row is None
@@ -0,0 +1,63 @@
+import os
+
+from conftest import SAMPLE_A, SAMPLE_Z, baseline_opm_bytes
+
+from json2opm.engine import CONVERTED, SKIPPED, UPDATED, convert_batch
+from json2opm.manifest import MANIFEST_FILENAME
+
+
+def convert(src, out, **kw):
+    return convert_batch(sorted(src.glob("*.json")), out, jobs=1, incremental=True, **kw)
+
+
+def inputs(tmp_path):
+    src = tmp_path / "json"
+    src.mkdir()
+    for p in (SAMPLE_A, SAMPLE_Z):
+        (src / p.name).write_bytes(p.read_bytes())
+    return src
+
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+    src, out = inputs(tmp_path), tmp_path / "opm"
+    assert [r.action for r in convert(src, out)] == [CONVERTED, CONVERTED]
+    assert (out / MANIFEST_FILENAME).is_file()
+
+    again = convert(src, out)
+
+    assert [r.action for r in again] == [SKIPPED, SKIPPED]
+    assert all(r.features is None for r in again)
+
+
+def test_touched_input_with_the_same_hash_is_skipped(tmp_path):
+    src, out = inputs(tmp_path), tmp_path / "opm"
+    convert(src, out)
+    a = src / SAMPLE_A.name
+    st = a.stat()
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+    assert [r.action for r in convert(src, out)] == [SKIPPED, SKIPPED]
+    # The new stat was recorded: the next run doesn't even hash it
+    assert [r.src_hash for r in convert(src, out)] == [None, None]
+
+
+def test_changed_input_and_damaged_output_are_rebuilt(tmp_path):
+    src, out = inputs(tmp_path), tmp_path / "opm"
+    convert(src, out)
+    a = src / SAMPLE_A.name
+    a.write_bytes(a.read_bytes().replace(b'"EXFO"', b'"EXFO Inc."', 1))
+    (out / f"{SAMPLE_Z.stem}.opm").write_bytes(b"{}")
+
+    results = convert(src, out)
+
+    assert [r.action for r in results] == [UPDATED, UPDATED]
+    assert (out / f"{SAMPLE_Z.stem}.opm").read_bytes() == baseline_opm_bytes(SAMPLE_Z)
+    assert (out / f"{SAMPLE_A.stem}.opm").read_bytes() == baseline_opm_bytes(a)
+
+
+def test_format_change_rebuilds(tmp_path):
+    src, out = inputs(tmp_path), tmp_path / "opm"
+    convert(src, out)
+
+    assert [r.action for r in convert(src, out, output_format="compact")] == [UPDATED, UPDATED]
+    assert b"\n" not in (out / f"{SAMPLE_A.stem}.opm").read_bytes()
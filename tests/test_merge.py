@@ -0,0 +1,126 @@
+import copy
+import json
+
+import pytest
+
+from json2opm.jsonl import OpmBundleWriter, iter_bundle
+from json2opm.loader import load_json
+from json2opm.merge import MergeCollector, merge_opm_docs
+from json2opm.pairing import MERGED_SUFFIX
+
+
+def _worst_verdict(a, z):
+    order = {"Fail": 3, "Unknown": 2, "Pass": 1, None: 0}
+    return a if order.get(a, 0) >= order.get(z, 0) else z
+
+
+def deepcopy_merge(a_doc: dict, z_doc: dict) -> dict:
+    """The original JSON2OPMApp._merge_opm_docs, the reference for merge_opm_docs."""
+    merged = copy.deepcopy(a_doc)
+    a_od = merged.get("OpticalData", {})
+    z_od = z_doc.get("OpticalData", {})
+    combined = []
+    for m in (a_od.get("Measurements", []) or []) + (z_od.get("Measurements", []) or []):
+        m2 = copy.deepcopy(m)
+        if "ResultState" not in m2:
+            m2["ResultState"] = "Active"
+        fl = m2.get("FiberLength")
+        if isinstance(fl, dict) and "Origin" not in fl:
+            fl["Origin"] = "Unknown"
+        combined.append(m2)
+    a_od["Measurements"] = combined
+    if "AutoWavelength" not in a_od:
+        a_od["AutoWavelength"] = False
+    worst = _worst_verdict(a_doc.get("GlobalVerdict"), z_doc.get("GlobalVerdict"))
+    merged["GlobalVerdict"] = worst
+    a_od["Status"] = worst
+    merged["OpticalData"] = a_od
+    return merged
+
+
+def measurement(name, **extra):
+    return {"Name": name, "Readings": [{"Value": 0.4}], **extra}
+
+
+CASES = [
+    (
+        {"GlobalVerdict": "Pass", "OpticalData": {"Measurements": [measurement("1"), measurement("2", ResultState="Off")]}},
+        {"GlobalVerdict": "Fail", "OpticalData": {"Measurements": [measurement("1", FiberLength={"Length": 5.0})]}},
+    ),
+    (
+        {"GlobalVerdict": "Unknown", "OpticalData": {"AutoWavelength": True, "Measurements": None}},
+        {"OpticalData": {"Measurements": [measurement("3", FiberLength={"Origin": "Measured"})]}},
+    ),
+    ({"GlobalVerdict": None}, {"GlobalVerdict": "Pass"}),
+    ({}, {}),
+]
+
+
+@pytest.mark.parametrize("a_doc, z_doc", CASES)
+def test_matches_the_deepcopy_merge_and_leaves_inputs_alone(a_doc, z_doc):
+    a_before, z_before = copy.deepcopy(a_doc), copy.deepcopy(z_doc)
+
+    merged = merge_opm_docs(a_doc, z_doc)
+
+    assert json.dumps(merged) == json.dumps(deepcopy_merge(a_before, z_before))
+    assert a_doc == a_before and z_doc == z_before
+
+
+def test_matches_the_deepcopy_merge_on_converted_files(samples_opm):
+    for a_path in sorted(samples_opm.glob("*_A02_*.opm")):
+        z_path = a_path.with_name(a_path.name.replace("_A02_", "_Z02_"))
+        a_doc, z_doc = load_json(a_path), load_json(z_path)
+        assert json.dumps(merge_opm_docs(a_doc, z_doc)) == json.dumps(deepcopy_merge(a_doc, z_doc))
+
+
+def pairs(folder):
+    for a_path in sorted(folder.glob("*_A02_*.opm")):
+        yield a_path.stem, a_path, a_path.with_name(a_path.name.replace("_A02_", "_Z02_"))
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_collector_writes_the_same_merges_from_disk_or_memory(tmp_path, samples_opm, jobs):
+    from_disk = MergeCollector(tmp_path / "disk", jobs=jobs)
+    from_memory = MergeCollector(tmp_path / "memory", jobs=jobs)
+    (tmp_path / "disk").mkdir()
+    (tmp_path / "memory").mkdir()
+    for key, a_path, z_path in pairs(samples_opm):
+        from_disk(key, a_path, z_path)
+        from_memory(key, a_path, z_path, load_json(a_path), load_json(z_path))
+
+    assert from_disk.result()["merged"] == from_memory.result()["merged"] == 18
+    # Pairs that come with their documents never go to the pool
+    assert from_memory.inline_seconds == from_memory.seconds
+    for _, a_path, _ in pairs(samples_opm):
+        name = f"{a_path.stem}{MERGED_SUFFIX}.opm"
+        assert (tmp_path / "disk" / name).read_bytes() == (tmp_path / "memory" / name).read_bytes()
+
+
+def test_collector_never_replaces_an_existing_merge(tmp_path, samples_opm):
+    key, a_path, z_path = next(pairs(samples_opm))
+    out = tmp_path / f"{a_path.stem}{MERGED_SUFFIX}.opm"
+    out.write_bytes(b"keep")
+
+    collector = MergeCollector(tmp_path)
+    collector(key, a_path, z_path)
+    result = collector.result()
+
+    assert (result["merged"], result["write_errors"]) == (0, 1)
+    assert out.read_bytes() == b"keep"
+
+
+def test_collector_adds_merges_to_a_bundle(tmp_path, samples_opm):
+    bundle = OpmBundleWriter(tmp_path / "all.opm.jsonl")
+    collector = MergeCollector(tmp_path / "unused", jobs=4, bundle=bundle)
+    key, a_path, z_path = next(pairs(samples_opm))
+    a_doc, z_doc = load_json(a_path), load_json(z_path)
+
+    collector(key, a_path, z_path, a_doc, z_doc)
+    collector(key, a_path, z_path, a_doc, z_doc)
+    result = collector.result()
+    bundle.close()
+
+    assert (result["merged"], result["write_errors"]) == (1, 1)
+    assert not (tmp_path / "unused").exists()
+    records = list(iter_bundle(tmp_path / "all.opm.jsonl"))
+    assert [(name, doc) for _, name, doc, _ in records] == [(f"{a_path.stem}{MERGED_SUFFIX}", merge_opm_docs(a_doc, z_doc))]
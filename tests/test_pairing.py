@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+
+from json2opm.analysis import analyze_pairs_from_opm_paths, iter_opm_files
+from json2opm.features import OpmFeatures
+from json2opm.pairing import (
+    DEFAULT_PAIR_KEY,
+    ORPHAN_DUPLICATE,
+    ORPHAN_NO_KEY,
+    ORPHAN_NO_PARTNER,
+    PairIndex,
+    make_pair_key,
+)
+
+
+def features(**fields) -> OpmFeatures:
+    base = dict(
+        expected_polarity=None, actual_polarity=None, polarity_status=None, wavelengths_nm=[], length=None,
+        length_missing=True, high_loss=False, cable_id=None, ose=None, test_date=None, tester=None,
+    )
+    return OpmFeatures(**{**base, **fields})
+
+
+def test_filename_key_drops_the_side_letter():
+    assert DEFAULT_PAIR_KEY.key(Path("P1_A03_C06_RACK.opm")) == ("P1_03_C06_RACK", "A", None)
+    assert DEFAULT_PAIR_KEY.key(Path("p1_z03_C06_RACK.opm"))[:2] == ("p1_03_C06_RACK", "Z")
+    key, side, reason = DEFAULT_PAIR_KEY.key(Path("notes.opm"))
+    assert key is None and "doesn't match" in reason
+
+
+def test_custom_pattern():
+    strategy = make_pair_key("filename", r"^(.+)-(?P<side>[AZ])$")
+    assert strategy.key(Path("CAB12-F03-A.opm"))[:2] == ("CAB12-F03-", "A")
+    assert strategy.order_key(Path("CAB12-F03-Z.opm")) == ("CAB12-F03-", "Z")
+
+
+@pytest.mark.parametrize("name, pattern", [("nope", None), ("filename", "(unclosed"), ("filename", "^(.+)$")])
+def test_bad_strategies_are_rejected(name, pattern):
+    with pytest.raises(ValueError):
+        make_pair_key(name, pattern)
+
+
+def test_document_keys():
+    f = features(job_id="PATH_1_LCO1-NS3-LCO2-DHB-00002.A02", test_point_name="P1_Z02_C01_RACK")
+    assert make_pair_key("jobid").key(Path("x.opm"), f)[:2] == ("PATH_1_LCO1-NS3-LCO2-DHB-00002.02", "A")
+    assert make_pair_key("testpoint").key(Path("x.opm"), f)[:2] == ("P1_02_C01_RACK", "Z")
+    assert "testPointName" in make_pair_key("testpoint").key(Path("x.opm"), features())[2]
+    # Ordering falls back to the file name, which the document keys can't see
+    assert make_pair_key("jobid").order_key(Path("P1_A02_C01.opm")) == ("P1_02_C01", "A")
+
+
+def test_streaming_index_reports_every_orphan():
+    a, z = Path("P1_A01_X.opm"), Path("P1_Z01_X.opm")
+    released = []
+    index = PairIndex(on_orphan=released.append)
+
+    assert index.add(a) is None
+    assert index.add(Path("P1_A01_X_MergeMF.opm")) is None
+    assert index.add(z) == ("P1_01_X", a, z)
+    assert index.add(Path("notes.opm")) is None
+    assert index.add(Path("P1_A02_Y.opm")) is None
+
+    reasons = {o.path.name: o.reason for o in index.orphans}
+    assert reasons == {"notes.opm": ORPHAN_NO_KEY, "P1_A02_Y.opm": ORPHAN_NO_PARTNER}
+    # Waiting sides aren't released while they can still be paired
+    assert [o.path.name for o in released] == ["notes.opm"]
+
+    index.add(Path("copy/P1_Z01_X.opm"))
+    assert [o.reason for o in index.orphans if o.path.parent.name == "copy"] == [ORPHAN_DUPLICATE]
+
+
+def test_batch_grouping_lets_the_later_file_win():
+    index = PairIndex()
+    old, new, z = Path("old/P1_A01_X.opm"), Path("new/P1_A01_X.opm"), Path("P1_Z01_X.opm")
+    assert index.group([old, new, z]) == [("P1_01_X", new, z)]
+    assert [(o.path, o.reason) for o in index.orphans] == [(old, ORPHAN_DUPLICATE)]
+
+
+def test_jobid_pairs_a_converted_folder_like_the_filename(faulty_opm):
+    paths = sorted(iter_opm_files(faulty_opm))
+    by_name = analyze_pairs_from_opm_paths(paths)
+    by_job = analyze_pairs_from_opm_paths(paths, pair_key=make_pair_key("jobid"))
+
+    assert by_job["stats"] == by_name["stats"]
+    assert [(a, z) for _, a, z in by_job["eligible_pairs"]] == [(a, z) for _, a, z in by_name["eligible_pairs"]]
@@ -0,0 +1,118 @@
+import json
+import pickle
+
+import pytest
+
+from json2opm.analysis import analyze_pairs_from_opm_paths, iter_opm_files
+from json2opm.rules import RuleError, RuleSet, compile_path, load_rules
+
+DOC = {
+    "TestDateTime": "2025-12-16T12:00:00Z",
+    "Measurements": [
+        {"Name": "1", "Wavelength": {"Value": 1.31e-06}, "Readings": [{"Value": 0.2}, {"Value": 0.4}]},
+        {"Name": "2", "Wavelength": {"Value": 1.55e-06}, "Readings": [{"Value": 1.9}]},
+        {"Name": 7, "Reference": {"Timestamp": "2025-12-16T09:30:00Z"}, "Readings": []},
+    ],
+    "LinkDefinition": {"ConnectorCount": 2},
+}
+
+
+def rule(**spec):
+    return RuleSet([{"name": "r", **spec}]).rules[0]
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("LinkDefinition.ConnectorCount", [2]),
+    ("Measurements[*].Name", ["1", "2", 7]),
+    ("Measurements[-1].Name", [7]),
+    ("Measurements[5].Name", []),
+    ("Measurements[Wavelength.Value=1.31e-06].Readings[*].Value", [0.2, 0.4]),
+    # "7" and 7 both match a Name of 7 (or "7")
+    ("Measurements[Name=7].Readings", [[]]),
+    ("Measurements[Name=\"1\"].Readings[0].Value", [0.2]),
+    ("Missing.Key", []),
+])
+def test_paths(path, expected):
+    assert compile_path(path)(DOC) == expected
+
+
+@pytest.mark.parametrize("path", ["", "A[?]", "A]"])
+def test_bad_paths(path):
+    with pytest.raises(RuleError):
+        compile_path(path)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ({"reduce": "all", "op": "<", "value": 1}, [0.2, 0.4, 1.9]),
+    ({"reduce": "max", "op": "<", "value": 1}, 1.9),
+    ({"reduce": "min", "op": "<", "value": 1}, 0.2),
+    ({"reduce": "sum", "op": "<", "value": 1}, pytest.approx(2.5)),
+    ({"reduce": "count", "op": "<", "value": 1}, 3),
+    ({"reduce": "first", "op": "<", "value": 1}, 0.2),
+    ({"op": "exists"}, 3),
+])
+def test_reducers(spec, expected):
+    assert rule(path="Measurements[*].Readings[*].Value", **spec).extract(DOC) == expected
+
+
+def test_age_from_turns_timestamps_into_hours():
+    r = rule(path="Measurements[*].Reference.Timestamp", age_from="TestDateTime", reduce="max", op="<=", value=24)
+    assert r.extract(DOC) == 2.5
+
+
+def test_each_checks_both_sides_and_delta_checks_the_difference():
+    each = rule(path="Measurements[*].Readings[*].Value", op="<=", value=1.5)
+    any_ = rule(path="Measurements[*].Readings[*].Value", reduce="any", op="<=", value=1.5)
+    delta = rule(path="LinkDefinition.ConnectorCount", compare="delta", op="==", value=0)
+
+    failure = each.check([0.2, 1.9], [0.3])
+    assert (failure.a_failed, failure.z_failed, failure.requirement) == (True, False, "<= 1.5")
+    assert any_.check([0.2, 1.9], [0.3]) is None
+    assert delta.check(2, 2) is None
+    assert delta.check(2, 4).delta == 2.0
+    # Files where the path matches nothing are skipped unless the rule is required
+    assert each.check([], [0.3]) is None
+    assert rule(path="X", op="==", value=1, required=True).check([], [1]).a_failed
+
+
+@pytest.mark.parametrize("spec", [
+    {"path": "A", "op": "~", "value": 1},
+    {"path": "A", "op": "=="},
+    {"path": "A", "op": "in", "value": 1},
+    {"path": "A", "op": "==", "value": 1, "reduce": "median"},
+    {"path": "A", "op": "==", "value": 1, "compare": "delta", "reduce": "all"},
+    {"path": "A", "op": "==", "value": 1, "severity": "info"},
+    {"path": "A", "op": "==", "value": 1, "colour": "red"},
+    {"op": "==", "value": 1},
+])
+def test_invalid_rules_are_rejected(spec):
+    with pytest.raises(RuleError, match="'r'"):
+        rule(**spec)
+
+
+def test_rule_files(tmp_path):
+    good = tmp_path / "rules.json"
+    good.write_text(json.dumps({"rules": [{"name": "r", "path": "A", "op": "exists"}]}))
+    rules = load_rules(good)
+    clone = pickle.loads(pickle.dumps(rules))
+    assert clone.fingerprint == rules.fingerprint and len(clone) == 1
+
+    dupes = tmp_path / "dupes.json"
+    dupes.write_text(json.dumps({"rules": [{"name": "r", "path": "A", "op": "exists"}] * 2}))
+    for path in (dupes, tmp_path / "missing.json"):
+        with pytest.raises(RuleError, match=path.name):
+            load_rules(path)
+
+
+@pytest.mark.parametrize("blocks_merge", [True, False])
+def test_failing_rules_follow_blocks_merge(faulty_opm, blocks_merge):
+    paths = sorted(iter_opm_files(faulty_opm))
+    rules = RuleSet([{"name": "needs_x", "path": "NoSuchKey", "op": "exists", "blocks_merge": blocks_merge}])
+
+    plain = analyze_pairs_from_opm_paths(paths)["stats"]
+    ruled = analyze_pairs_from_opm_paths(paths, rules=rules)
+
+    assert ruled["stats"]["rule_issue_pairs"] == plain["pairs_checked"]
+    assert ruled["stats"]["eligible_pairs"] == (0 if blocks_merge else plain["eligible_pairs"])
+    assert len(ruled["punch_rows"]) == plain["pairs_checked"]
+    assert all("Rule needs_x failed" in row["Details"] for row in ruled["punch_rows"])
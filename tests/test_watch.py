@@ -0,0 +1,39 @@
+import json
+
+from conftest import SAMPLE_A, SAMPLE_Z
+
+from json2opm.pairing import MERGED_SUFFIX
+from json2opm.watch import PAIR_FAILURE, PAIR_WAITING, SUMMARY_FILENAME, PairWatcher
+
+
+def drop(src, folder):
+    (folder / src.name).write_bytes(src.read_bytes())
+
+
+def test_files_wait_for_debounce_and_pairs_update_as_sides_arrive(tmp_path):
+    in_dir, out_dir = tmp_path / "drop", tmp_path / "opm"
+    in_dir.mkdir()
+    w = PairWatcher(in_dir, out_dir, merge=True, debounce=2.0, jobs=1)
+    key = SAMPLE_A.stem.replace("_A02_", "_02_")
+
+    drop(SAMPLE_A, in_dir)
+    assert w.poll(now=100.0) == []            # first sighting starts the clock
+    assert w.poll(now=101.0) == []            # not stable long enough
+    ready = w.poll(now=102.0)
+    assert ready == [in_dir / SAMPLE_A.name]
+    w.process(ready)
+    assert w.verdicts[key]["status"] == PAIR_WAITING
+
+    drop(SAMPLE_Z, in_dir)
+    w.poll(now=103.0)
+    w.process(w.poll(now=105.0))
+    w.write_summary()
+
+    # The sample pair has readings over the loss threshold: eligible, but a failure
+    assert w.verdicts[key]["status"] == PAIR_FAILURE
+    assert (out_dir / f"{SAMPLE_A.stem}{MERGED_SUFFIX}.opm").is_file()
+    summary = json.loads((out_dir / SUMMARY_FILENAME).read_text(encoding="utf-8"))
+    assert summary["pairs"][PAIR_FAILURE] == 1
+    assert summary["files"]["converted"] == 2
+    # Nothing changed: nothing is handed over again
+    assert w.poll(now=200.0) == []
@@ -0,0 +1,100 @@
+import errno
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from json2opm.writer import serialize_opm, write_json, write_opm
+
+DOC = {"JsonVersion": "1.0", "Value": 1.31e-06, "List": [1, 2]}
+
+
+def leftovers(folder):
+    return [p.name for p in folder.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_pretty_is_the_historical_layout(tmp_path):
+    out = tmp_path / "a.opm"
+    size = write_opm(out, DOC)
+
+    assert out.read_bytes() == json.dumps(DOC, indent=2).encode("ascii")
+    assert size == out.stat().st_size
+    assert serialize_opm(DOC, "compact") == b'{"JsonVersion":"1.0","Value":1.31e-06,"List":[1,2]}'
+    with pytest.raises(ValueError):
+        serialize_opm(DOC, "xml")
+
+
+def test_existing_output_is_kept_unless_overwriting(tmp_path):
+    out = tmp_path / "a.opm"
+    out.write_bytes(b"old")
+
+    with pytest.raises(FileExistsError):
+        write_opm(out, DOC)
+    assert out.read_bytes() == b"old"
+
+    write_opm(out, DOC, overwrite=True)
+    assert json.loads(out.read_bytes()) == DOC
+    assert leftovers(tmp_path) == []
+
+
+def test_exactly_one_of_racing_writers_wins(tmp_path):
+    out = tmp_path / "merged.opm"
+
+    def attempt(i):
+        try:
+            write_opm(out, {"writer": i})
+            return i
+        except FileExistsError:
+            return None
+
+    with ThreadPoolExecutor(8) as pool:
+        winners = [i for i in pool.map(attempt, range(32)) if i is not None]
+
+    assert len(winners) == 1
+    assert json.loads(out.read_bytes()) == {"writer": winners[0]}
+    assert leftovers(tmp_path) == []
+
+
+def test_filesystems_without_hard_links_still_publish_exclusively(tmp_path, monkeypatch):
+    def no_links(src, dst):
+        raise OSError(errno.EPERM, "hard links not supported")
+
+    monkeypatch.setattr(os, "link", no_links)
+    out = tmp_path / "a.opm"
+
+    write_opm(out, DOC)
+    with pytest.raises(FileExistsError):
+        write_opm(out, {"other": True})
+
+    assert json.loads(out.read_bytes()) == DOC
+    assert leftovers(tmp_path) == []
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path):
+    with pytest.raises(TypeError):
+        write_opm(tmp_path / "a.opm", {"bad": object()})
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_json_reports_replace_the_old_file_whole(tmp_path, monkeypatch):
+    out = tmp_path / "summary.json"
+    out.write_text('{"old": true}', encoding="utf-8")
+
+    size = write_json(out, {"tester": "Zoë", "files": 3})
+
+    assert out.read_bytes() == '{\n  "tester": "Zoë",\n  "files": 3\n}'.encode("utf-8")
+    assert size == out.stat().st_size
+
+    with pytest.raises(TypeError):
+        write_json(out, {"bad": object()})
+
+    def failing_replace(src, dst):
+        raise OSError(errno.EACCES, "locked")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        write_json(out, {"files": 4})
+
+    assert json.loads(out.read_bytes()) == {"tester": "Zoë", "files": 3}
+    assert leftovers(tmp_path) == []